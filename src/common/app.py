@@ -1,6 +1,9 @@
-import time
+from utils import clock
+import threading
+from typing import Optional
 from core.device_manager import DeviceManager
 from utils import logger
+from utils.latency_stats import latency_stats
 from utils.singleton import singleton
 from common.config import config
 import traceback
@@ -9,6 +12,7 @@ import traceback
 class AppManager:
     """
     游戏App管理器，提供启动、关闭、检测运行状态等功能
+    前台包名由后台线程按app_check_interval定期刷新，is_app_running直接读取缓存结果
     """
     def __init__(self, device_manager: DeviceManager) -> None:
         self.device_manager = device_manager
@@ -16,6 +20,16 @@ class AppManager:
         self.app_packages = ['com.netease.ma167', 'com.netease.ma167.bilibili']
         self.current_package = None
         self._initialized = True
+        # 前台包名缓存：(包名, 查询时间)，由跟踪线程定期刷新
+        self.check_interval = config.device.app_check_interval
+        self._foreground: Optional[str] = None
+        self._foreground_time = 0.0
+        # 缓存失效时递增，丢弃失效前发起、失效后才返回的查询结果
+        self._state_gen = 0
+        self._state_lock = threading.Lock()
+        self._tracker: Optional[threading.Thread] = None
+        self._tracker_stop = threading.Event()
+        self._tracker_wake = threading.Event()
         # 从配置中更新app_packages
         self._update_app_packages_from_config()
 
@@ -36,32 +50,118 @@ class AppManager:
         except Exception as e:
             logger.error(f"从配置中读取app_packages失败: {e}")
 
+    def _query_foreground(self) -> Optional[str]:
+        """
+        查询前台App包名并更新缓存
+        :return: 包名，查询失败返回None
+        """
+        with self._state_lock:
+            gen = self._state_gen
+        with latency_stats.timer("app_current"):
+            current_app = self.device_manager.app_current()
+        package = current_app.get("package")
+        with self._state_lock:
+            if gen == self._state_gen:
+                self._foreground = package
+                self._foreground_time = clock.time()
+        return package
+
+    def _tracking_enabled(self) -> bool:
+        # 回放时前台包名来自录制，直接查询以保证可复现
+        return self.check_interval > 0 and not config.device.replay_session
+
+    def start_tracking(self) -> None:
+        """启动前台包名跟踪线程，已启动时忽略"""
+        if not self._tracking_enabled() or (self._tracker is not None and self._tracker.is_alive()):
+            return
+        # 每个跟踪线程使用自己的停止事件：join超时未退出的旧线程不会因重新启动而继续运行
+        self._tracker_stop = threading.Event()
+        self._tracker = threading.Thread(target=self._track_loop, args=(self._tracker_stop,), name="app-tracker",
+                                         daemon=True)
+        self._tracker.start()
+        # 设备清理时一并停止
+        self.device_manager.add_cleanup_callback(self.stop_tracking)
+
+    def stop_tracking(self) -> None:
+        """停止前台包名跟踪线程(模式结束或设备清理时调用)，并使缓存失效，之后再查询时重新启动"""
+        self._tracker_stop.set()
+        self._tracker_wake.set()
+        if self._tracker is not None and self._tracker is not threading.current_thread():
+            self._tracker.join(timeout=2)
+        self._tracker = None
+        with self._state_lock:
+            self._state_gen += 1
+            self._foreground_time = 0.0
+
+    def _track_loop(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            try:
+                if self.device_manager.device:
+                    self._query_foreground()
+            except Exception as e:
+                logger.debug(f"刷新前台App失败: {e}")
+                with self._state_lock:
+                    self._foreground_time = 0.0
+            self._tracker_wake.wait(self.check_interval)
+            self._tracker_wake.clear()
+
+    def invalidate_app_state(self) -> None:
+        """
+        使缓存的前台包名失效(启动/关闭App后调用)，下次查询重新获取，并唤醒跟踪线程立即刷新
+        """
+        with self._state_lock:
+            self._state_gen += 1
+            self._foreground_time = 0.0
+        self._tracker_wake.set()
+
+    def get_foreground(self, max_age: Optional[float] = None) -> Optional[str]:
+        """
+        获取前台App包名，缓存未过期时直接返回缓存
+        :param max_age: 缓存最长有效时间(秒)，None为app_check_interval的2倍，0强制查询
+        :return: 包名
+        """
+        if max_age is None:
+            max_age = self.check_interval * 2
+        self.start_tracking()
+        with self._state_lock:
+            if max_age > 0 and self._foreground_time > 0 and clock.time() - self._foreground_time <= max_age:
+                return self._foreground
+        return self._query_foreground()
+
+    @property
+    def foreground_age(self) -> float:
+        """缓存的前台包名距上次刷新的时长(秒)，从未刷新为inf"""
+        with self._state_lock:
+            if self._foreground_time <= 0:
+                return float('inf')
+            return clock.time() - self._foreground_time
+
     def get_app_package(self):
         if not self.device_manager.device:
             logger.error("设备未连接，无法检查App运行状态")
             return False
-        current_app = self.device_manager.device.app_current()
-        logger.info(f"当前App包名: {current_app.get('package')}")
-        return current_app.get("package")
+        package = self._query_foreground()
+        logger.info(f"当前App包名: {package}")
+        return package
 
-    def is_app_running(self) -> bool:
+    def is_app_running(self, max_age: Optional[float] = None) -> bool:
         """
-        检查App是否正在运行
+        检查App是否正在运行，默认读取跟踪线程缓存的前台包名
+        :param max_age: 缓存最长有效时间(秒)，None为app_check_interval的2倍，0强制查询
         :return: bool
         """
         try:
             if not self.device_manager.device:
                 logger.error("设备未连接，无法检查App运行状态")
                 return False
-            current_app = self.device_manager.device.app_current()
-            current_package = current_app.get("package")
+            current_package = self.get_foreground(max_age)
             if self.current_package:
                 if current_package == self.current_package:
                     return True
             for package in self.app_packages:
                 if current_package == package:
                     self.current_package = package
-                    logger.debug(f"App当前包名: {current_app.get('package')}, 目标包名: {self.app_packages}, 运行状态: {True}")
+                    logger.debug(f"App当前包名: {current_package}, 目标包名: {self.app_packages}, 运行状态: {True}")
                     return True
             return False
         except Exception as e:
@@ -77,28 +177,32 @@ class AppManager:
                 logger.error("设备未连接，无法启动App")
                 return
             
-            if self.is_app_running():
+            if self.is_app_running(max_age=0):
                 if show_log:
                     logger.info("游戏已在运行中")
                 return
             
             if self.current_package:
-                self.device_manager.device.app_start(self.current_package)
+                with latency_stats.timer("app_start"):
+                    self.device_manager.device.app_start(self.current_package)
+                self.invalidate_app_state()
                 if show_log:
                     logger.info(f"启动App成功: {self.current_package}")
-                time.sleep(3)
+                clock.sleep(3)
                 return
             
             # 尝试启动游戏，优先配置中指定的服务器
             for package in self.app_packages:
                 try:
-                    self.device_manager.device.app_start(package)
+                    with latency_stats.timer("app_start"):
+                        self.device_manager.device.app_start(package)
+                    self.invalidate_app_state()
                     if show_log:
                         logger.info(f"启动App成功: {package}")
                 except Exception as e:
                     logger.info(f"启动 {package} 失败: {e}")
                     continue
-            time.sleep(3)
+            clock.sleep(3)
         except Exception as e:
             logger.info(f"启动App失败: {e}\n{traceback.format_exc()}")
 
@@ -111,14 +215,18 @@ class AppManager:
                 logger.error("设备未连接，无法关闭App")
                 return
             if self.current_package:
-                self.device_manager.device.app_stop(self.current_package)
+                with latency_stats.timer("app_stop"):
+                    self.device_manager.device.app_stop(self.current_package)
+                self.invalidate_app_state()
                 if show_log:
                     logger.info(f"关闭App成功: {self.current_package}")
                 return
             # 关闭所有可能运行的游戏包
             for package in self.app_packages:
                 try:
-                    self.device_manager.device.app_stop(package)
+                    with latency_stats.timer("app_stop"):
+                        self.device_manager.device.app_stop(package)
+                    self.invalidate_app_state()
                     if show_log:
                         logger.info(f"关闭App: {package}")
                 except Exception as e:
@@ -129,7 +237,7 @@ class AppManager:
 
     def restart_app(self) -> None:
         self.close_app()
-        time.sleep(1)
+        clock.sleep(1)
         self.start_app()
 
     def check_app_alive(self) -> bool:
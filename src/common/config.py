@@ -2,7 +2,7 @@ import os
 import yaml
 from pydantic import BaseModel
 from utils.get_asset_path import get_asset_path
-from typing import Dict, List, TypedDict, Optional, Union
+from typing import Dict, List, Tuple, TypedDict, Optional, Union
 import logging
 import time
 from utils import logger
@@ -81,13 +81,39 @@ class OCRConfig(BaseModel):
     use_angle_cls: bool = True
     ocr_confidence_threshold: float = 0.8  # OCR识别置信度阈值
     image_template_match_threshold: float = 0.95  # 图像模板匹配阈值
+    template_region_padding: int = 20  # 模板文件名内嵌匹配区域(xxx__x1_y1_x2_y2.png)的外扩像素
+    template_pyramid: bool = False  # 模板匹配是否先在缩小图上粗匹配，再在候选位置按原分辨率精匹配(模板过小时自动使用普通匹配)
+    template_pyramid_min_size: int = 12  # 金字塔粗匹配时缩小后模板最短边的最小像素
     debug_mode: bool = False  # 是否开启调试模式
 
 class DeviceConfig(BaseModel):
     connection_timeout: int = 30
     retry_count: int = 3
+    auto_reconnect: bool = True  # 连接断开时自动重连(含重启uiautomator服务)，截图/输入等待重连后重试
+    health_check_interval: float = 5.0  # 后台连接探测间隔(秒)，0为只在操作失败时探测
+    health_fail_threshold: int = 2  # 后台探测连续失败多少次后重连
+    reconnect_wait: float = 30.0  # 操作失败后等待重连完成的最长时间(秒)
     adb_address: str = "127.0.0.1:5555"
     app_packages: str = "com.netease.ma167"
+    app_check_interval: float = 1.0  # 前台App检测间隔(秒)，后台线程按此间隔刷新，0为每次直接查询
+    capture_backend: str = "u2"  # 截图后端: u2(uiautomator2) / adb_raw(screencap原始帧，免PNG编解码)
+    input_backend: str = "u2"  # 输入后端: u2(uiautomator2) / adb_shell(常驻adb shell执行input命令，失败时回退u2)
+    stream_capture: bool = False  # 是否启用后台截图流
+    stream_buffer_size: int = 3  # 截图流环形缓冲区帧数
+    stream_interval: float = 0.0  # 截图流两次截图最小间隔(秒)，0为不限速
+    stream_max_age: float = 0.5  # 截图流帧最大可用时长(秒)，超过则等待新帧
+    frame_cache_window: float = 0.05  # 帧共享窗口(秒)，窗口内重复截图复用当前帧，0为关闭
+    change_threshold: float = 6.0  # 画面变化检测阈值(缩小灰度图最大像素差)，区域未变化时复用检测结果，0为关闭
+    change_max_age: float = 5.0  # 画面未变化时检测结果最长复用时间(秒)
+    wait_stable: bool = True  # 操作后等待画面稳定即继续，关闭则按最长等待时间固定sleep
+    record_session: str = ""  # 会话录制存档路径(.zip)，非空时每次模式运行录制所有帧和操作，文件名追加模式名、时间和进程号
+    replay_session: str = ""  # 会话回放存档路径(.zip)，非空时不连接真实设备，按录制内容回放
+    replay_virtual_clock: bool = True  # 回放时使用虚拟时钟，sleep不真正等待
+    latency_report_interval: float = 300.0  # 设备操作耗时统计定期输出到日志的间隔(秒)，0为关闭定期输出
+    roi_capture: bool = False  # 截图后端支持时只截取检测方法登记的区域，需要整帧时再按需截取
+    capture_scale: float = 1.0  # 截图缩放比例，如0.5为半分辨率截图，坐标、取色点和模板自动按比例换算
+    async_input: bool = False  # 输入操作由输入分发线程按顺序异步执行，调用方不等待设备响应
+    input_min_interval: float = 0.0  # 相邻两次输入操作的最小间隔(秒)，0为不限速
 
 class LoggingConfig(BaseModel):
     level: str = "INFO"
@@ -130,6 +156,13 @@ class CityConfig(TypedDict):
 class FengmoCityConfig(BaseModel):
     cities: Dict[str, CityConfig]
 
+class ScreenSignatureConfig(BaseModel):
+    """
+    界面特征取色点配置
+    特征名 -> 取色点组列表，每组为[(x, y, 颜色, 范围), ...]，任意一组全部匹配即命中
+    """
+    signatures: Dict[str, List[List[Tuple[int, int, str, int]]]] = {}
+
 class NoMillisecFormatter(logging.Formatter):
     def formatTime(self, record, datefmt=None):
         from datetime import datetime
@@ -186,6 +219,7 @@ class Config:
         self.fengmo = FengmoConfig(**self._load_yaml_with_log(os.path.join(config_dir, "fengmo.yaml"), name="fengmo.yaml"))
         self.fengmo_cities = FengmoCityConfig(**self._load_yaml_with_log(os.path.join(config_dir, "fengmo_cities.yaml"), name="fengmo_cities.yaml")).cities
         self.battle = BattleConfig(**self._load_yaml_with_log(os.path.join(config_dir, "battle.yaml"), name="battle.yaml"))
+        self.screen_signatures = ScreenSignatureConfig(**self._load_yaml_with_log(os.path.join(config_dir, "screen_signatures.yaml"), name="screen_signatures.yaml")).signatures
 
     def _load_yaml_with_log(self, path, name=None, fallback=None, key=None):
         # 首先尝试从缓存获取
@@ -1,4 +1,4 @@
-import time
+from utils import clock
 from common.config import CheckPoint, Monster
 from core.battle_command_executor import BattleCommandExecutor
 from utils import logger
@@ -6,9 +6,11 @@ from common.app import AppManager
 from core.device_manager import DeviceManager
 from core.ocr_handler import OCRHandler
 from typing import Callable, Optional, Tuple, TYPE_CHECKING
-from PIL import Image
+from core.frame import Frame
 from utils.singleton import singleton
 from utils.sleep_utils import sleep_until, sleep_until_app_running
+from core.change_detector import roi_cached
+from core.screen_classifier import Screen, screen_classifier
 
 if TYPE_CHECKING:
     from core.battle import Battle
@@ -33,6 +35,17 @@ class World:
         self.monsters = []
         self.monster_pos = []
         self.default_battle_config = ""
+        # 登记常用检测区域，供区域截图使用
+        self.device_manager.register_roi("World.in_fengmo_map", (960, 205, 1022, 238))
+        # 登记界面判断，供界面分类器使用
+        screen_classifier.register(Screen.NET_ERROR, self.check_net_state)
+        screen_classifier.register(Screen.EXIT_FENGMO, self.check_exit_fengmo)
+        screen_classifier.register(Screen.FOUND_BOSS, self.check_found_boss)
+        screen_classifier.register(Screen.WORLD, self.in_world)
+        screen_classifier.register(Screen.MINIMAP, self.in_minimap)
+        screen_classifier.register(Screen.MAP, self.in_map)
+        screen_classifier.register(Screen.CONFIRM_YES, lambda image: self.click_confirm_yes(image, click=False))
+        screen_classifier.register(Screen.CONFIRM, lambda image: self.click_confirm(image, click=False))
         
         # 注册到服务定位器
         from utils.service_locator import register_service
@@ -71,10 +84,10 @@ class World:
         logger.info(f"[restart_wait_in_world]关闭应用结果: {resilt}")
         
         while True:
-            time.sleep(1)
+            clock.sleep(1)
             in_world = self.in_world()
             if in_world:
-                time.sleep(0.3)
+                clock.sleep(0.3)
                 check_in_world = self.in_world()
                 if check_in_world:
                     break
@@ -100,7 +113,7 @@ class World:
         max_count = 3
         count = 0
         while count < max_count:
-            time.sleep(1)
+            clock.sleep(1)
             if self.in_world() and self.in_fengmo_map():
                 count += 1
             else:
@@ -109,7 +122,7 @@ class World:
                 callback()
         if show_log:
             logger.info(f"[read_map_state]在逢魔地图中")
-        time.sleep(2)
+        clock.sleep(2)
         self.open_minimap()
         sleep_until(self.in_minimap)
         state = self.get_fengmo_state()
@@ -120,27 +133,28 @@ class World:
         self.closeUI()
         return 'in_world'
     
-    def get_fengmo_state(self,image:Image.Image|None=None) -> str|None:
+    def get_fengmo_state(self,image:Frame|None=None) -> str|None:
         if image is None:
             image = self.device_manager.get_screenshot()
         if image is None:
             logger.warning("无法获取截图，无法判断是否在逢魔中")
             return None
-        if self.find_map_boss() is not None:
+        tags = self.find_map_tags(image)
+        if tags["boss"] is not None:
             logger.info(f"[check_fengmo_state]识别到三阶段")
             return 'boss'
-        if self.find_map_treasure() is not None or self.find_map_cure() is not None or self.find_map_monster() is not None:
+        if tags["treasure"] is not None or tags["cure"] is not None or tags["monster"] is not None:
             logger.info(f"[check_fengmo_state]识别到二阶段")
             return 'box'
         logger.info(f"[check_fengmo_state]识别到一阶段")
         return 'collect'
         
-    def in_world(self, image: Optional[Image.Image] = None) -> bool:
+    @roi_cached((70, 629, 103, 667), color=True)
+    def in_world(self, image: Optional[Frame] = None) -> bool:
         """
         判断当前是否在城镇主界面且人物停止移动。
         通过检测左下角菜单的多个点颜色判断。
         :param image: 可选，外部传入截图
-        :param points_colors: 可选，[(x, y, color, range)] 数组，默认用原有2点
         :return: bool，是否在世界中
         """
         if image is None:
@@ -148,13 +162,7 @@ class World:
         if image is None:
             logger.warning("无法获取截图，无法判断是否在世界中")
             return False
-        points_colors = [
-            (73, 632, "E8EBF0", 2),
-            (100, 637, '1F1E1C', 2),
-            (73, 632, 'F5F1EE', 2),
-            (86, 664, '8F8C85', 2),
-        ]
-        results = self.ocr_handler.match_point_color(image, points_colors)
+        results = self.ocr_handler.match_signature(image, "in_world")
         if results:
             logger.debug("检测到在世界中")
             return True
@@ -162,19 +170,13 @@ class World:
             logger.debug("不在世界中")
             return False
         
-    def in_map(self, image: Optional[Image.Image] = None) -> bool:
+    def in_map(self, image: Optional[Frame] = None) -> bool:
         if image is None:
             image = self.device_manager.get_screenshot()
         if image is None:
             logger.warning("无法获取截图，无法判断是否在地图中")
             return False
-        points_colors = [
-            (1228, 648, 'C3BCB2', 1),
-            (1189, 647, 'C6C2B9', 1),
-            (1221, 660, '030000', 1),
-            (1205, 659, '070400', 1),
-        ]
-        results = self.ocr_handler.match_point_color(image, points_colors)
+        results = self.ocr_handler.match_signature(image, "in_map")
         if results:
             logger.debug("检测到在大地图中")
             return True
@@ -182,12 +184,11 @@ class World:
             logger.debug("不在大地图中")
             return False
 
-    def in_minimap(self, image: Optional[Image.Image] = None) -> bool:
+    def in_minimap(self, image: Optional[Frame] = None) -> bool:
         """
         判断当前是否在小地图中。
         通过检测地图界面多个关键点的颜色判断。
         :param image: 可选，外部传入截图
-        :param points_colors: 可选，[(x, y, color, range)] 数组，默认用原有3点
         :return: bool，是否在地图中
         """
         if image is None:
@@ -195,16 +196,7 @@ class World:
         if image is None:
             logger.warning("无法获取截图，无法判断是否在地图中")
             return False
-        points_colors = [
-            (33, 638, "FFFFFF", 1),
-            (64, 649, "FFFFFF", 1),
-            (452, 676, "FBF9FE", 1),
-            (266, 86, '8B847A', 1),
-            (226, 86, '847D73', 1),
-            (1236, 21, 'F0F0F0', 1),
-            (1187, 5, '6E6E6E', 1),
-        ]
-        results = self.ocr_handler.match_point_color(image, points_colors)
+        results = self.ocr_handler.match_signature(image, "in_minimap")
         if results:
             logger.debug("检测到在小地图中")
             return True
@@ -212,7 +204,7 @@ class World:
             logger.debug("不在小地图中")
             return False
         
-    def in_fengmo_map(self, image: Optional[Image.Image] = None):
+    def in_fengmo_map(self, image: Optional[Frame] = None):
         if image is None:
             image = self.device_manager.get_screenshot()
         find = self.ocr_handler.match_texts(["深度"],image,(960,205,1022,238))
@@ -223,7 +215,7 @@ class World:
             logger.debug("不在逢魔地图中")
             return None
         
-    def in_inn(self, image: Optional[Image.Image] = None) -> Optional[Tuple[int, int]] | None:
+    def in_inn(self, image: Optional[Frame] = None) -> Optional[Tuple[int, int]] | None:
         """
         判断当前是否在旅馆中。
         """
@@ -238,22 +230,22 @@ class World:
             return None
         
     def wait_in_fengmo_map(self, timeout:float= 4):
-        start_time = time.time()
+        start_time = clock.time()
         count = 0
         max_count = 3
         while count < max_count:
-            if time.time() - start_time > timeout:
+            if clock.time() - start_time > timeout:
                 return False
             if self.in_world():
                 count += 1
             else:
                 count = 0
-            time.sleep(0.1)
+            clock.sleep(0.1)
         if self.in_fengmo_map() is not None:
             return True
         return False
     
-    def find_inn_door(self, image: Optional[Image.Image] = None) -> Optional[Tuple[int, int]] | None:
+    def find_inn_door(self, image: Optional[Frame] = None) -> Optional[Tuple[int, int]] | None:
         """
         判断当前是否在旅馆门口。
         """
@@ -267,7 +259,7 @@ class World:
             logger.debug("不在旅馆门口")
             return None
     
-    def find_fengmo_point(self, image: Optional[Image.Image] = None, type: str = "right", offset=60, current_point:CheckPoint|None=None) -> Optional[tuple[int, int, int]] | None:
+    def find_fengmo_point(self, image: Optional[Frame] = None, type: str = "right", offset=60, current_point:CheckPoint|None=None) -> Optional[tuple[int, int, int]] | None:
         """
         判断当前是否有逢魔点(逢魔入口也是这个,判断感叹号)。
         """
@@ -312,12 +304,12 @@ class World:
             return (find[0],find[1]+offset,len(find_list))
         else:
             logger.info("没有找到逢魔点")
-            if current_point and image:
+            if current_point and image is not None:
                 # 保存以current_point的id为key的截图到debug目录
                 self.device_manager.save_screenshot(image,f"debug/fengmo_point_{current_point.id}.png")
             return None
         
-    def find_fengmo_point_cure(self, image: Optional[Image.Image] = None) -> Optional[tuple[int, int]]:
+    def find_fengmo_point_cure(self, image: Optional[Frame] = None) -> Optional[tuple[int, int]]:
         """
         判断当前是否已发现的治疗点。
         """
@@ -331,23 +323,13 @@ class World:
             logger.debug("没有治疗点")
             return None
         
-    def find_all_item(self,image:Image.Image|None=None) -> bool:
+    def find_all_item(self,image:Frame|None=None) -> bool:
         if image is None:
             image = self.device_manager.get_screenshot()
         if image is None:
             logger.warning("无法获取截图，无法判断是否发现所有逢魔之影")
             return False
-        points_colors = [
-                    (558, 306, 'E0D5D3', 1),
-                    (502, 305, 'ECE2E0', 1),
-                    (528, 315, 'F8EEEC', 1),
-                    (621, 320, 'EBDFDF', 1),
-                    (728, 311, 'E7DEE1', 1),
-                    (604, 483, '36667C', 1),
-                    (684, 485, '2D5D73', 1),
-                ]
-                # 批量判断
-        results = self.ocr_handler.match_point_color(image, points_colors)
+        results = self.ocr_handler.match_signature(image, "find_all_item")
         if results:
             logger.debug("检测到发现所有逢魔之影")
             return True
@@ -355,21 +337,13 @@ class World:
             logger.debug("没有发现所有逢魔之影")
             return False
         
-    def get_item(self,image:Image.Image|None=None) -> bool:
+    def get_item(self,image:Frame|None=None) -> bool:
         if image is None:
             image = self.device_manager.get_screenshot()
         if image is None:
             logger.warning("无法获取截图，无法判断是否获得道具")
             return False
-        points_colors = [
-                    (688, 258, 'FFFFFF', 1), 
-                    (689, 275, 'FFFFFF', 1), 
-                    (632, 274, 'FFFFFF', 1),
-                    (602, 434, '306378', 1),
-                    (684, 438, '275B71', 1),
-                ]
-                # 批量判断
-        results = self.ocr_handler.match_point_color(image, points_colors)
+        results = self.ocr_handler.match_signature(image, "get_item")
         if results:
             logger.debug("检测到获得道具")
             return True
@@ -377,24 +351,13 @@ class World:
             logger.debug("没有获得道具")
             return False
         
-    def check_found_boss(self,image:Image.Image|None=None) -> bool:
+    def check_found_boss(self,image:Frame|None=None) -> bool:
         if image is None:
             image = self.device_manager.get_screenshot()
         if image is None:
             logger.warning("无法获取截图，无法判断是否找到boss")
             return False
-        points_colors = [
-            (512, 484, '575757', 1),
-            (727, 487, '23576F', 1),
-            (706, 242, 'F3EDEF', 1),
-            (707, 254, 'EEE8EA', 1),
-            (707, 258, 'EFE9EB', 1),
-            (314, 374, 'F5EBEC', 1),
-            (772, 380, 'F5EFF1', 1),
-            (940, 377, 'F6EDEE', 1),
-            (616, 311, 'F9E9E9', 1),
-        ]
-        results = self.ocr_handler.match_point_color(image, points_colors)
+        results = self.ocr_handler.match_signature(image, "found_boss")
         if results:
             logger.debug("检测到找到boss")
             return True
@@ -402,35 +365,13 @@ class World:
             logger.debug("没有找到boss")
             return False
     
-    def check_net_state(self, image:Image.Image|None=None) -> bool:
+    def check_net_state(self, image:Frame|None=None) -> bool:
         if image is None:
             image = self.device_manager.get_screenshot()
         if image is None:
             logger.warning("无法获取截图，无法判断网络状态")
             return False
-        # 网络断开
-        points_colors_error_1 = [
-                    (559, 284, 'E6E6E6', 1),
-                    (696, 285, 'C7C7C7', 1), 
-                    (383, 323, 'F7F6F4', 1), 
-                    (514, 332, 'E7E6E4', 1),
-                    (708, 334, 'F2F1EF', 1), 
-                    (493, 334, 'BDB9B8', 1), 
-                    (436, 417, '28281E', 1),
-                    (801, 416, '28281C', 1), 
-                ]
-        # 获取域名资讯通讯失败
-        points_colors_error_2 = [
-            (523, 283, 'EFEDEE', 1),
-            (670, 288, 'F4F3F1', 1),
-            (824, 327, 'CDCCCA', 1),
-            (366, 328, 'F1F0EE', 1),
-            (607, 416, '28281E', 1),
-            (698, 416, '2A281C', 1),
-        ]
-        results = self.ocr_handler.match_point_color(image, points_colors_error_1)
-        if not results:
-            results = self.ocr_handler.match_point_color(image, points_colors_error_2)
+        results = self.ocr_handler.match_signature(image, "net_error")
         if results:
             logger.debug("检测到网络断开")
             return True
@@ -438,22 +379,13 @@ class World:
             logger.debug("没有检测到网络断开")
             return False
         
-    def check_exit_fengmo(self, image:Image.Image|None=None) -> bool:
+    def check_exit_fengmo(self, image:Frame|None=None) -> bool:
         if image is None:
             image = self.device_manager.get_screenshot()
         if image is None:
             logger.warning("无法获取截图，无法判断是否退出逢魔")
             return False
-        points_colors = [
-                    (642, 332, 'FFF2F1', 1),
-                    (608, 328, 'F2E2E2', 1),
-                    (562, 334, 'FFEDEB', 1),
-                    (542, 301, 'EDE4DD', 1),
-                    (696, 298, 'D7CDCB', 1),
-                    (456, 484, '5B5B5B', 1),
-                    (776, 483, '3C6B7F', 1),
-                ]
-        results = self.ocr_handler.match_point_color(image, points_colors)
+        results = self.ocr_handler.match_signature(image, "exit_fengmo")
         if results:
             logger.debug("检测到获得道具")
             return True
@@ -486,16 +418,17 @@ class World:
         点击跳过按钮，count次
         """
         for _ in range(count):
-            self.device_manager.click(1270,710)
-            time.sleep(interval)
+            # 前一次点击尚未执行时不再重复提交
+            self.device_manager.click(1270,710, coalesce=True)
+            clock.sleep(interval)
 
     def dclick_tirm(self,count: int = 1,interval: float = 0.1) -> None:
         """
         点击跳过按钮，count次
         """
         for _ in range(count):
-            self.device_manager.double_click(1270,710)
-            time.sleep(interval)
+            self.device_manager.double_click(1270,710, coalesce=True)
+            clock.sleep(interval)
         
     def rest_in_inn(self,inn_pos:list[int]) -> str:
         """
@@ -515,7 +448,7 @@ class World:
             logger.debug("不在城镇中")
             return 'not_in_world' 
         while True:
-            time.sleep(0.2)
+            clock.sleep(0.2)
             logger.debug("打开小地图")
             self.open_minimap()
             logger.debug("等待小地图")
@@ -534,14 +467,14 @@ class World:
             return 'not_in_inn'
         logger.debug("点击旅馆老板")
         self.device_manager.click(*in_inn)
-        time.sleep(1)
+        clock.sleep(1)
         logger.debug("点击跳过")
         self.click_tirm(5,0.2)
         logger.debug("点击是")
         sleep_until(lambda: self.click_confirm_yes(wait_time=0.3), function_name="旅馆 是")
         if sleep_until(self.cure_finish):
             logger.info("治疗完成")
-            time.sleep(0.3)
+            clock.sleep(0.3)
             self.click_confirm()
         logger.debug("等待返回城镇")
         sleep_until(self.in_world)
@@ -575,7 +508,7 @@ class World:
         logger.info(f"[go_fengmo]点击小地图: {entrance_pos}")
         self.device_manager.click(entrance_pos[0],entrance_pos[1])
         self.in_world_or_battle()
-        time.sleep(wait_time)
+        clock.sleep(wait_time)
         # 寻找逢魔入口
         fengmo_pos = sleep_until(self.find_fengmo_point,function_name=f"exit_fengmo 寻找逢魔入口 {entrance_pos}")
         if fengmo_pos is None:
@@ -606,7 +539,7 @@ class World:
         logger.info(f"[go_fengmo]点击小地图: {entrance_pos}")
         self.device_manager.click(entrance_pos[0],entrance_pos[1])
         self.in_world_or_battle()
-        time.sleep(wait_time)
+        clock.sleep(wait_time)
         # 寻找逢魔入口
         fengmo_pos = sleep_until(self.find_fengmo_point,function_name=f"go_fengmo 寻找逢魔入口 {entrance_pos}")
         if fengmo_pos is None:
@@ -624,10 +557,10 @@ class World:
             logger.info("未发现逢魔涉入按钮")
             return False
         self.device_manager.click(*pos[:2])
-        time.sleep(5)
+        clock.sleep(5)
         return True
     
-    def none_cure(self,image:Image.Image|None=None) -> bool:
+    def none_cure(self,image:Frame|None=None) -> bool:
         """
         判断是否没有恢复次数
         """
@@ -654,7 +587,7 @@ class World:
             logger.debug("有恢复次数")
             return False
     
-    def has_cure(self,image:Image.Image|None=None) -> bool:
+    def has_cure(self,image:Frame|None=None) -> bool:
         """
         判断是否还有恢复次数
         """
@@ -679,7 +612,7 @@ class World:
             logger.debug("没有恢复次数")
             return False
         
-    def cure_finish(self,image:Image.Image|None=None) -> bool:
+    def cure_finish(self,image:Frame|None=None) -> bool:
         """
         判断是否治疗完成
         """
@@ -710,20 +643,20 @@ class World:
             return None
         logger.debug("使用vip治疗")
         sleep_until(self.in_world)
-        time.sleep(0.2)
+        clock.sleep(0.2)
         logger.info(f"[vip_cure]使用vip治疗")
         self.device_manager.click(1222, 525)
-        time.sleep(1)
+        clock.sleep(1)
         result = ''
-        start_time = time.time()
+        start_time = clock.time()
         while not self.in_world():
-            if time.time() - start_time > 20:
+            if clock.time() - start_time > 20:
                 logger.info('[vip_cure]vip治疗超时')
                 return 'timeout'
             screenshot = self.device_manager.get_screenshot()
             if self.has_cure(screenshot):
                 logger.info('[vip_cure]是否月卡恢复')
-                time.sleep(1)
+                clock.sleep(1)
                 self.click_confirm_yes()
                 logger.info('[vip_cure]点击确认')
                 result = 'confirm_cure'
@@ -736,10 +669,10 @@ class World:
                 logger.info('[vip_cure]治疗完成')
                 self.click_confirm()
                 result = 'finish_cure'
-            time.sleep(0.2)
+            clock.sleep(0.2)
         return result
     
-    def find_fengmo_start(self,image:Optional[Image.Image]=None,threshold:float=0.95):
+    def find_fengmo_start(self,image:Optional[Frame]=None,threshold:float=0.95):
         """
         判断当前逢魔入口
         """
@@ -762,7 +695,7 @@ class World:
         def find_fengmo_start_with_threshold():
             return self.find_fengmo_start(threshold=threshold)
         pos = sleep_until(find_fengmo_start_with_threshold,timeout=10)
-        time.sleep(0.5)
+        clock.sleep(0.5)
         if pos is None:
             if callback is not None:
                 result = callback()
@@ -775,14 +708,14 @@ class World:
         if depth > 0:
             for i in range(num_depth):
                 self.do_fengmo_depth("add")
-                time.sleep(difficulty_delay)
+                clock.sleep(difficulty_delay)
         else:
             for i in range(num_depth):
                 self.do_fengmo_depth("sub")
-                time.sleep(difficulty_delay)
+                clock.sleep(difficulty_delay)
         return 'success'
     
-    def find_map_treasure(self, image: Optional[Image.Image] = None) -> Optional[list[tuple[int, int]]]:
+    def find_map_treasure(self, image: Optional[Frame] = None) -> Optional[list[tuple[int, int]]]:
         """
         判断当前是否已发现的地图宝箱点。
         """
@@ -796,7 +729,7 @@ class World:
             logger.debug("未发现地图宝箱点")
             return None
         
-    def find_map_cure(self, image: Optional[Image.Image] = None) -> Optional[tuple[int, int]]:
+    def find_map_cure(self, image: Optional[Frame] = None) -> Optional[tuple[int, int]]:
         """
         判断当前是否已发现的地图治疗点。
         """
@@ -810,7 +743,7 @@ class World:
             logger.debug("未发现地图治疗点")
             return None
         
-    def find_map_monster(self, image: Optional[Image.Image] = None) -> Optional[tuple[int, int]]:
+    def find_map_monster(self, image: Optional[Frame] = None) -> Optional[tuple[int, int]]:
         """
         判断当前是否已发现的地图怪物点。
         """
@@ -824,7 +757,27 @@ class World:
             logger.debug("未发现地图怪物点")
             return None
         
-    def find_map_boss(self, image: Optional[Image.Image] = None) -> Optional[tuple[int, int]]:
+    def find_map_tags(self, image: Optional[Frame] = None) -> dict:
+        """
+        一次并行匹配地图上的宝箱、治疗、怪物、Boss点。
+        :param image: 可选，外部传入截图
+        :return: {"treasure": 同find_map_treasure, "cure"/"monster"/"boss": 同find_map_cure等}
+        """
+        if image is None:
+            image = self.device_manager.get_screenshot()
+        found = self.ocr_handler.match_many(image, {
+            "treasure": {"template": "assets/fengmo/map_treasure.png", "multi": True},
+            "cure": "assets/fengmo/map_cure.png",
+            "monster": "assets/fengmo/map_monster.png",
+            "boss": "assets/fengmo/map_boss.png",
+        })
+        tags = {name: (find or None) for name, find in found.items()}
+        if tags["treasure"] is not None:
+            tags["treasure"] = [(int(x), int(y)) for x, y, _ in tags["treasure"]]
+        logger.debug(f"地图标记点: {tags}")
+        return tags
+
+    def find_map_boss(self, image: Optional[Frame] = None) -> Optional[tuple[int, int]]:
         """
         判断当前是否已发现的地图Boss点。
         """
@@ -838,29 +791,30 @@ class World:
             logger.debug("未发现地图Boss点")
             return None
         
-    def check_in_world_or_battle(self,image:Image.Image|None=None, callback:Callable[[Image.Image], None]|None=None):
+    def check_in_world_or_battle(self,image:Frame|None=None, callback:Callable[[Frame], None]|None=None):
             while True:
                 if image is None:
                     image = self.device_manager.get_screenshot()
                 if not self.app_manager.is_app_running():
                     return "app_not_running"
-                if self.in_world(image):
+                screen = screen_classifier.classify(image, (Screen.WORLD, Screen.BATTLE_FAIL, Screen.BATTLE))
+                if screen == Screen.WORLD:
                     logger.debug("[in_world_or_battle]小镇中")
                     return "in_world"
                 battle = self._get_battle()
-                if battle and battle.in_battle(image):
+                if battle and screen in (Screen.BATTLE_FAIL, Screen.BATTLE):
                     logger.debug("[in_world_or_battle]战斗中")
-                    if battle.check_battle_fail(image):
+                    if screen == Screen.BATTLE_FAIL and battle.check_battle_fail(image, detected=True):
                         return "battle_fail"
                     return "in_battle"
                 else:
                     if callback is not None and image is not None:
                         callback(image)
-                    time.sleep(0.1)
+                    clock.sleep(0.1)
                     image = self.device_manager.get_screenshot()
 
         
-    def in_world_or_battle(self, callback:Callable[[Image.Image], None]|None=None, check_battle_command_done:bool|None=None,
+    def in_world_or_battle(self, callback:Callable[[Frame], None]|None=None, check_battle_command_done:bool|None=None,
                            is_battle_success:bool|None=None,has_battle:bool|None=None)-> dict[str,bool]|None:
         logger.info("[in_world_or_battle]开始检查")
         if check_battle_command_done is None:
@@ -889,7 +843,7 @@ class World:
                 logger.debug("在城镇中")
                 result = { "in_world":True, "in_battle":has_battle,"app_alive":True, 'is_battle_success':is_battle_success }
                 if has_battle:
-                    time.sleep(0.5)
+                    clock.sleep(0.5)
                     check_in_world = sleep_until(self.in_world,timeout=5)
                     if check_in_world:
                         return result
@@ -927,7 +881,7 @@ class World:
                 logger.info("异常")
                 return None
             
-    def do_default_battle(self, callback:Callable[[Image.Image], str|None]|None = None) -> dict:
+    def do_default_battle(self, callback:Callable[[Frame], str|None]|None = None) -> dict:
         """
         执行默认战斗
         """
@@ -955,17 +909,29 @@ class World:
             result = battle_executor.execute_all(callback=callback)['success']
             return { "type": "battle_executor", "result": result}
 
+    def wait_until_stable(self, roi: Optional[Tuple[int, int, int, int]] = None, max_wait: float = 1.0,
+                          settle_frames: int = 2, min_wait: float = 0.1) -> bool:
+        """
+        等待画面区域停止变化，最多等待max_wait秒
+        :param roi: 检测区域(x1, y1, x2, y2)，None为全屏
+        :param max_wait: 最长等待时间(秒)
+        :param settle_frames: 连续无变化的帧数
+        :param min_wait: 最短等待时间(秒)
+        :return: 画面是否已稳定
+        """
+        return self.device_manager.wait_until_stable(roi, max_wait=max_wait, settle_frames=settle_frames, min_wait=min_wait)
+
     def open_minimap(self):
         """
         点击小地图
         """
-        time.sleep(0.2)
+        self.wait_until_stable(max_wait=0.2, min_wait=0)
         self.device_manager.click(1060,100)
-        time.sleep(0.2)
+        self.wait_until_stable(max_wait=0.2)
     
     def closeUI(self):
         self.device_manager.click(1235, 25)
-        time.sleep(0.2)
+        self.wait_until_stable(max_wait=0.2)
 
     def find_closest_point(self, target: tuple[int, int], points: list[tuple[int, int]]) -> Optional[tuple[int, int]]:
         """
@@ -987,19 +953,15 @@ class World:
         return closest
 
     def run_left(self):
-        device = self.device_manager.device
-        if device:
-            device.swipe(640, 350, 590, 350, 0.05)
+        self.device_manager.swipe(640, 350, 590, 350, 0.05)
 
     def run_right(self):
-        device = self.device_manager.device
-        if device:
-            device.swipe(640, 350, 690, 350, 0.05)
+        self.device_manager.swipe(640, 350, 690, 350, 0.05)
 
     def click_confirm_pos(self):
         self.device_manager.click(800,485)
     
-    def click_confirm_yes(self, image:Image.Image|None=None, click:bool = True, wait_time:float=0.2):
+    def click_confirm_yes(self, image:Frame|None=None, click:bool = True, wait_time:float=0.2):
         if image is None:
             image = self.device_manager.get_screenshot()
         find = self.ocr_handler.match_image(image, "assets/confirm_yes.png")
@@ -1007,13 +969,13 @@ class World:
             logger.info("[click_confirm_yes]检测到按钮-是")
             if click:
                 self.device_manager.click(find[0],find[1])
-                time.sleep(wait_time)
+                clock.sleep(wait_time)
                 logger.info("[click_confirm_yes]点击按钮-是")
             return True
         else:
             return False
         
-    def click_confirm(self, image:Image.Image|None=None, click:bool = True):
+    def click_confirm(self, image:Frame|None=None, click:bool = True):
         if image is None:
             image = self.device_manager.get_screenshot()
         find = self.ocr_handler.match_image(image, "assets/confirm.png")
@@ -1021,7 +983,7 @@ class World:
             logger.info("[click_confirm]检测到按钮-是")
             if click:
                 self.device_manager.click(find[0],find[1])
-                time.sleep(0.2)
+                clock.sleep(0.2)
                 logger.info("[click_confirm]点击按钮-是")
             return True
         else:
@@ -1029,15 +991,15 @@ class World:
         
     def get_map_name(self):
         sleep_until(self.in_world,timeout=5)
-        time.sleep(0.5)
+        clock.sleep(0.5)
         sleep_until(self.in_world,timeout=5)
-        time.sleep(0.5)
+        clock.sleep(0.5)
         self.open_minimap()
         sleep_until(self.in_minimap,timeout=5)
         count = 0
         max_count = 5
         while count < max_count:
-            time.sleep(0.5)
+            clock.sleep(0.5)
             screenshot = self.device_manager.get_screenshot()
             result = self.ocr_handler.recognize_text(screenshot,(85, 13,385, 92))
             texts = []
@@ -1056,9 +1018,9 @@ class World:
     def openMap(self):
         logger.info("打开地图")
         self.device_manager.click(875, 613)
-        time.sleep(2)
+        self.wait_until_stable(max_wait=2, min_wait=0.3)
 
-    def _search_map_text(self, map_name: str, screenshot: Optional[Image.Image] = None) -> Optional[tuple[int, int]]:
+    def _search_map_text(self, map_name: str, screenshot: Optional[Frame] = None) -> Optional[tuple[int, int]]:
         """
         在当前截图中搜索指定地图名称并返回坐标
         
@@ -1089,11 +1051,11 @@ class World:
         :param end: 结束坐标 (x, y)
         """
         self.device_manager.press_down(start[0], start[1])
-        time.sleep(0.1)
+        clock.sleep(0.1)
         self.device_manager.press_move(end[0], end[1])
-        time.sleep(0.1)
+        clock.sleep(0.1)
         self.device_manager.press_up(end[0], end[1])
-        time.sleep(0.5)
+        clock.sleep(0.5)
 
     def tpAnywhere(self, map_name: str) -> bool:
         """
@@ -1116,7 +1078,7 @@ class World:
             logger.info("不在世界中，无法传送")
             return False
             
-        time.sleep(1.5)
+        self.wait_until_stable(max_wait=1.5)
         self.openMap()
         self.nomalize_map()
 
@@ -1156,15 +1118,15 @@ class World:
         # 点击地图
         logger.info(f"点击地图: {map_pos}")
         self.device_manager.click(map_pos[0],map_pos[1])
-        time.sleep(1)
+        clock.sleep(1)
         # 前往
         logger.info(f"点击前往")
         self.device_manager.click(1153, 632)
-        time.sleep(1)
+        clock.sleep(1)
         # 部分需要选择入口
         logger.info(f"点击入口")
         self.device_manager.click(631, 281)
-        time.sleep(1)
+        clock.sleep(1)
         # 确认
         logger.info(f"点击确认")
         self.click_confirm_pos()
@@ -1178,7 +1140,7 @@ class World:
     def scale_map(self):
         logger.info("缩放地图")
         self.device_manager.click(1210, 649)
-        time.sleep(1)
+        clock.sleep(1)
 
     def nomalize_map(self):
         logger.info("等待地图界面")
@@ -1194,24 +1156,24 @@ class World:
             self.device_manager.press_down(start[0],start[1])
             self.device_manager.press_move(end[0],end[1])
             self.device_manager.press_up(end[0],end[1])
-            time.sleep(0.5)
+            clock.sleep(0.5)
 
     def move_mini_map(self,x,y,save:bool=True):
         self.device_manager.click(1060,100)
-        time.sleep(1)
+        clock.sleep(1)
         sleep_until(self.in_minimap,timeout=5)
         self.device_manager.click(x,y)
-        time.sleep(1)
+        clock.sleep(1)
         sleep_until(self.in_world)
         if save:
-            time.sleep(0.5)
+            clock.sleep(0.5)
             self.save_by_mini_map()
-            time.sleep(0.5)
+            clock.sleep(0.5)
 
     def save_by_mini_map(self):
         self.device_manager.click(226, 607)
-        time.sleep(1)
+        clock.sleep(1)
         while not self.in_world():
-            time.sleep(0.5)
+            clock.sleep(0.5)
             self.closeUI()
-            time.sleep(0.5)
\ No newline at end of file
+            clock.sleep(0.5)
\ No newline at end of file
@@ -1,14 +1,15 @@
-import time
-import threading
+from utils import clock
 from utils import logger
 from common.app import AppManager
 from core.device_manager import DeviceManager
 from core.ocr_handler import OCRHandler
 from typing import Callable, Optional, Tuple, TYPE_CHECKING
-from PIL import Image
+from core.frame import Frame
 from utils.singleton import singleton
 from common.config import Monster, config
 from utils.sleep_utils import sleep_until
+from core.change_detector import roi_cached
+from core.screen_classifier import Screen, screen_classifier
 
 if TYPE_CHECKING:
     from common.world import World
@@ -56,6 +57,13 @@ class Battle:
         self.wait_done_timeout = config.battle.wait_done_timeout
         self.boost_timeout = config.battle.boost_timeout
         self.switch_all_timeout = config.battle.switch_all_timeout
+        # 登记回合判断取色点所在区域，供区域截图使用
+        self.device_manager.register_roi("Battle.in_round", (952, 637, 1135, 667))
+        # 登记界面判断，供界面分类器使用
+        screen_classifier.register(Screen.BATTLE_FAIL, self._is_battle_fail)
+        screen_classifier.register(Screen.IN_ROUND, self._is_in_round)
+        screen_classifier.register(Screen.BATTLE_END, self.battle_end)
+        screen_classifier.register(Screen.BATTLE, self.in_battle)
         
         # 注册到服务定位器
         from utils.service_locator import register_service
@@ -77,50 +85,24 @@ class Battle:
 
     # ================== 战斗状态判断相关方法 ==================
 
-    def all_dead(self, image: Optional[Image.Image] = None) -> bool:
+    def all_dead(self, image: Optional[Frame] = None) -> bool:
         if image is None:
             image = self.device_manager.get_screenshot()
         if image is None:
             logger.warning("无法获取截图，无法判断是否全灭")
             return False
-        points_colors_vip = [
-            (622, 177, 'FEFAF9', 1),
-            (621, 189, 'FFFEFD', 1),
-            (622, 198, 'FFFEFF', 1),
-            (612, 205, 'FEFEFE', 1),
-            (630, 206, 'FBFFFF', 1)
-        ]
-        points_colors_no_vip = [
-            (461, 484, '5C5C5C', 1),
-            (818, 485, '37677D', 1),
-            (669, 210, 'FEFEFE', 1),
-            (670, 235, 'FFFFFF', 1),
-            (612, 237, 'FFFFFF', 1),
-            (612, 219, 'F3F3F3', 1),
-        ]
-        points_colors_failed = [
-            (612, 210, 'FFFFFF', 1),
-            (630, 210, 'FFFFFD', 1),
-            (671, 231, 'FFFFFD', 1),
-            (609, 219, 'FFFFFF', 1),
-            (621, 490, '39697F', 1),
-        ]
-        # 批量判断
-        results = self.ocr_handler.match_point_color(image, points_colors_vip)
-        if not results:
-            results = self.ocr_handler.match_point_color(image, points_colors_no_vip)
-        if not results:
-            results = self.ocr_handler.match_point_color(image, points_colors_failed)
+        results = self.ocr_handler.match_signature(image, "all_dead")
         world = self.world or self._get_world()
         if results and world and world.click_confirm_yes(image, click=False):
             logger.debug("检测到在战斗回合中全灭")
-            time.sleep(self.wait_time)
+            clock.sleep(self.wait_time)
             return True
         else:
             logger.debug("不在战斗回合中全灭")
             return False
     
-    def battle_end(self, image: Optional[Image.Image] = None) -> bool:
+    @roi_cached()
+    def battle_end(self, image: Optional[Frame] = None) -> bool:
         if image is None:
             image = self.device_manager.get_screenshot()
         if image is None:
@@ -134,7 +116,8 @@ class Battle:
             logger.debug("不在战斗结算")
             return False
     
-    def in_battle(self, image: Optional[Image.Image] = None) -> bool:
+    @roi_cached((1028, 6, 1272, 587))
+    def in_battle(self, image: Optional[Frame] = None) -> bool:
         """
         判断当前是否在战斗中。
         """
@@ -144,27 +127,37 @@ class Battle:
             logger.warning("无法获取截图，无法判断是否在战斗中")
             return False
         region = (1028, 6, 1272, 587)
-        find = self.ocr_handler.match_image_multi(image, "assets/hp_alive_front.png",region = region)
-        if find and len(find) > 0:
-            logger.debug("检测到在战斗中")
-            return True
-        find = self.ocr_handler.match_image_multi(image, "assets/hp_alive_back.png",region = region)
-        if find and len(find) > 0:
+        # 前排、后排血条并行匹配
+        found = self.ocr_handler.match_many(image, {
+            "front": {"template": "assets/hp_alive_front.png", "region": region, "multi": True},
+            "back": {"template": "assets/hp_alive_back.png", "region": region, "multi": True},
+        })
+        if found["front"] or found["back"]:
             logger.debug("检测到在战斗中")
             return True
         return False
     
-    def not_in_battle(self, image: Optional[Image.Image] = None) -> bool:
+    def _is_in_round(self, image: Frame) -> bool:
+        """回合操作界面判断(不等待)，供界面分类器使用"""
+        return self.ocr_handler.match_signature(image, "in_round") and self.in_battle(image)
+
+    def _is_battle_fail(self, image: Frame) -> bool:
+        """战斗中全灭弹窗判断(不等待)，供界面分类器使用"""
+        if not self.ocr_handler.match_signature(image, "all_dead") or not self.in_battle(image):
+            return False
+        world = self.world or self._get_world()
+        return bool(world and world.click_confirm_yes(image, click=False))
+
+    def not_in_battle(self, image: Optional[Frame] = None) -> bool:
         """
         判断当前是否不在战斗中。
         """
         return not self.in_battle(image)
     
-    def in_round(self, image: Optional[Image.Image] = None) -> bool:
+    def in_round(self, image: Optional[Frame] = None) -> bool:
         """
         判断当前是否在战斗回合中。
         :param image: 可选，外部传入截图
-        :param points_colors: 可选，[(x, y, color, range)] 数组，默认用原有6点
         :return: bool
         """
         if image is None:
@@ -172,25 +165,16 @@ class Battle:
         if image is None:
             logger.warning("无法获取截图，无法判断是否在战斗回合中")
             return False
-        points_colors = [
-            (1061,639, "FFFFFF", 1),
-            (1061,639, "FFFFFF", 1),
-            (1060,659, "FFFFFF", 1),
-            (1133,650, "FFFFFF", 1),
-            (1131,665, "FFFFFF", 1),
-            (954, 652, '011017', 1),
-        ]
-        # 批量判断
-        results = self.ocr_handler.match_point_color(image, points_colors)
+        results = self.ocr_handler.match_signature(image, "in_round")
         if results and self.in_battle(image):
             logger.debug("检测到在战斗回合中")
-            time.sleep(self.wait_time)
+            clock.sleep(self.wait_time)
             return True
         else:
             logger.debug("不在战斗回合中")
             return False
 
-    def not_in_round(self, image: Optional[Image.Image] = None) -> bool:
+    def not_in_round(self, image: Optional[Frame] = None) -> bool:
         if image is None:
             image = self.device_manager.get_screenshot()
         if image is None:
@@ -198,7 +182,7 @@ class Battle:
             return False
         return not self.in_round(image)
     
-    def in_sp_on(self, image: Optional[Image.Image] = None) -> bool:
+    def in_sp_on(self, image: Optional[Frame] = None) -> bool:
         """
         判断当前是否在技能释放中。
         :param image: 可选，外部传入截图
@@ -209,116 +193,73 @@ class Battle:
         if image is None:
             logger.warning("无法获取截图，无法判断是否在技能释放中")
             return False
-        points_colors = [
-            (661,152, "F8F8FE", 1),
-            (633,173, "E8E9EA", 1),
-            (705,173, "E8E9EA", 1),
-            (660,169, "F8F8FE", 1),
-        ]
-        # 批量判断
-        results = self.ocr_handler.match_point_color(image, points_colors)
+        results = self.ocr_handler.match_signature(image, "sp_on")
         return results and self.in_battle(image)
 
-    def in_skill_on(self, image: Optional[Image.Image] = None) -> bool:
+    def in_skill_on(self, image: Optional[Frame] = None) -> bool:
         if image is None:
             image = self.device_manager.get_screenshot()
         if image is None:
             logger.warning("无法获取截图，无法判断是否在技能释放中")
             return False
-        points_colors = [
-            (798, 203, '28292B', 1),
-            (718, 204, 'F8F6F7', 1),
-            (772, 176, '1E1F21', 1)
-        ]
-        results = self.ocr_handler.match_point_color(image, points_colors)
+        results = self.ocr_handler.match_signature(image, "skill_on")
         return results and self.in_battle(image)
     
-    def in_auto_off(self, image: Optional[Image.Image] = None) -> bool:
+    def in_auto_off(self, image: Optional[Frame] = None) -> bool:
         if image is None:
             image = self.device_manager.get_screenshot()
         if image is None:
             logger.warning("无法获取截图，无法判断是否在技能释放中")
             return False
-        points_colors = [
-            (443, 657, '4E4D4B', 1),
-            (537, 655, '4F5450', 1),
-            (489, 677, '0A0907', 1),
-        ]
-        results = self.ocr_handler.match_point_color(image, points_colors)
+        results = self.ocr_handler.match_signature(image, "auto_off")
         return results and self.in_battle(image)
 
-    def in_auto_on(self, image: Optional[Image.Image] = None) -> bool:
+    def in_auto_on(self, image: Optional[Frame] = None) -> bool:
         if image is None:
             image = self.device_manager.get_screenshot()
         if image is None:
             logger.warning("无法获取截图，无法判断是否在技能释放中")
             return False
-        points_colors = [
-            (442, 652, 'DFDEDC', 1),
-            (536, 652, 'DDDBE0', 1),
-            (534, 665, '201F25', 1),
-        ]
-        # 批量判断
-        results = self.ocr_handler.match_point_color(image, points_colors)
+        results = self.ocr_handler.match_signature(image, "auto_on")
         return results and self.in_battle(image)
     
-    def in_switch_on(self, image: Optional[Image.Image] = None) -> bool:
+    def in_switch_on(self, image: Optional[Frame] = None) -> bool:
         if image is None:
             image = self.device_manager.get_screenshot()
         if image is None:
             logger.warning("无法获取截图，无法判断是否在技能释放中")
             return False
-        points_colors = [
-            (830, 658, 'E2D9DA', 1),
-            (753, 657, 'DAD9D4', 1),
-        ]
-        # 批量判断
-        results = self.ocr_handler.match_point_color(image, points_colors)
+        results = self.ocr_handler.match_signature(image, "switch_on")
         return results and self.in_battle(image)
 
-    def in_switch_off(self, image: Optional[Image.Image] = None) -> bool:
+    def in_switch_off(self, image: Optional[Frame] = None) -> bool:
         if image is None:
             image = self.device_manager.get_screenshot()
         if image is None:
             logger.warning("无法获取截图，无法判断是否在技能释放中")
             return False
-        points_colors = [
-            (832, 658, '4F443E', 1),
-            (753, 658, '4E4D4B', 1),
-        ]
-        # 批量判断
-        results = self.ocr_handler.match_point_color(image, points_colors)
+        results = self.ocr_handler.match_signature(image, "switch_off")
         return results and self.in_battle(image)
     
-    def in_boost_on(self, image: Optional[Image.Image] = None) -> bool:
+    def in_boost_on(self, image: Optional[Frame] = None) -> bool:
         if image is None:
             image = self.device_manager.get_screenshot()
         if image is None:
             logger.warning("无法获取截图，无法判断是否在技能释放中")
             return False
-        points_colors = [
-            (918, 658, '7C7C7C', 1),
-            (869, 657, '848283', 1),
-        ]
-        # 批量判断
-        results = self.ocr_handler.match_point_color(image, points_colors)
+        results = self.ocr_handler.match_signature(image, "boost_on")
         return results and self.in_battle(image)
 
-    def in_boost_off(self, image: Optional[Image.Image] = None) -> bool:
+    def in_boost_off(self, image: Optional[Frame] = None) -> bool:
         if image is None:
             image = self.device_manager.get_screenshot()
         if image is None:
             logger.warning("无法获取截图，无法判断是否在技能释放中")
             return False
-        points_colors = [
-            (918, 659, '0B090C', 1),
-            (872, 660, '010002', 1),
-        ]
-        # 批量判断
-        results = self.ocr_handler.match_point_color(image, points_colors)
+        results = self.ocr_handler.match_signature(image, "boost_off")
         return results and self.in_battle(image)
 
-    def in_front_on(self, image: Optional[Image.Image] = None) -> bool:
+    def in_front_on(self, image: Optional[Frame] = None) -> bool:
         """
         判断当前是否在前排。
         :param image: 可选，外部传入截图
@@ -329,15 +270,11 @@ class Battle:
         if image is None:
             logger.warning("无法获取截图，无法判断是否在技能释放中")
             return False
-        points_colors = [
-            (791, 27, 'C8CAC9', 1),
-            (796, 30, 'E4E8E7', 1),
-        ]
-        results = self.ocr_handler.match_point_color(image, points_colors)
+        results = self.ocr_handler.match_signature(image, "front_on")
         logger.debug(f"判断当前是否在前排: {results}")
         return results and self.in_skill_on(image)
     
-    def in_back_on(self, image: Optional[Image.Image] = None) -> bool:
+    def in_back_on(self, image: Optional[Frame] = None) -> bool:
         """
         判断当前是否在后排。
         :param image: 可选，外部传入截图
@@ -348,11 +285,7 @@ class Battle:
         if image is None:
             logger.warning("无法获取截图，无法判断是否在技能释放中")
             return False  
-        points_colors = [
-            (785, 26, 'F3F5F2', 1),
-            (792, 15, 'C7C8C3', 1),
-        ]
-        results = self.ocr_handler.match_point_color(image, points_colors)
+        results = self.ocr_handler.match_signature(image, "back_on")
         logger.debug(f"判断当前是否在后排: {results}")
         return results and self.in_skill_on(image)
             
@@ -368,13 +301,13 @@ class Battle:
         logger.debug("auto_battle 战斗场景中,等待回合")
         if not self.in_round(screenshot):
             return False
-        start_time = time.time()
+        start_time = clock.time()
         is_auto_start = False
         while True: 
-            if time.time() - start_time > timeout:
+            if clock.time() - start_time > timeout:
                 logger.info(f"[battle]auto_battle 超时")
                 return False
-            time.sleep(0.4)
+            clock.sleep(0.4)
             screenshot = self.device_manager.get_screenshot()
             if screenshot is None:
                 logger.error("[battle]auto_battle 无法获取截图")
@@ -400,9 +333,9 @@ class Battle:
         """
         if timeout is None:
             timeout = self.check_dead_timeout
-        start_time = time.time()
+        start_time = clock.time()
         while True:
-            if time.time() - start_time > timeout:
+            if clock.time() - start_time > timeout:
                 logger.info(f"[battle]check_dead没有检查到阵亡")
                 return False
             image = self.device_manager.get_screenshot()
@@ -433,7 +366,7 @@ class Battle:
                 results = self.ocr_handler.match_point_color(image, [(role_point[0], role_point[1], role_point[2], role_point[3])]) and self.in_battle(image)
                 if results:
                     return True
-            time.sleep(0.2)
+            clock.sleep(0.2)
 
     def reset_round(self, timeout: Optional[float] = None) -> bool:
         """
@@ -441,13 +374,13 @@ class Battle:
         """
         if timeout is None:
             timeout = self.reset_round_timeout
-        start_time = time.time()
+        start_time = clock.time()
         while not self.in_round() and self.in_battle():
-            if time.time() - start_time > timeout:
+            if clock.time() - start_time > timeout:
                 logger.info(f"[battle]reset_round 超时")
                 return False
             self.device_manager.click(135,25)
-            time.sleep(0.1)
+            clock.sleep(0.1)
         return True
             
     def exit_battle(self, timeout: Optional[float] = None) -> bool:
@@ -456,32 +389,32 @@ class Battle:
         """
         if timeout is None:
             timeout = self.exit_battle_timeout
-        start_time = time.time()
+        start_time = clock.time()
         while not self.in_round():
-            if time.time() - start_time > timeout:
+            if clock.time() - start_time > timeout:
                 logger.info(f"[battle]exit_battle in_round 超时")
                 return False
             self.device_manager.click(135,25)
-            time.sleep(0.1)
-        start_time = time.time()
+            clock.sleep(0.1)
+        start_time = clock.time()
         logger.info(f"[battle]exit_battle in_round")
-        time.sleep(0.2)
+        clock.sleep(0.2)
         if self.in_battle():
             logger.info(f"[battle]exit_battle 点击放弃战斗")
             self.device_manager.click(592, 658)
-            time.sleep(1)
+            clock.sleep(1)
         if self.in_battle():
             logger.info(f"[battle]exit_battle 选择放弃战斗")
             self.device_manager.click(800, 485)
-            time.sleep(1)
+            clock.sleep(1)
         if self.in_battle():
             logger.info(f"[battle]exit_battle 确认放弃战斗")
             self.device_manager.click(800, 485)
-            time.sleep(1)
+            clock.sleep(1)
             return True
         return False
 
-    def switch_back_role(self, image: Optional[Image.Image] = None, timeout:float = 5) -> bool:
+    def switch_back_role(self, image: Optional[Frame] = None, timeout:float = 5) -> bool:
         """
         切换到后排角色
         """
@@ -489,20 +422,20 @@ class Battle:
         if image is None:
             image = self.device_manager.get_screenshot()
         # 设置超时时间为5秒
-        start_time = time.time()
+        start_time = clock.time()
         while True:
             # 检查是否超时
-            if time.time() - start_time > timeout:
+            if clock.time() - start_time > timeout:
                 logger.info("[Battle] switch_back_role超时")
                 return False
             if self.in_back_on(image):
                 logger.debug("[Battle] 切换后排角色完成")
-                time.sleep(self.wait_time + self.wait_ui_time)
+                clock.sleep(self.wait_time + self.wait_ui_time)
                 return True
             if self.in_front_on(image):
                 logger.debug("[Battle] 点击切换后排角色")
                 self.device_manager.click(1115, 640)
-                time.sleep(self.wait_time + self.wait_ui_time)
+                clock.sleep(self.wait_time + self.wait_ui_time)
             image = self.device_manager.get_screenshot()
 
     def cast_ex(self, index:int,bp:int = 0, role_id:int = 0, x: int = 0, y: int = 0, switch: bool = False) -> bool:
@@ -549,7 +482,7 @@ class Battle:
             logger.info("[Battle] 不在回合中超时")
             return False
         self.device_manager.click(role_pos[0], role_pos[1])
-        time.sleep(self.wait_time + self.wait_ui_time)
+        clock.sleep(self.wait_time + self.wait_ui_time)
         if not sleep_until(self.in_skill_on,timeout=timeout):
             logger.info("[Battle] 不在技能面板超时")
             return False
@@ -558,10 +491,10 @@ class Battle:
         if enemy_pos is not None:
             self.device_manager.click(*enemy_pos)
             logger.info(f"[Battle] 点击敌人坐标: {enemy_pos}")
-            time.sleep(self.wait_time)
+            clock.sleep(self.wait_time)
         logger.info("[Battle] 技能界面中,切换额外技能界面")
         self.device_manager.click(696, 96)
-        time.sleep(self.wait_time + self.wait_ui_time)
+        clock.sleep(self.wait_time + self.wait_ui_time)
         if not sleep_until(self.in_sp_on,timeout=timeout):
             logger.info("[Battle] 不在技能面板超时")
             return False
@@ -569,7 +502,7 @@ class Battle:
         # 点击修正坐标1与修正坐标2,兼容必杀技\支炎兽\ex技能时点击必杀选项,切换到必杀选项
         for pos in normalize_pos:
             self.device_manager.click(pos[0], pos[1])
-        time.sleep(self.wait_time + self.wait_ui_time)
+        clock.sleep(self.wait_time + self.wait_ui_time)
         logger.info("[Battle] 校正界面")
         if bp > 0:
             logger.info(f"[Battle] 拖动选择BP{bp}")
@@ -582,17 +515,17 @@ class Battle:
         # 点击发动按钮,兼容必杀技\支炎兽\ex技能时点击必杀发动选项
         for pos in click_pos:
             self.device_manager.click(pos[0], pos[1])
-            time.sleep(self.wait_time + self.wait_ui_time)
+            clock.sleep(self.wait_time + self.wait_ui_time)
             if self.in_round():
                 break
         logger.info(f"[Battle] 点击发动按钮")
-        time.sleep(self.wait_time + self.wait_ui_time)
+        clock.sleep(self.wait_time + self.wait_ui_time)
         if role_id != 0:
             role_pos = (self.role_base_pos[0], self.role_base_pos[1] + (role_id-1)*self.rols_base_y_offset)
-            time.sleep(0.5)
+            clock.sleep(0.5)
             self.device_manager.click(*role_pos)
             logger.info(f"[Battle] 点击配置角色{role_id} {role_pos}")
-            time.sleep(self.wait_time + self.wait_ui_time)
+            clock.sleep(self.wait_time + self.wait_ui_time)
         return True     
                       
 
@@ -616,7 +549,7 @@ class Battle:
             logger.info("[Battle] 不在回合中超时")
             return False
         self.device_manager.click(role_pos[0], role_pos[1])
-        time.sleep(self.wait_time + self.wait_ui_time)
+        clock.sleep(self.wait_time + self.wait_ui_time)
         if not sleep_until(self.in_skill_on,timeout=timeout):
             logger.info("[Battle] 不在技能面板超时")
             return False
@@ -625,14 +558,14 @@ class Battle:
             return False
         self.device_manager.click(960, 40)
         logger.info(f"[Battle] 点击潜力切换按钮")
-        time.sleep(self.wait_time + self.wait_ui_time)
+        clock.sleep(self.wait_time + self.wait_ui_time)
         if not sleep_until(self.in_skill_on,timeout=timeout):
             logger.info("[Battle] 不在技能面板超时")
             return False
         if enemy_pos:
             logger.info(f"[Battle] 点击敌人坐标: {enemy_pos}")
             self.device_manager.click(enemy_pos[0], enemy_pos[1])
-            time.sleep(self.wait_time + self.wait_ui_time)
+            clock.sleep(self.wait_time + self.wait_ui_time)
         if bp == 0:
             logger.info(f"[Battle] 点击选择技能")
             self.device_manager.click(skill_start[0], skill_start[1])
@@ -643,7 +576,7 @@ class Battle:
             logger.info(f"[Battle] 点击配置角色{role_id}")
             skill_role_pos = (self.role_base_pos[0], self.role_base_pos[1] + (role_id-1)*self.rols_base_y_offset)
             self.device_manager.click(skill_role_pos[0], skill_role_pos[1])
-        time.sleep(self.wait_time + self.wait_ui_time)
+        clock.sleep(self.wait_time + self.wait_ui_time)
         return True
 
     def cast_sp(self, index:int, role_id:int = 0, x: int = 0, y: int = 0, 
@@ -672,10 +605,10 @@ class Battle:
         if enemy_pos is not None:
             self.device_manager.click(*enemy_pos)
             logger.info(f"[Battle] 点击敌人坐标: {enemy_pos}")
-            time.sleep(self.wait_time)
+            clock.sleep(self.wait_time)
         logger.info("[Battle] 技能界面中,切换额外技能界面")
         self.device_manager.click(696, 96)
-        time.sleep(self.wait_time + self.wait_ui_time)
+        clock.sleep(self.wait_time + self.wait_ui_time)
         if not sleep_until(self.in_sp_on,timeout=timeout):
             logger.info("[Battle] 不在技能面板超时")
             return False
@@ -683,19 +616,19 @@ class Battle:
         normalize_pos = [(560, 210),(680, 210)]
         for pos in normalize_pos:
             self.device_manager.click(pos[0], pos[1])
-        time.sleep(self.wait_time + self.wait_ui_time)
+        clock.sleep(self.wait_time + self.wait_ui_time)
         # 点击发动按钮,兼容必杀技\支炎兽\ex技能时点击必杀发动选项
         normalize_pos = [(941, 525),(942, 464)]
         for pos in normalize_pos:
             self.device_manager.click(pos[0], pos[1])
         logger.info(f"[Battle] 点击发动按钮")
-        time.sleep(self.wait_time + self.wait_ui_time)
+        clock.sleep(self.wait_time + self.wait_ui_time)
         if role_id != 0:
             role_pos = (self.role_base_pos[0], self.role_base_pos[1] + (role_id-1)*self.rols_base_y_offset)
-            time.sleep(0.5)
+            clock.sleep(0.5)
             self.device_manager.click(*role_pos)
             logger.info(f"[Battle] 点击配置角色{role_id} {role_pos}")
-            time.sleep(self.wait_time + self.wait_ui_time)
+            clock.sleep(self.wait_time + self.wait_ui_time)
         return True
 
     def cast_skill(self, index: int = 1,skill: int = 1, bp: int = 0, role_id: int = 0,  x: int = 0, y: int = 0,
@@ -735,7 +668,7 @@ class Battle:
             return False
         logger.info("[Battle] 选择角色")
         self.device_manager.click(role_pos[0], role_pos[1])
-        time.sleep(self.wait_time + self.wait_ui_time)
+        self.device_manager.wait_until_stable(max_wait=self.wait_time + self.wait_ui_time)
         if not sleep_until(self.in_skill_on,timeout=timeout):
             logger.info("[Battle] 不在技能面板超时")
             return False
@@ -746,7 +679,7 @@ class Battle:
         if enemy_pos:
             logger.info(f"[Battle] 点击敌人坐标: {enemy_pos}")
             self.device_manager.click(enemy_pos[0], enemy_pos[1])
-            time.sleep(self.wait_time + self.wait_ui_time)
+            self.device_manager.wait_until_stable(max_wait=self.wait_time + self.wait_ui_time)
         if bp == 0:
             logger.info(f"[Battle] 点击选择技能")
             self.device_manager.click(skill_start[0], skill_start[1])
@@ -757,7 +690,7 @@ class Battle:
             logger.info(f"[Battle] 点击配置角色{role_id}")
             skill_role_pos = (self.role_base_pos[0], self.role_base_pos[1] + (role_id-1)*self.rols_base_y_offset)
             self.device_manager.click(skill_role_pos[0], skill_role_pos[1])
-        time.sleep(self.wait_time + self.wait_ui_time)
+        self.device_manager.wait_until_stable(max_wait=self.wait_time + self.wait_ui_time)
         return True
                 
 
@@ -775,35 +708,37 @@ class Battle:
                 logger.info(f"[Battle] 点击空白区域")
                 self.device_manager.click(135,25)
                 count += 1
-            time.sleep(self.wait_time)
+            clock.sleep(self.wait_time)
         logger.info(f"[Battle] 点击攻击按钮")
         self.device_manager.click(1100, 660)
-        time.sleep(0.5)
+        clock.sleep(0.5)
         result = sleep_until(self.not_in_round,timeout=self.attack_timeout)
         if not result:
             logger.info(f"[Battle] 攻击等待超时")
             return False
         return result
     
-    def wait_in_round_or_world(self, callback:Callable[[Image.Image], str|None]|None = None, timeout: Optional[float] = None) -> str:
+    def wait_in_round_or_world(self, callback:Callable[[Frame], str|None]|None = None, timeout: Optional[float] = None) -> str:
         """
         等待回合开始或进入世界
         """
         if timeout is None:
             timeout = self.wait_in_round_timeout
-        start_time = time.time()
+        start_time = clock.time()
         while True:
-            if time.time() - start_time > timeout:
+            if clock.time() - start_time > timeout:
                 return 'wait_done_timeout'
             screenshot = self.device_manager.get_screenshot()
             if screenshot is None or not self.world:
                 logger.error("[wait_in_round_or_world] 无法获取截图")
                 return 'exception'
-            if self.in_round(screenshot):
+            screen = screen_classifier.classify(screenshot, (Screen.IN_ROUND, Screen.WORLD, Screen.BATTLE_END))
+            if screen == Screen.IN_ROUND:
+                clock.sleep(self.wait_time)
                 return 'in_round'
-            if self.world.in_world(screenshot):
+            if screen == Screen.WORLD:
                 return 'in_world'
-            if self.battle_end(screenshot):
+            if screen == Screen.BATTLE_END:
                 logger.info("[wait_in_round_or_world] 战斗结算")
                 self.world.dclick_tirm(6)
             if callback:
@@ -812,17 +747,17 @@ class Battle:
                 logger.debug(f"[wait_in_round_or_world] 执行回调结果: {result}")
                 if result is not None:
                     return result
-            time.sleep(self.wait_time)
+            clock.sleep(self.wait_time)
 
-    def wait_done(self, callback:Callable[[Image.Image], str|None]|None = None, timeout: Optional[float] = None) -> str:
+    def wait_done(self, callback:Callable[[Frame], str|None]|None = None, timeout: Optional[float] = None) -> str:
         """
         等待战斗结束
         """
         if timeout is None:
             timeout = self.wait_done_timeout
-        start_time = time.time()
+        start_time = clock.time()
         while True:
-            if time.time() - start_time > timeout:
+            if clock.time() - start_time > timeout:
                 logger.info("[wait_done] wait_done超时")
                 return 'wait_done_timeout'
             screenshot = self.device_manager.get_screenshot()
@@ -830,13 +765,15 @@ class Battle:
             if screenshot is None or not self.world:
                 logger.error("[wait_done] 无法获取截图")
                 return 'exception'
-            if self.world.in_world(screenshot):
+            screen = screen_classifier.classify(screenshot, (Screen.WORLD, Screen.IN_ROUND, Screen.BATTLE_END))
+            if screen == Screen.WORLD:
                 logger.info("[wait_done] 进入世界")
                 return 'in_world'
-            if self.in_round(screenshot):
+            if screen == Screen.IN_ROUND:
                 logger.info("[wait_done] in_round")
+                clock.sleep(self.wait_time)
                 return 'in_round'
-            if self.battle_end(screenshot):
+            if screen == Screen.BATTLE_END:
                 logger.info("[wait_done] 战斗结算")
                 self.world.dclick_tirm(6)
             if callback:
@@ -845,23 +782,31 @@ class Battle:
                 logger.debug(f"[wait_done] 执行回调结果: {result}")
                 if result is not None:
                     return result
-            time.sleep(self.wait_time)
+            clock.sleep(self.wait_time)
 
-    def check_battle_fail(self, image: Image.Image|None = None, type = 'tip'):
-        if image is None:
-           image = self.device_manager.get_screenshot()
+    def check_battle_fail(self, image: Frame|None = None, type = 'tip', detected: bool = False):
+        """
+        检测到全灭时点击放弃并确认
+        :param detected: 调用方已通过界面分类确认全灭时为True，不再重复判断
+        """
         world = self.world or self._get_world()
         if not world:
             return False
-        if not self.all_dead(image):
-            return False
+        if detected:
+            # 与all_dead命中后的等待一致
+            clock.sleep(self.wait_time)
+        else:
+            if image is None:
+                image = self.device_manager.get_screenshot()
+            if not self.all_dead(image):
+                return False
         logger.info(f"[check_battle_fail]检测到被全灭")
         self.device_manager.click(480,480)
         logger.info(f"[check_battle_fail]点击放弃")
-        time.sleep(self.wait_ui_time + 0.3)
+        clock.sleep(self.wait_ui_time + 0.3)
         self.device_manager.click(800,480)
         logger.info(f"[check_battle_fail]点击确认")
-        time.sleep(self.wait_ui_time + 0.3)
+        clock.sleep(self.wait_ui_time + 0.3)
         if type == 'tip':
             logger.info(f"[check_battle_fail]tip confirm")
             world.click_confirm_yes()
@@ -875,18 +820,18 @@ class Battle:
             logger.info("等待战斗开始")
             logger.info(f"长按按下,等待跳过")
             self.device_manager.press_down(100,20)
-            start_time = time.time()
+            start_time = clock.time()
             while not self.in_round():
-                if time.time() - start_time > timeout:
+                if clock.time() - start_time > timeout:
                     logger.info("[press_in_round] 等待超时")
                     logger.info(f"长按抬起")
                     self.device_manager.press_up(100,20)
                     return False
                 logger.info(f"等待跳过")
-                time.sleep(1)
+                clock.sleep(1)
             logger.info(f"长按抬起")
             self.device_manager.press_up(100,20)
-            time.sleep(0.5)
+            clock.sleep(0.5)
         except Exception as e:
             logger.warning(f"[press_in_round] 失败: {e}")
             return False
@@ -986,9 +931,9 @@ class Battle:
         全体加成
         """
         logger.info("[Battle] 全体加成")
-        time.sleep(self.boost_timeout)
+        clock.sleep(self.boost_timeout)
         self.device_manager.click(894, 655)
-        time.sleep(self.boost_timeout)
+        clock.sleep(self.boost_timeout)
         return True
 
     def cmd_attack(self) -> bool:
@@ -1004,9 +949,9 @@ class Battle:
         """
         if timeout is None:
             timeout = self.switch_all_timeout
-        start_time = time.time()
+        start_time = clock.time()
         while True:
-            if time.time() - start_time > timeout:
+            if clock.time() - start_time > timeout:
                 logger.info("[Battle] cmd_switch_all超时")
                 return False
             screenshot = self.device_manager.get_screenshot()
@@ -1016,7 +961,7 @@ class Battle:
             if self.in_switch_off(screenshot):
                 logger.info("[Battle] 全员交替off")
                 self.device_manager.click(792, 659)
-            time.sleep(self.wait_time)
+            clock.sleep(self.wait_time)
 
     def cmd_sp_skill(self, index: int = 1, role_id:int = 0, x:int = 0, y:int = 0) -> bool:
         """
@@ -1040,7 +985,7 @@ class Battle:
         :param seconds: 等待秒数
         """
         logger.debug(f"[Battle] 等待 {seconds} 秒")
-        time.sleep(seconds)
+        clock.sleep(seconds)
         return True
 
     def cmd_skip(self, seconds: float = 1.0) -> bool:
@@ -1121,31 +1066,13 @@ class Battle:
             return
         logger.info(f"[find_enemy_ocr] 开始识别敌人")
         for pos in monster_pos:
-            # 创建线程停止事件
-            stop_event = threading.Event()
-            def click_thread(device_manager, pos, stop_event):
-                """
-                持续点击指定位置的子线程
-                :param device_manager: 设备管理器实例
-                :param pos: 点击位置坐标元组 (x,y)
-                :param stop_event: 线程停止事件
-                """
-                while not stop_event.is_set():
-                    device_manager.click(pos[0], pos[1])
-                    time.sleep(0.05)  # 短暂间隔避免点击过快
-            # 启动点击线程        
-            thread = threading.Thread(
-                target=click_thread,
-                args=(self.device_manager, pos, stop_event),
-                daemon=True  # 设置为守护线程,主线程结束时自动结束
-            )
-            thread.start()
+            # 识别期间由输入分发线程持续点击该位置，间隔避免点击过快
+            self.device_manager.start_repeat_click(pos[0], pos[1], interval=0.05)
             # 使用识别时间进行循环识别
-            start_time = time.time()
+            start_time = clock.time()
             logger.info(f"[find_enemy_ocr] 开始识别敌人,pos={pos},time={self.recognition_time}")
-            self.device_manager.click(pos[0], pos[1])
             found_monster = None
-            while time.time() - start_time < self.recognition_time:
+            while clock.time() - start_time < self.recognition_time:
                 screenshot = self.device_manager.get_screenshot()
                 logger.info(f"[find_enemy_ocr] 获取截图")
                 result = self.ocr_handler.recognize_text(screenshot,(20,100,700,600))
@@ -1162,10 +1089,9 @@ class Battle:
                         break
                 if found_monster:
                     break
-                time.sleep(0.1)  # 短暂等待后再次识别
-            # 停止点击线程
-            stop_event.set()
-            thread.join(timeout=1.0)  # 等待线程结束，最多等待1秒
+                clock.sleep(0.1)  # 短暂等待后再次识别
+            # 停止持续点击
+            self.device_manager.stop_repeat_click(pos[0], pos[1])
             if found_monster:
                 return found_monster
         return None
\ No newline at end of file
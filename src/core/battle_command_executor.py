@@ -4,7 +4,7 @@ from typing import Callable, List, Dict, Any
 from core.battle import Battle
 from utils.sleep_utils import sleep_until
 from typing import TYPE_CHECKING
-from PIL import Image
+from core.frame import Frame
 if TYPE_CHECKING:
     from common.world import World
 class BattleCommandExecutor:
@@ -100,7 +100,7 @@ class BattleCommandExecutor:
             self.logger.error(f"加载TXT战斗指令配置失败: {e}")
             return False
 
-    def execute_all(self, callback:Callable[[Image.Image], str|None]|None = None) -> dict[str,bool|str]:
+    def execute_all(self, callback:Callable[[Frame], str|None]|None = None) -> dict[str,bool|str]:
         """
         顺序执行所有指令，遇到异常自动记录并继续
         支持通过修改 _current_index 来回退到指定命令位置
@@ -0,0 +1,186 @@
+import struct
+from typing import Any, List, Optional, Tuple
+import numpy as np
+import cv2
+from utils import logger
+
+
+class CaptureBackend:
+    """
+    截图后端基类
+    capture()统一返回BGR格式的np.ndarray(与OpenCV一致)，失败返回None
+    supports_roi为True的后端可通过capture_regions只读取和解码指定区域
+    """
+    name = "base"
+    supports_roi = False
+
+    def capture(self) -> Optional[np.ndarray]:
+        raise NotImplementedError
+
+    def capture_regions(self, rois: List[Tuple[int, int, int, int]]) -> Tuple[Optional[np.ndarray], Optional[List[Tuple[int, int, int, int]]]]:
+        """
+        只截取指定区域
+        :param rois: [(x1, y1, x2, y2), ...]
+        :return: (全尺寸BGR图像, 有效区域列表)，有效区域为None表示整帧有效；区域外像素为0
+        """
+        return self.capture(), None
+
+    def close(self) -> None:
+        """释放后端持有的连接等资源"""
+        pass
+
+
+class U2CaptureBackend(CaptureBackend):
+    """
+    uiautomator2截图后端
+    设备端压缩、主机端解码，兼容性最好
+    """
+    name = "u2"
+
+    def __init__(self, device: Any) -> None:
+        """
+        :param device: uiautomator2设备对象
+        """
+        self.device = device
+
+    def capture(self) -> Optional[np.ndarray]:
+        img = self.device.screenshot(format='opencv')
+        if img is None:
+            return None
+        if not isinstance(img, np.ndarray):
+            # 兼容返回PIL.Image的旧版本
+            img = cv2.cvtColor(np.asarray(img.convert('RGB')), cv2.COLOR_RGB2BGR)
+        return img
+
+
+class AdbRawCaptureBackend(CaptureBackend):
+    """
+    adb exec-out screencap原始帧截图后端
+    直接读取RGBA原始数据并用numpy.frombuffer解析，省去PNG编解码
+    """
+    name = "adb_raw"
+    supports_roi = True
+    # screencap原始格式中 RGBA_8888 的格式编号
+    PIXEL_FORMAT_RGBA_8888 = 1
+
+    def __init__(self, serial: str) -> None:
+        """
+        :param serial: adb设备序列号或地址
+        """
+        import adbutils
+        self.serial = serial
+        self._adb_device = adbutils.adb.device(serial=serial)
+        # 头部长度(12或16)，首次整帧截图时确定
+        self._header_size: Optional[int] = None
+
+    def _open_screencap(self):
+        conn = self._adb_device.open_transport()
+        conn.send_command("exec:screencap")
+        conn.check_okay()
+        return conn
+
+    def read_raw(self) -> bytes:
+        """执行screencap并读取全部原始数据"""
+        conn = self._open_screencap()
+        try:
+            return conn.read_until_close(encoding=None)
+        finally:
+            conn.close()
+
+    def capture(self) -> Optional[np.ndarray]:
+        data = self.read_raw()
+        if len(data) >= 12:
+            width, height, _ = struct.unpack_from("<III", data, 0)
+            if len(data) - width * height * 4 in (12, 16):
+                self._header_size = len(data) - width * height * 4
+        return self.decode(data)
+
+    def capture_regions(self, rois: List[Tuple[int, int, int, int]]) -> Tuple[Optional[np.ndarray], Optional[List[Tuple[int, int, int, int]]]]:
+        """
+        只读取到区域最下沿所在行为止的数据，读够后立即断开，且只解码区域内像素
+        """
+        if self._header_size is None or not rois:
+            return self.capture(), None
+        conn = self._open_screencap()
+        try:
+            header = self._read_exact(conn, self._header_size)
+            if len(header) < self._header_size:
+                return None, None
+            width, height, _ = struct.unpack_from("<III", header, 0)
+            rows = min(height, max(y2 for _, _, _, y2 in rois))
+            body = self._read_exact(conn, rows * width * 4)
+        finally:
+            conn.close()
+        if len(body) < rows * width * 4:
+            logger.error(f"screencap区域数据不完整: {len(body)}/{rows * width * 4}")
+            return None, None
+        rgba = np.frombuffer(body, dtype=np.uint8).reshape((rows, width, 4))
+        canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        valid = []
+        for x1, y1, x2, y2 in rois:
+            x1, y1, x2, y2 = max(0, x1), max(0, y1), min(width, x2), min(rows, y2)
+            if x2 <= x1 or y2 <= y1:
+                continue
+            canvas[y1:y2, x1:x2] = cv2.cvtColor(rgba[y1:y2, x1:x2], cv2.COLOR_RGBA2BGR)
+            valid.append((x1, y1, x2, y2))
+        return canvas, valid
+
+    @staticmethod
+    def _read_exact(conn, size: int) -> bytes:
+        """从连接读取size字节，连接提前关闭时返回已读到的数据"""
+        chunks = []
+        remaining = size
+        while remaining > 0:
+            chunk = conn.read(remaining)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+    @classmethod
+    def decode(cls, data: bytes) -> Optional[np.ndarray]:
+        """
+        解析screencap原始数据
+        头部为 width, height, format 三个uint32，Android 9起追加一个colorspace
+        :param data: screencap输出的原始字节
+        :return: BGR格式np.ndarray 或 None
+        """
+        if len(data) < 12:
+            logger.error(f"screencap数据长度异常: {len(data)}")
+            return None
+        width, height, pixel_format = struct.unpack_from("<III", data, 0)
+        pixel_size = width * height * 4
+        header_size = len(data) - pixel_size
+        if header_size not in (12, 16):
+            logger.error(f"screencap数据长度与尺寸不符: {len(data)}, {width}x{height}")
+            return None
+        if pixel_format != cls.PIXEL_FORMAT_RGBA_8888:
+            logger.warning(f"screencap像素格式非RGBA_8888: {pixel_format}")
+        rgba = np.frombuffer(data, dtype=np.uint8, count=pixel_size, offset=header_size)
+        rgba = rgba.reshape((height, width, 4))
+        return cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR)
+
+
+CAPTURE_BACKENDS = {
+    U2CaptureBackend.name: U2CaptureBackend,
+    AdbRawCaptureBackend.name: AdbRawCaptureBackend,
+}
+
+
+def create_capture_backend(name: str, device: Any, serial: Optional[str] = None) -> CaptureBackend:
+    """
+    按名称创建截图后端，创建失败时回退为uiautomator2后端
+    :param name: 后端名称，见CAPTURE_BACKENDS
+    :param device: uiautomator2设备对象
+    :param serial: adb设备序列号，None时取device.serial
+    :return: CaptureBackend
+    """
+    if name == AdbRawCaptureBackend.name:
+        try:
+            return AdbRawCaptureBackend(serial or getattr(device, 'serial', None))
+        except Exception as e:
+            logger.warning(f"创建adb_raw截图后端失败，回退为u2: {e}")
+    elif name != U2CaptureBackend.name:
+        logger.warning(f"未知的截图后端: {name}，使用u2")
+    return U2CaptureBackend(device)
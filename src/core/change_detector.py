@@ -0,0 +1,152 @@
+import functools
+import threading
+from utils import clock
+from typing import Any, Callable, Dict, Optional, Tuple
+import numpy as np
+import cv2
+from core.frame import Frame
+
+
+class ChangeDetector:
+    """
+    画面变化检测
+    - 对检测区域的灰度图按scale缩小得到签名，与该检测上次结果对应的签名比较；
+      按取色点判断的检测使用彩色签名，亮度相同而颜色不同的变化也能发现
+    - 签名最大差值不超过threshold视为画面未变化，直接返回上次检测结果
+    - 缓存结果超过max_age后强制重新检测，避免误差累积
+    """
+    SMALL_ROI_AREA = 64 * 64
+
+    def __init__(self, threshold: float = 6.0, scale: int = 4, max_age: float = 5.0) -> None:
+        """
+        :param threshold: 签名像素最大差值(0~255)，不超过则认为未变化，<=0关闭缓存
+        :param scale: 签名缩小倍数
+        :param max_age: 缓存结果最长有效时间(秒)
+        """
+        self.threshold = threshold
+        self.scale = max(1, scale)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # key -> (签名, 检测结果, 检测时间, 帧ID)
+        self._entries: Dict[str, Tuple[np.ndarray, Any, float, Optional[int]]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def signature(self, image: np.ndarray, roi: Optional[Tuple[int, int, int, int]] = None,
+                  color: bool = False) -> np.ndarray:
+        """
+        计算区域签名：灰度化(color为True时保留BGR各通道)后按scale缩小
+        :param image: BGR格式np.ndarray(Frame优先复用缓存灰度图)
+        :param roi: 逻辑坐标(x1, y1, x2, y2)，None为全图
+        :param color: 是否使用彩色签名
+        :return: int16签名数组
+        """
+        if isinstance(image, Frame):
+            gray = image.view(np.ndarray) if color else image.gray
+            roi = image.transform.to_region(roi)
+        elif color:
+            gray = image
+        else:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if roi is not None:
+            x1, y1, x2, y2 = roi
+            gray = gray[max(0, y1):max(0, y2), max(0, x1):max(0, x2)]
+        h, w = gray.shape[:2]
+        # 小区域(如取色点)不缩小，避免单个像素的变化被平均掉
+        if self.scale > 1 and w * h > self.SMALL_ROI_AREA:
+            gray = cv2.resize(gray, (w // self.scale, h // self.scale), interpolation=cv2.INTER_AREA)
+        return gray.astype(np.int16)
+
+    def changed(self, key: str, image: np.ndarray, roi: Optional[Tuple[int, int, int, int]] = None,
+                color: bool = False) -> bool:
+        """
+        判断区域相对该key上次记录的画面是否变化(不更新记录)
+        :return: 无记录、已过期或有变化时返回True
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or clock.time() - entry[2] > self.max_age:
+            return True
+        return not self._same(entry[0], self.signature(image, roi, color))
+
+    def cached(self, key: str, image: np.ndarray, roi: Optional[Tuple[int, int, int, int]], compute: Callable[[], Any],
+               color: bool = False) -> Any:
+        """
+        区域未变化时返回上次结果，否则调用compute重新检测并记录
+        :param key: 检测项标识
+        :param image: 当前帧
+        :param roi: 检测区域，None为全图
+        :param compute: 实际检测函数
+        :param color: 是否使用彩色签名
+        :return: 检测结果
+        """
+        if not self.enabled or not isinstance(image, np.ndarray):
+            return compute()
+        frame_id = getattr(image, 'frame_id', None)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and clock.time() - entry[2] <= self.max_age:
+            # 同一帧无需再算签名
+            if frame_id is not None and frame_id == entry[3]:
+                return entry[1]
+            sig = self.signature(image, roi, color)
+            if self._same(entry[0], sig):
+                return entry[1]
+        else:
+            sig = self.signature(image, roi, color)
+        result = compute()
+        with self._lock:
+            self._entries[key] = (sig, result, clock.time(), frame_id)
+        return result
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """清除指定key或全部缓存结果"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    @staticmethod
+    def diff(a: np.ndarray, b: np.ndarray) -> float:
+        """
+        两个签名的最大像素差，尺寸不同返回inf
+        """
+        if a.shape != b.shape:
+            return float('inf')
+        return int(np.abs(a - b).max(initial=0))
+
+    def _same(self, a: np.ndarray, b: np.ndarray) -> bool:
+        return self.diff(a, b) <= self.threshold
+
+
+def roi_cached(roi: Optional[Tuple[int, int, int, int]] = None, color: bool = False):
+    """
+    检测方法装饰器：检测区域画面未变化时直接返回上次结果
+    被装饰方法签名需为 (self, image=None)，所属对象需有device_manager属性；
+    传入其它参数时不走缓存。roi同时登记到DeviceManager，供区域截图使用
+    :param roi: 检测区域(x1, y1, x2, y2)，None为全图
+    :param color: 是否使用彩色签名，按取色点判断的检测需开启
+    """
+    def decorator(func):
+        key = func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(self, image=None, *args, **kwargs):
+            detector = getattr(self.device_manager, 'change_detector', None)
+            if args or kwargs or detector is None or not detector.enabled:
+                return func(self, image, *args, **kwargs)
+            if roi is not None:
+                self.device_manager.register_roi(key, roi)
+            if image is None:
+                image = self.device_manager.get_screenshot()
+            if isinstance(image, Frame) and not image.covers(roi):
+                # 区域截图不含检测区域时取整帧，保证签名反映真实画面
+                image = self.device_manager.get_screenshot(full=True)
+            if image is None:
+                return func(self, image)
+            return detector.cached(key, image, roi, lambda: func(self, image), color)
+        return wrapper
+    return decorator
@@ -0,0 +1,220 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from utils import logger
+from core.input_backend import InputNotSentError
+
+
+def _connection_error_types() -> Tuple[type, ...]:
+    """连接断开、超时类异常：内置连接/超时异常及requests、adbutils、uiautomator2的连接异常"""
+    types = [ConnectionError, TimeoutError]
+    try:
+        import requests
+        types += [requests.exceptions.ConnectionError, requests.exceptions.Timeout]
+    except ImportError:
+        pass
+    try:
+        import adbutils
+        types += [getattr(adbutils, name) for name in ("AdbError", "AdbTimeout") if hasattr(adbutils, name)]
+    except ImportError:
+        pass
+    try:
+        from uiautomator2 import exceptions as u2_exceptions
+        types += [getattr(u2_exceptions, name) for name in ("ConnectError", "HTTPError", "HTTPTimeoutError")
+                  if hasattr(u2_exceptions, name)]
+    except ImportError:
+        pass
+    return tuple(types)
+
+
+def _not_sent_error_types() -> Tuple[type, ...]:
+    """建立连接阶段的失败：请求尚未发送到设备"""
+    types = [InputNotSentError, ConnectionRefusedError]
+    try:
+        import requests
+        import urllib3
+        types += [requests.exceptions.ConnectTimeout, urllib3.exceptions.NewConnectionError]
+    except ImportError:
+        pass
+    return tuple(types)
+
+
+CONNECTION_ERRORS = _connection_error_types()
+NOT_SENT_ERRORS = _not_sent_error_types()
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """异常是否由连接断开或超时引起(含被包装的原始异常)"""
+    while error is not None:
+        if isinstance(error, CONNECTION_ERRORS):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def failed_before_send(error: BaseException) -> bool:
+    """
+    操作是否在请求发送到设备之前就已失败(无法建立连接、命令未写入)，此时重试不会重复执行
+    :param error: 操作抛出的异常
+    """
+    while error is not None:
+        if isinstance(error, NOT_SENT_ERRORS):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class ConnectionSupervisor:
+    """
+    设备连接守护
+    - 后台线程按interval探测连接，连续fail_threshold次失败后自动重连
+    - 截图或输入失败时调用方通过handle_failure上报，探测确认断开后立即重连，
+      调用方等待重连完成后重试本次操作
+    - 重连失败按指数退避重试，直到成功或停止
+    - 记录探测失败、重连次数、断开时长等指标
+    """
+
+    def __init__(self, probe: Callable[[], bool], reconnect: Callable[[], bool], interval: float = 5.0,
+                 fail_threshold: int = 2, max_backoff: float = 30.0) -> None:
+        """
+        :param probe: 连接探测函数，连接正常返回True
+        :param reconnect: 重连函数，成功返回True
+        :param interval: 后台探测间隔(秒)，<=0时只在上报失败时探测
+        :param fail_threshold: 后台探测连续失败多少次后重连
+        :param max_backoff: 重连失败后的最长重试间隔(秒)
+        """
+        self._probe = probe
+        self._reconnect = reconnect
+        self.interval = interval
+        self.fail_threshold = max(1, fail_threshold)
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._connected = threading.Event()
+        self._connected.set()
+        self._reconnect_requested = False
+        self._thread: Optional[threading.Thread] = None
+        self._metrics: Dict[str, Any] = {
+            "probe_count": 0,
+            "probe_failures": 0,
+            "reported_failures": 0,
+            "reconnect_attempts": 0,
+            "reconnect_count": 0,
+            "last_reconnect_time": None,
+            "last_downtime": 0.0,
+            "total_downtime": 0.0,
+        }
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def start(self) -> None:
+        """启动后台探测线程，已启动时忽略"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="connection-supervisor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """停止后台探测线程，唤醒所有等待重连的调用方"""
+        self._stop.set()
+        self._wake.set()
+        self._connected.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def metrics(self) -> Dict[str, Any]:
+        """返回重连相关指标的副本"""
+        with self._lock:
+            return dict(self._metrics)
+
+    def _count(self, key: str, value: float = 1) -> None:
+        with self._lock:
+            self._metrics[key] += value
+
+    def probe(self) -> bool:
+        """执行一次连接探测，异常视为失败"""
+        self._count("probe_count")
+        try:
+            ok = bool(self._probe())
+        except Exception as e:
+            logger.debug(f"[ConnectionSupervisor]连接探测失败: {e}")
+            ok = False
+        if not ok:
+            self._count("probe_failures")
+        return ok
+
+    def handle_failure(self, error: Optional[BaseException] = None, timeout: float = 30.0) -> bool:
+        """
+        上报一次操作失败：探测确认连接断开时请求重连并等待完成
+        只处理连接断开、超时类异常，其它异常与连接无关，直接返回False
+        :param error: 操作抛出的异常
+        :param timeout: 等待重连完成的最长时间(秒)
+        :return: 连接已断开且在超时前重连成功时返回True，调用方可重试本次操作；
+                 连接正常(失败与连接无关)或重连超时返回False
+        """
+        if self._stop.is_set() or threading.current_thread() is self._thread:
+            return False
+        if error is not None and not is_connection_error(error):
+            return False
+        if self.connected and self.probe():
+            return False
+        self._count("reported_failures")
+        logger.warning(f"[ConnectionSupervisor]设备连接异常，等待重连: {error}")
+        with self._lock:
+            self._reconnect_requested = True
+            self._connected.clear()
+        self.start()
+        self._wake.set()
+        return self._connected.wait(timeout) and not self._stop.is_set()
+
+    def _run(self) -> None:
+        failures = 0
+        while not self._stop.is_set():
+            self._wake.wait(self.interval if self.interval > 0 else None)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            with self._lock:
+                requested = self._reconnect_requested
+                self._reconnect_requested = False
+            if not requested:
+                if self.interval <= 0 or self.probe():
+                    failures = 0
+                    continue
+                failures += 1
+                if failures < self.fail_threshold:
+                    continue
+            failures = 0
+            self._reconnect_loop()
+
+    def _reconnect_loop(self) -> None:
+        """重连直到成功或停止，失败时指数退避"""
+        self._connected.clear()
+        down_since = time.time()
+        backoff = 1.0
+        while not self._stop.is_set():
+            self._count("reconnect_attempts")
+            try:
+                ok = bool(self._reconnect())
+            except Exception as e:
+                logger.warning(f"[ConnectionSupervisor]重连异常: {e}")
+                ok = False
+            if ok and self.probe():
+                downtime = time.time() - down_since
+                with self._lock:
+                    self._metrics["reconnect_count"] += 1
+                    self._metrics["last_reconnect_time"] = time.time()
+                    self._metrics["last_downtime"] = downtime
+                    self._metrics["total_downtime"] += downtime
+                    count = self._metrics["reconnect_count"]
+                logger.info(f"[ConnectionSupervisor]设备重连成功，第{count}次，中断{downtime:.1f}秒")
+                self._connected.set()
+                return
+            logger.warning(f"[ConnectionSupervisor]重连失败，{backoff:.0f}秒后重试")
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
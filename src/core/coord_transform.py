@@ -0,0 +1,81 @@
+import math
+from typing import Optional, Tuple
+import numpy as np
+import cv2
+
+# 所有脚本坐标、取色点和模板素材均以该分辨率为准
+LOGICAL_WIDTH = 1280
+LOGICAL_HEIGHT = 720
+
+
+class CoordTransform:
+    """
+    逻辑坐标(1280x720)与实际坐标(设备分辨率或截图分辨率)之间的换算
+    - to_*: 逻辑坐标 -> 实际坐标
+    - from_*: 实际坐标 -> 逻辑坐标
+    - 缩放比例为1时所有换算原样返回
+    """
+
+    def __init__(self, width: int = LOGICAL_WIDTH, height: int = LOGICAL_HEIGHT) -> None:
+        """
+        :param width: 实际宽度
+        :param height: 实际高度
+        """
+        self.width = width
+        self.height = height
+        self.sx = width / LOGICAL_WIDTH
+        self.sy = height / LOGICAL_HEIGHT
+        self.is_identity = (width, height) == (LOGICAL_WIDTH, LOGICAL_HEIGHT)
+
+    @classmethod
+    def for_image(cls, image: np.ndarray) -> "CoordTransform":
+        """按整帧图像尺寸创建"""
+        h, w = image.shape[:2]
+        return cls(w, h)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, CoordTransform) and (self.width, self.height) == (other.width, other.height)
+
+    def __hash__(self) -> int:
+        return hash((self.width, self.height))
+
+    def __repr__(self) -> str:
+        return f"CoordTransform({self.width}x{self.height})"
+
+    def to_point(self, x: float, y: float) -> Tuple[int, int]:
+        if self.is_identity:
+            return x, y
+        return int(round(x * self.sx)), int(round(y * self.sy))
+
+    def from_point(self, x: float, y: float) -> Tuple[int, int]:
+        if self.is_identity:
+            return x, y
+        return int(round(x / self.sx)), int(round(y / self.sy))
+
+    def to_region(self, region: Optional[Tuple[int, int, int, int]]) -> Optional[Tuple[int, int, int, int]]:
+        """区域换算，向外取整保证不丢失边缘像素"""
+        if region is None or self.is_identity:
+            return region
+        x1, y1, x2, y2 = region
+        return (int(math.floor(x1 * self.sx)), int(math.floor(y1 * self.sy)),
+                int(math.ceil(x2 * self.sx)), int(math.ceil(y2 * self.sy)))
+
+    def to_radius(self, r: int) -> int:
+        """取色范围换算，向上取整，非0范围不会被缩成0"""
+        if self.is_identity:
+            return r
+        return int(math.ceil(r * max(self.sx, self.sy)))
+
+    def scale_image(self, image: np.ndarray) -> np.ndarray:
+        """
+        按比例缩放模板等以逻辑分辨率制作的图像
+        """
+        if self.is_identity:
+            return image
+        h, w = image.shape[:2]
+        size = (max(1, int(round(w * self.sx))), max(1, int(round(h * self.sy))))
+        interpolation = cv2.INTER_AREA if self.sx < 1 else cv2.INTER_LINEAR
+        return cv2.resize(image, size, interpolation=interpolation)
+
+
+IDENTITY = CoordTransform()
@@ -1,14 +1,30 @@
 import uiautomator2 as u2
 from utils import logger
+from utils.latency_stats import latency_stats
 import time
+from utils import clock
 from PIL import Image
 import cv2
 import numpy as np
 import os
-from typing import Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from common.config import config
+from core.frame_stream import FrameStream
+from core.capture_backend import CaptureBackend, U2CaptureBackend, create_capture_backend
+from core.frame import Frame
+from core.change_detector import ChangeDetector
+from core.session_recorder import SessionRecorder, RecordingDevice, ReplayDevice, ReplayClock
+from core.coord_transform import CoordTransform, IDENTITY
+from core.input_dispatcher import InputDispatcher
+from core.input_backend import InputBackend, create_input_backend
+from core.connection_supervisor import ConnectionSupervisor, failed_before_send
+from concurrent.futures import Future
+import threading
 import traceback
 import gc
+import atexit
+import signal
+import sys
 
 class DeviceManager:
     def __init__(self):
@@ -18,11 +34,84 @@ class DeviceManager:
         self.device = None
         self.config = config.device
         self.adb_address = self.config.adb_address
+        # 实际连接使用的设备地址，重连时复用
+        self._target_id: Optional[str] = None
+        # 连接守护，连接成功后按配置auto_reconnect启动
+        self.supervisor: Optional[ConnectionSupervisor] = None
+        # 截图后端，连接设备后按配置capture_backend创建
+        self.capture_backend: Optional[CaptureBackend] = None
+        # 输入后端(点击/双击/长按/滑动)，连接设备后按配置input_backend创建
+        self.input_backend: Optional[InputBackend] = None
+        # 后台截图流，仅在配置开启stream_capture时创建
+        self._frame_stream: Optional[FrameStream] = None
+        self._stream_max_age = self.config.stream_max_age
+        # 帧共享缓存：窗口期内的重复截图请求直接复用当前帧
+        self.frame_cache_window = self.config.frame_cache_window
+        self._frame_lock = threading.Lock()
+        self._frame_id = 0
+        self._frame: Optional[Frame] = None
+        self._frame_stream_seq = 0
+        # 最近一次输入操作的时间，早于该时间的帧不再复用
+        self._input_time = 0.0
+        # 检测方法登记的区域，roi_capture开启时只截取这些区域
+        self._rois: Dict[str, Tuple[int, int, int, int]] = {}
+        self._roi_frame: Optional[Frame] = None
+        # 会话录制/回放
+        self._recorder: Optional[SessionRecorder] = None
+        self._exit_handler_installed = False
+        # 定期输出耗时统计时同时发送的日志队列，由begin_session设置
+        self._report_queue: Any = None
+        self._latency_report_interval = self.config.latency_report_interval
+        self._replay_clock: Optional[ReplayClock] = None
+        # 逻辑坐标(1280x720)到设备坐标的换算，连接设备后按设备分辨率确定
+        self.input_transform: CoordTransform = IDENTITY
+        # 截图缩放比例，小于1时截图后先缩小，降低后续检测开销
+        self.capture_scale = self.config.capture_scale
+        # 输入分发线程：async_input开启时输入操作入队后立即返回，重复点击始终由其执行
+        self.input_dispatcher = InputDispatcher(name="input-dispatcher", min_interval=self.config.input_min_interval)
+        # 画面变化检测，检测方法可通过roi_cached按区域复用上次结果
+        self.change_detector = ChangeDetector(
+            threshold=self.config.change_threshold,
+            max_age=self.config.change_max_age,
+        )
+        # 依赖本设备的后台任务(如前台App跟踪线程)的停止函数，cleanup时调用
+        self._cleanup_callbacks: List[Callable[[], None]] = []
+
+    def add_cleanup_callback(self, callback: Callable[[], None]) -> None:
+        """
+        登记cleanup时调用的停止函数，重复登记忽略
+        :param callback: 无参函数
+        """
+        if callback not in self._cleanup_callbacks:
+            self._cleanup_callbacks.append(callback)
 
     def cleanup(self):
         """清理设备管理器资源"""
         logger.info("清理设备管理器资源...")
         try:
+            for callback in self._cleanup_callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.warning(f"停止后台任务失败: {e}")
+            self._cleanup_callbacks.clear()
+            if self.supervisor is not None:
+                self.supervisor.stop()
+                self.supervisor = None
+            self.input_dispatcher.stop()
+            self.stop_stream()
+            self.stop_recording()
+            if isinstance(self.device, ReplayDevice):
+                self.device.close()
+            if self._replay_clock is not None:
+                clock.uninstall(self._replay_clock)
+                self._replay_clock = None
+            if self.capture_backend is not None:
+                self.capture_backend.close()
+                self.capture_backend = None
+            if self.input_backend is not None:
+                self.input_backend.close()
+                self.input_backend = None
             if self.device:
                 # 关闭设备连接
                 try:
@@ -54,6 +143,8 @@ class DeviceManager:
         :return: 是否连接成功
         """
         try:
+            if self.config.replay_session:
+                return self._connect_replay(self.config.replay_session)
             retry_count = self.config.retry_count
             config_adb_address = self.config.adb_address
             
@@ -69,11 +160,12 @@ class DeviceManager:
                     # 测试连接
                     self.device.info
                     logger.info(f"Successfully connected to device: {self.device.info}")
+                    self._bind_device(self.device, target_id)
                     return True
                 except Exception as e:
                     logger.warning(f"Connection attempt {i+1} failed: {str(e)}\n{traceback.format_exc()}")
                     if i < retry_count - 1:
-                        time.sleep(2)
+                        clock.sleep(2)
                     continue
             
             logger.error("Failed to connect to device after all retries")
@@ -83,187 +175,726 @@ class DeviceManager:
             logger.error(f"Error connecting to device: {str(e)}\n{traceback.format_exc()}")
             return False
         
-    def get_screenshot(self) -> Optional[Image.Image]:
+    def _bind_device(self, device, target_id: Optional[str]) -> None:
+        """
+        为新连接的设备创建截图/输入后端并确定坐标换算，录制中时继续录制到同一存档
+        :param device: uiautomator2设备对象
+        :param target_id: 设备地址
+        """
+        for backend in (self.capture_backend, self.input_backend):
+            if backend is not None:
+                try:
+                    backend.close()
+                except Exception as e:
+                    logger.debug(f"关闭旧后端失败: {e}")
+        self._target_id = target_id
+        self.capture_backend = create_capture_backend(self.config.capture_backend, device, target_id)
+        logger.info(f"截图后端: {self.capture_backend.name}")
+        self.input_backend = create_input_backend(self.config.input_backend, device, target_id)
+        logger.info(f"输入后端: {self.input_backend.name}")
+        self.device = RecordingDevice(device, self._recorder) if self._recorder is not None else device
+        self._update_input_transform()
+        self.invalidate_frame_cache()
+
+    def begin_session(self, name: str = "session", log_queue: Any = None) -> None:
+        """
+        开始一次模式运行，由模式入口调用；GUI等只连接设备、不驱动设备的进程不调用
+        - 配置record_session时录制到本次运行单独的存档
+        - 配置stream_capture时启动后台截图流
+        - 配置auto_reconnect时启动连接守护
+        - 定期输出的设备操作耗时统计同时发送到log_queue(GUI统计通道)
+        :param name: 运行名称，用于录制存档文件名
+        :param log_queue: 模式的日志队列，None时耗时统计只写日志
+        """
+        self._report_queue = log_queue
+        if self.device is None or isinstance(self.device, ReplayDevice):
+            return
+        if self.config.record_session:
+            self.start_recording(self._session_record_path(name))
+        if self.config.stream_capture:
+            self.start_stream()
+        if self.config.auto_reconnect:
+            self.start_supervisor()
+
+    def end_session(self) -> None:
+        """结束模式运行：停止连接守护和截图流，保存录制存档"""
+        if self.supervisor is not None:
+            self.supervisor.stop()
+            self.supervisor = None
+        self.stop_stream()
+        self.stop_recording()
+        self._report_queue = None
+
+    def _session_record_path(self, name: str) -> str:
+        """
+        本次运行的录制存档路径：在record_session基础上加运行名称、时间和进程号，各进程、各次运行互不覆盖
+        如record_session为records/session.zip时为records/session_fengmo_20250101_120000_1234.zip
+        """
+        base, ext = os.path.splitext(self.config.record_session)
+        return f"{base}_{name}_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}{ext or '.zip'}"
+
+    def _install_exit_handler(self) -> None:
+        """
+        录制中进程退出时保存存档：注册atexit；SIGTERM未设置处理函数时改为正常退出，
+        使模式的finally和atexit得以执行(强制结束时录制目录中已写入的内容仍可回放)
+        """
+        if self._exit_handler_installed:
+            return
+        self._exit_handler_installed = True
+        atexit.register(self.stop_recording)
+        if threading.current_thread() is threading.main_thread() \
+                and signal.getsignal(signal.SIGTERM) in (signal.SIG_DFL, None):
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    def start_supervisor(self) -> None:
+        """启动连接守护，后台探测连接并在断开时自动重连"""
+        if self.supervisor is None:
+            self.supervisor = ConnectionSupervisor(
+                probe=self.probe,
+                reconnect=self.reconnect,
+                interval=self.config.health_check_interval,
+                fail_threshold=self.config.health_fail_threshold,
+            )
+        self.supervisor.start()
+
+    def probe(self) -> bool:
+        """
+        探测设备连接是否正常
+        :return: bool
+        """
+        device = self.device
+        if device is None:
+            return False
+        device.info
+        return True
+
+    def reconnect(self) -> bool:
+        """
+        重新连接设备：网络地址先重新adb connect，连接后uiautomator服务无响应时重启服务
+        :return: 是否成功
+        """
+        target_id = self._target_id
+        logger.info(f"重新连接设备: {target_id}")
+        if target_id and ":" in target_id:
+            try:
+                import adbutils
+                adbutils.adb.connect(target_id, timeout=self.config.connection_timeout)
+            except Exception as e:
+                logger.warning(f"adb重新连接失败: {e}")
+        device = u2.connect(target_id) if target_id else u2.connect()
+        try:
+            device.info
+        except Exception as e:
+            logger.warning(f"uiautomator服务无响应，尝试重启: {e}")
+            for name in ("reset_uiautomator", "start_uiautomator"):
+                restart = getattr(device, name, None)
+                if restart is not None:
+                    restart()
+                    break
+            device.info
+        self._bind_device(device, target_id)
+        return True
+
+    def _with_reconnect(self, action, idempotent: bool = True):
+        """
+        执行设备操作，因连接断开或超时失败时等待连接守护重连后重试一次
+        输入操作不是幂等的，只在命令未发送到设备时重试，已发送的可能已经执行，重试会重复点击
+        :param action: 无参操作函数，需在调用时才取设备对象，以便重试时使用新连接
+        :param idempotent: 是否可安全重复执行，如截图、查询前台应用
+        :return: action的返回值
+        """
+        try:
+            return action()
+        except Exception as e:
+            if self.supervisor is None or not self.supervisor.handle_failure(e, timeout=self.config.reconnect_wait):
+                raise
+            if not idempotent and not failed_before_send(e):
+                logger.warning("设备已重连，本次操作可能已执行，不再重试")
+                raise
+            logger.info("设备已重连，重试本次操作")
+            return action()
+
+    def app_current(self) -> dict:
+        """
+        查询前台应用，连接断开时等待重连后重试
+        :return: uiautomator2的app_current结果
+        """
+        return self._with_reconnect(lambda: self.device.app_current())
+
+    def _connect_replay(self, path: str) -> bool:
+        """
+        以回放存档代替真实设备
+        :param path: 录制存档路径
+        :return: 是否成功
+        """
+        try:
+            self.device = ReplayDevice(path)
+        except Exception as e:
+            logger.error(f"加载回放存档失败: {path}, {e}\n{traceback.format_exc()}")
+            return False
+        if self.config.replay_virtual_clock:
+            self._replay_clock = ReplayClock(self.device.meta.get("start_time", 0.0))
+            self.device.clock = self._replay_clock
+            # 只有当前线程(模式主线程)的sleep推进虚拟时间
+            clock.install(self._replay_clock)
+        self.capture_backend = U2CaptureBackend(self.device)
+        self._update_input_transform()
+        logger.info(f"回放会话: {path}，帧数: {len(self.device.frames)}，输入数: {len(self.device.inputs)}")
+        return True
+
+    def _update_input_transform(self) -> None:
+        """
+        按设备当前分辨率(已考虑横竖屏)确定输入坐标换算，获取失败时按1280x720处理
+        """
+        size = None
+        try:
+            if hasattr(self.device, 'window_size'):
+                size = self.device.window_size()
+        except Exception as e:
+            logger.warning(f"获取设备分辨率失败: {e}")
+        if not size:
+            self.input_transform = IDENTITY
+            return
+        width, height = size
+        # 游戏为横屏，设备仍报告竖屏尺寸时交换宽高
+        if height > width:
+            width, height = height, width
+        self.input_transform = CoordTransform(width, height)
+        if not self.input_transform.is_identity:
+            logger.info(f"设备分辨率 {width}x{height}，输入坐标按比例换算")
+
+    def to_device(self, x: int, y: int) -> Tuple[int, int]:
+        """
+        逻辑坐标转换为设备坐标
+        :param x: 逻辑横坐标(1280x720)
+        :param y: 逻辑纵坐标(1280x720)
+        :return: 设备坐标 (x, y)
+        """
+        return self.input_transform.to_point(x, y)
+
+    def start_recording(self, path: str) -> None:
+        """
+        开始录制会话：之后的每一帧以及点击、滑动、触摸、App操作都写入存档
+        :param path: 存档路径(.zip)
+        """
+        if self.device is None:
+            logger.error("设备未连接，无法录制")
+            return
+        self.stop_recording()
+        info = {}
+        try:
+            info = dict(self.device.info)
+        except Exception:
+            pass
+        self._install_exit_handler()
+        self._recorder = SessionRecorder(path, meta={
+            "device_info": info,
+            "serial": getattr(self.device, "serial", self.adb_address),
+            "capture_backend": self.capture_backend.name if self.capture_backend else None,
+        })
+        self.device = RecordingDevice(self.device, self._recorder)
+        logger.info(f"开始录制会话: {path}")
+
+    def stop_recording(self) -> None:
+        """停止录制并保存存档"""
+        if self._recorder is None:
+            return
+        if isinstance(self.device, RecordingDevice):
+            self.device = self.device._device
+        self._recorder.close()
+        self._recorder = None
+
+    def start_stream(self) -> None:
+        """
+        启动后台截图流，之后get_screenshot直接返回最新帧
+        """
+        if self._frame_stream is None:
+            self._frame_stream = FrameStream(
+                self._capture_screenshot,
+                buffer_size=self.config.stream_buffer_size,
+                interval=self.config.stream_interval,
+            )
+        self._frame_stream.start()
+
+    def stop_stream(self) -> None:
+        """
+        停止后台截图流，get_screenshot恢复为逐次截图
+        """
+        if self._frame_stream is not None:
+            self._frame_stream.stop()
+            self._frame_stream = None
+
+    @property
+    def current_frame_id(self) -> int:
+        """当前帧ID，单调递增，0表示尚未截图"""
+        return self._frame_id
+
+    def register_roi(self, name: str, roi: Tuple[int, int, int, int]) -> None:
+        """
+        登记检测区域，roi_capture开启时区域截图只截取已登记区域
+        :param name: 登记名，重复登记覆盖
+        :param roi: (x1, y1, x2, y2)
+        """
+        if self._rois.get(name) != tuple(roi):
+            self._rois[name] = tuple(roi)
+
+    def unregister_roi(self, name: str) -> None:
+        """取消登记检测区域"""
+        self._rois.pop(name, None)
+
+    @property
+    def active_rois(self) -> List[Tuple[int, int, int, int]]:
+        return list(self._rois.values())
+
+    def roi_capture_active(self) -> bool:
+        """当前是否使用区域截图"""
+        return (self.config.roi_capture and bool(self._rois)
+                and self.input_transform.is_identity and self.capture_scale == 1
+                and self.capture_backend is not None and self.capture_backend.supports_roi
+                and self._recorder is None
+                and not (self._frame_stream is not None and self._frame_stream.is_running()))
+
+    def _is_fresh(self, frame: Optional[Frame], max_age: float) -> bool:
+        return (frame is not None and max_age > 0
+                and clock.time() - frame.timestamp <= max_age
+                and frame.timestamp >= self._input_time)
+
+    def get_frame(self, max_age: Optional[float] = None, full: bool = False) -> Tuple[int, Optional[Frame]]:
+        """
+        获取当前帧及其帧ID
+        :param max_age: 可复用帧的最大时长(秒)，None使用frame_cache_window
+        :param full: 是否必须为整帧，False时在roi_capture开启后可能返回只含登记区域的帧
+        :return: (帧ID, Frame)，截图失败时图像为None
+        """
+        if max_age is None:
+            max_age = self.frame_cache_window
+        with self._frame_lock:
+            if self._is_fresh(self._frame, max_age):
+                return self._frame.frame_id, self._frame
+            if not full and self._is_fresh(self._roi_frame, max_age):
+                return self._roi_frame.frame_id, self._roi_frame
+        if not full and self.roi_capture_active():
+            return self._capture_roi_frame()
+        stream = self._frame_stream
+        if stream is not None and stream.is_running():
+            frame = self._get_stream_frame(stream)
+            if frame is not None:
+                with self._frame_lock:
+                    if frame.seq != self._frame_stream_seq:
+                        self._frame_stream_seq = frame.seq
+                        self._frame_id += 1
+                        frame.image.frame_id = self._frame_id
+                    self._frame = frame.image
+                    return self._frame_id, self._frame
+            logger.warning("截图流无可用帧，回退为直接截图")
+        image = self._capture_screenshot()
+        if image is None:
+            return self._frame_id, None
+        with self._frame_lock:
+            self._frame_id += 1
+            image.frame_id = self._frame_id
+            self._frame = image
+            return self._frame_id, image
+
+    def get_screenshot(self, max_age: Optional[float] = None, full: bool = False) -> Optional[Frame]:
+        """
+        获取当前屏幕截图，返回BGR格式的Frame(np.ndarray子类)，需要PIL.Image时调用to_pil()
+        - frame_cache_window窗口内且之后没有输入操作时，直接复用当前帧，
+          使同一次判断中的多个检测方法共用一张截图
+        - 开启截图流时返回最新帧，最新帧超过stream_max_age时等待下一帧，
+          截图流无帧可用时回退为直接截图
+        - 开启roi_capture且后端支持时，只截取检测方法登记的区域(frame.valid_regions)，
+          OCRHandler发现所需区域不在其中时会以full=True重新截取整帧
+        :param max_age: 可复用帧的最大时长(秒)，None使用frame_cache_window，0强制取新帧
+        :param full: 是否必须返回整帧
+        :return: Frame 或 None
+        """
+        start = time.perf_counter()
+        image = self.get_frame(max_age, full)[1]
+        latency_stats.record("get_screenshot", time.perf_counter() - start, image is not None)
+        # 各模式都会持续截图，在此按间隔定期输出耗时统计
+        if latency_stats.flush_due(self._latency_report_interval):
+            latency_stats.flush(self._report_queue, "设备操作耗时:\n")
+        if image is not None:
+            # 帧龄：截图时间到被取用的时间
+            latency_stats.record("frame_age", max(0.0, clock.time() - image.timestamp))
+        return image
+
+    def invalidate_frame_cache(self) -> None:
+        """
+        使当前帧失效，下次截图必须取得输入操作之后的画面
+        """
+        with self._frame_lock:
+            self._input_time = clock.time()
+            self._frame = None
+            self._roi_frame = None
+
+    def _capture_roi_frame(self) -> Tuple[int, Optional[Frame]]:
         """
-        获取当前屏幕截图，返回PIL.Image对象
-        :return: PIL.Image 或 None
+        只截取已登记区域，结果与整帧分开缓存
+        """
+        try:
+            img, valid = self.capture_backend.capture_regions(self.active_rois)
+        except Exception as e:
+            logger.error(f"区域截图失败: {e}")
+            img, valid = None, None
+        if img is None:
+            return self._frame_id, None
+        image = Frame(img, valid_regions=valid, transform=CoordTransform.for_image(img))
+        with self._frame_lock:
+            self._frame_id += 1
+            image.frame_id = self._frame_id
+            if valid is None:
+                self._frame = image
+            else:
+                self._roi_frame = image
+            return self._frame_id, image
+
+    def wait_until_stable(self, roi: Optional[Tuple[int, int, int, int]] = None, max_wait: float = 1.0,
+                          settle_frames: int = 2, min_wait: float = 0.1, threshold: Optional[float] = None,
+                          interval: float = 0.03) -> bool:
+        """
+        等待画面区域停止变化，用于替代操作后的固定sleep
+        连续settle_frames帧与前一帧相比无变化即返回，最多等待max_wait秒
+        :param roi: 检测区域(x1, y1, x2, y2)，None为全屏
+        :param max_wait: 最长等待时间(秒)，即原来的固定sleep时长
+        :param settle_frames: 连续无变化的帧数
+        :param min_wait: 最短等待时间(秒)，给界面响应操作、开始动画留出时间
+        :param threshold: 变化阈值，None使用change_detector的阈值
+        :param interval: 两次截图的间隔(秒)
+        :return: 画面已稳定返回True，等待超时返回False
+        """
+        start = clock.time()
+        if not self.config.wait_stable:
+            clock.sleep(max_wait)
+            return False
+        if threshold is None:
+            threshold = self.change_detector.threshold if self.change_detector.enabled else 6.0
+        clock.sleep(min(min_wait, max_wait))
+        last_sig = None
+        last_frame_id = None
+        stable_count = 0
+        while clock.time() - start < max_wait:
+            frame_id, image = self.get_frame(max_age=0, full=roi is None)
+            if image is None:
+                break
+            if not image.covers(roi):
+                frame_id, image = self.get_frame(max_age=0, full=True)
+                if image is None:
+                    break
+            if frame_id != last_frame_id:
+                sig = self.change_detector.signature(image, roi)
+                if last_sig is not None and self.change_detector.diff(last_sig, sig) <= threshold:
+                    stable_count += 1
+                    if stable_count >= settle_frames:
+                        logger.debug(f"[wait_until_stable]画面已稳定，耗时{clock.time() - start:.2f}秒")
+                        return True
+                else:
+                    stable_count = 0
+                last_sig = sig
+                last_frame_id = frame_id
+            clock.sleep(interval)
+        # 截图失败或超时，补足剩余等待时间，保证不短于原固定等待
+        remaining = max_wait - (clock.time() - start)
+        if remaining > 0:
+            clock.sleep(remaining)
+        return False
+
+    def _get_stream_frame(self, stream: FrameStream):
+        """
+        从截图流中取帧，帧过旧或早于最近一次输入操作时等待新帧
+        :return: StreamFrame 或 None
+        """
+        frame = stream.latest()
+        min_time = max(clock.time() - self._stream_max_age, self._input_time)
+        if frame is None or frame.timestamp < min_time:
+            after_seq = frame.seq if frame is not None else 0
+            frame = stream.wait_for_frame(after_seq, timeout=max(self._stream_max_age, 1.0))
+        return frame
+
+    def _capture_screenshot(self) -> Optional[Frame]:
+        """
+        通过当前截图后端截取一帧，后端输出的BGR数组直接包装为Frame，不做格式转换
+        capture_scale小于1时按比例缩小，帧的transform记录逻辑坐标到帧像素的换算
+        :return: Frame 或 None
         """
         try:
             if self.device is None:
                 logger.error("Device not connected")
                 return None
+            if self.capture_backend is None:
+                self.capture_backend = create_capture_backend(self.config.capture_backend, self.device, self.adb_address)
             
-            # 使用uiautomator2获取截图
-            img = self.device.screenshot()
-            
-            if img is not None:
-                if isinstance(img, np.ndarray):
-                    # OpenCV格式转换为PIL格式
-                    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                    pil_img = Image.fromarray(img_rgb)
-                    # 及时释放OpenCV图像对象
-                    del img
-                    del img_rgb
-                    return pil_img
-                elif isinstance(img, Image.Image):
-                    return img
-                else:
-                    logger.error(f"Unexpected image type: {type(img)}")
-                    return None
-            else:
+            # 后端统一返回BGR格式
+            with latency_stats.timer("capture"):
+                img = self._with_reconnect(lambda: self.capture_backend.capture())
+            if img is None:
                 logger.error("Failed to get screenshot")
                 return None
+            if self._recorder is not None:
+                self._recorder.record_frame(img)
+            if self.capture_scale != 1:
+                h, w = img.shape[:2]
+                img = cv2.resize(img, (max(1, int(w * self.capture_scale)), max(1, int(h * self.capture_scale))),
+                                 interpolation=cv2.INTER_AREA)
+            return Frame(img, transform=CoordTransform.for_image(img))
                 
         except Exception as e:
             logger.error(f"Error getting screenshot: {e}")
             return None
-        finally:
-            # 强制垃圾回收图像相关对象
-            if 'img' in locals():
-                del img
-            if 'img_rgb' in locals():
-                del img_rgb
 
-    def get_screenshot_region(self, x1: int, y1: int, x2: int, y2: int) -> Optional[Image.Image]:
+    def get_screenshot_region(self, x1: int, y1: int, x2: int, y2: int) -> Optional[Frame]:
         """
-        获取指定区域的屏幕截图，返回PIL.Image对象
+        获取指定区域的屏幕截图，返回当前帧的区域视图(不复制像素)
+        区域为逻辑坐标，截图分辨率不同时按帧的transform换算
         :param x1: 区域左上角x
         :param y1: 区域左上角y
         :param x2: 区域右下角x
         :param y2: 区域右下角y
-        :return: PIL.Image 或 None
+        :return: Frame 或 None
         """
-        img = self.get_screenshot()
+        img = self.get_screenshot(full=True)
         if img is None:
             logger.error("No screenshot available for region crop.")
             return None
         try:
-            region = img.crop((x1, y1, x2, y2))
+            region = img.crop(img.transform.to_region((x1, y1, x2, y2)))
             return region
         except Exception as e:
             logger.error(f"Failed to crop screenshot region: {str(e)}\n{traceback.format_exc()}")
             return None
 
-    def save_image(self, img: Image.Image, save_path: str) -> None:
+    def save_image(self, img: Union[Image.Image, np.ndarray], save_path: str) -> None:
         """
-        保存PIL.Image对象到指定路径
-        :param img: PIL.Image对象
+        保存图片到指定路径
+        :param img: PIL.Image对象或BGR格式np.ndarray(Frame)
         :param save_path: 保存路径
         """
         try:
             # 确保目录存在
             os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            img.save(save_path)
+            if isinstance(img, np.ndarray):
+                cv2.imwrite(save_path, img)
+            else:
+                img.save(save_path)
             logger.info(f"Image saved to: {save_path}")
         except Exception as e:
             logger.error(f"Failed to save image: {str(e)}\n{traceback.format_exc()}")
 
-    def click(self, x: int, y: int, log:bool=False) -> None:
+    def _input_target(self):
+        """
+        执行点击/双击/长按/滑动的对象：录制和回放时直接使用设备对象，保证输入被记录或比对
+        """
+        if self.input_backend is None or self._recorder is not None or isinstance(self.device, ReplayDevice):
+            return self.device
+        return self.input_backend
+
+    def async_input_active(self) -> bool:
+        """当前输入操作是否异步执行，回放时始终同步以保证输入与帧的对应关系"""
+        return self.config.async_input and not isinstance(self.device, ReplayDevice)
+
+    def _run_input(self, name: str, action, key=None, coalesce: bool = False, wait: Optional[bool] = None) -> Optional[Future]:
+        """
+        执行输入操作：async_input开启时放入输入队列，否则直接执行；连接断开时等待重连后重试
+        :param name: 操作名，用于耗时统计
+        :param action: 无参输入函数，执行时才取输入对象
+        :param key: 操作标识，用于合并重复操作
+        :param coalesce: 是否与队列中尚未执行的相同操作合并
+        :param wait: 是否等待执行完成，None时异步模式不等待
+        :return: 异步执行时返回Future，否则返回None
+        """
+        # 提交即使当前帧失效，执行完成后再次失效，丢弃执行期间截取的画面
+        self.invalidate_frame_cache()
+        if not self.async_input_active():
+            with latency_stats.timer(name):
+                self._with_reconnect(action, idempotent=False)
+            self.invalidate_frame_cache()
+            return None
+
+        def task():
+            try:
+                with latency_stats.timer(name):
+                    return self._with_reconnect(action, idempotent=False)
+            finally:
+                self.invalidate_frame_cache()
+
+        future = self.input_dispatcher.submit(task, key=key, coalesce=coalesce)
+        if wait:
+            future.result()
+        return future
+
+    def flush_input(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待已提交的输入操作全部执行完毕
+        :param timeout: 最长等待时间(秒)，None为一直等待
+        :return: 是否全部执行完毕
+        """
+        return self.input_dispatcher.flush(timeout)
+
+    def click(self, x: int, y: int, log:bool=False, coalesce: bool = False, wait: Optional[bool] = None) -> Optional[Future]:
         """
         点击指定坐标，并输出日志
         :param x: 横坐标
         :param y: 纵坐标
+        :param coalesce: 队列中已有尚未执行的相同点击时不再重复提交
+        :param wait: 异步模式下是否等待点击完成
         """
         try:
             if self.device:
                 if log:
                     logger.info(f"[click]点击坐标 ({x}, {y})")
-                self.device.click(x, y)
+                dx, dy = self.to_device(x, y)
+                return self._run_input("click", lambda: self._input_target().click(dx, dy),
+                                       key=("click", x, y), coalesce=coalesce, wait=wait)
             else:
                 logger.error("设备未连接，无法点击")
         except Exception as e:
             logger.error(f"点击坐标 ({x}, {y}) 失败: {str(e)}\n{traceback.format_exc()}") 
 
-    def double_click(self, x: int, y: int) -> None:
+    def double_click(self, x: int, y: int, coalesce: bool = False, wait: Optional[bool] = None) -> Optional[Future]:
         """
         点击指定坐标，并输出日志
         :param x: 横坐标
         :param y: 纵坐标
+        :param coalesce: 队列中已有尚未执行的相同双击时不再重复提交
+        :param wait: 异步模式下是否等待双击完成
         """
         try:
             if self.device:
                 logger.info(f"[double_click]双击坐标 ({x}, {y})")
-                self.device.double_click(x, y)
+                dx, dy = self.to_device(x, y)
+                return self._run_input("double_click", lambda: self._input_target().double_click(dx, dy),
+                                       key=("double_click", x, y), coalesce=coalesce, wait=wait)
             else:
                 logger.error("设备未连接，无法点击")
         except Exception as e:
             logger.error(f"点击坐标 ({x}, {y}) 失败: {str(e)}\n{traceback.format_exc()}") 
     
-    def long_click(self, x: int, y: int, duration: float = 0.5):
+    def long_click(self, x: int, y: int, duration: float = 0.5, wait: Optional[bool] = None):
         """
         长按指定坐标
         :param x: 横坐标
         :param y: 纵坐标
         :param duration: 长按时间 (秒)
+        :param wait: 异步模式下是否等待长按完成
         """
         if not self.device:
             logger.error("设备未连接，无法长按")
             return
         logger.info(f"[long_click]长按: {duration} 秒")
-        self.device.long_click(x, y, duration)
+        dx, dy = self.to_device(x, y)
+        return self._run_input("long_click", lambda: self._input_target().long_click(dx, dy, duration), wait=wait)
     
-    def press_down(self, x: int, y: int):
+    def press_down(self, x: int, y: int, wait: Optional[bool] = None):
         """
         按下指定坐标
         :param x: 横坐标
         :param y: 纵坐标
+        :param wait: 异步模式下是否等待执行完成
         """
         if self.device is None:
             logger.error("设备未连接，无法按下")
             return
         logger.info(f"[press_down]按下: {x}, {y}")
-        self.device.touch.down(x, y)
+        dx, dy = self.to_device(x, y)
+        return self._run_input("touch.down", lambda: self.device.touch.down(dx, dy), wait=wait)
 
-    def press_move(self, x: int, y: int):
+    def press_move(self, x: int, y: int, wait: Optional[bool] = None):
         """
         按下并移动指定坐标
         :param x: 横坐标
         :param y: 纵坐标
+        :param wait: 异步模式下是否等待执行完成
         """
         if self.device is None:
             logger.error("设备未连接，无法按下并移动")
             return
         logger.info(f"[press_move]按下并移动: {x}, {y}")
-        self.device.touch.move(x, y)
+        dx, dy = self.to_device(x, y)
+        return self._run_input("touch.move", lambda: self.device.touch.move(dx, dy), wait=wait)
 
-    def press_up(self, x: int, y: int):
+    def press_up(self, x: int, y: int, wait: Optional[bool] = None):
         """
         抬起指定坐标
         :param x: 横坐标
         :param y: 纵坐标
+        :param wait: 异步模式下是否等待执行完成
         """
         if self.device is None:
             logger.error("设备未连接，无法抬起")
             return
         logger.info(f"[press_up]抬起: {x}, {y}")
-        self.device.touch.up(x, y)
+        dx, dy = self.to_device(x, y)
+        return self._run_input("touch.up", lambda: self.device.touch.up(dx, dy), wait=wait)
 
-    def press_and_drag_step(self, start:tuple, end:tuple,drag_press_time:float=0.1,drag_wait_time:float=0.3):
+    def press_and_drag_step(self, start:tuple, end:tuple,drag_press_time:float=0.1,drag_wait_time:float=0.3, wait: Optional[bool] = None):
         """
         长按和拖动指定坐标
         :param start: 起始坐标 (x, y)
         :param end: 结束坐标 (x, y)
         :param drag_press_time: 长按时间 (秒)
         :param drag_wait_time: 拖动时间 (秒)
-        :param duration: 拖动时间 (秒)
+        :param wait: 异步模式下是否等待拖动完成
         """
         if not self.device:
             logger.error("设备未连接，无法长按和拖动")
             return
-        start_x, start_y = start
-        end_x, end_y = end
-        logger.info(f"[press_and_drag_step]长按: {drag_press_time} 秒")
-        self.device.touch.down(start_x, start_y)
-        time.sleep(drag_press_time)
-        logger.info(f"[press_and_drag_step]拖动: {start} -> {end} {drag_wait_time} 秒")
-        self.device.touch.move(end_x, end_y)
-        time.sleep(drag_wait_time)
-        self.device.touch.up(end_x, end_y)
-
-    def save_screenshot(self, img_or_path: Union[Image.Image, str], save_path: Optional[str] = None) -> None:
+        start_x, start_y = self.to_device(*start)
+        end_x, end_y = self.to_device(*end)
+
+        def drag():
+            touch = self.device.touch
+            logger.info(f"[press_and_drag_step]长按: {drag_press_time} 秒")
+            touch.down(start_x, start_y)
+            clock.sleep(drag_press_time)
+            logger.info(f"[press_and_drag_step]拖动: {start} -> {end} {drag_wait_time} 秒")
+            touch.move(end_x, end_y)
+            clock.sleep(drag_wait_time)
+            touch.up(end_x, end_y)
+
+        return self._run_input("drag", drag, wait=wait)
+
+    def swipe(self, fx: int, fy: int, tx: int, ty: int, duration: float = 0.1, wait: Optional[bool] = None):
+        """
+        从起点滑动到终点
+        :param fx: 起点横坐标
+        :param fy: 起点纵坐标
+        :param tx: 终点横坐标
+        :param ty: 终点纵坐标
+        :param duration: 滑动时间 (秒)
+        :param wait: 异步模式下是否等待滑动完成
+        """
+        if not self.device:
+            logger.error("设备未连接，无法滑动")
+            return
+        (dfx, dfy), (dtx, dty) = self.to_device(fx, fy), self.to_device(tx, ty)
+        return self._run_input("swipe", lambda: self._input_target().swipe(dfx, dfy, dtx, dty, duration), wait=wait)
+
+    def start_repeat_click(self, x: int, y: int, interval: float = 0.05) -> None:
+        """
+        由输入分发线程按间隔持续点击指定坐标，直到stop_repeat_click
+        :param x: 横坐标
+        :param y: 纵坐标
+        :param interval: 点击间隔(秒)
+        """
+        if not self.device:
+            logger.error("设备未连接，无法点击")
+            return
+        def tap(dx, dy):
+            with latency_stats.timer("click"):
+                self._with_reconnect(lambda: self._input_target().click(dx, dy), idempotent=False)
+            self.invalidate_frame_cache()
+
+        self.input_dispatcher.start_repeat(("repeat_click", x, y), tap, *self.to_device(x, y), interval=interval)
+
+    def stop_repeat_click(self, x: int, y: int) -> None:
+        """停止持续点击指定坐标"""
+        self.input_dispatcher.stop_repeat(("repeat_click", x, y))
+
+    def save_screenshot(self, img_or_path: Union[Image.Image, np.ndarray, str], save_path: Optional[str] = None) -> None:
         """
         保存截图到指定路径
-        :param img_or_path: PIL.Image对象或截图路径
+        :param img_or_path: PIL.Image对象、Frame或截图路径
         :param save_path: 保存路径，如果为None则使用img_or_path
         """
         try:
@@ -274,10 +905,10 @@ class DeviceManager:
                 import shutil
                 shutil.copy2(img_or_path, save_path)
                 logger.info(f"Screenshot copied to: {save_path}")
-            elif isinstance(img_or_path, Image.Image):
-                # 如果传入的是PIL.Image对象，保存图像
+            elif isinstance(img_or_path, (Image.Image, np.ndarray)):
+                # 如果传入的是图像对象，保存图像
                 if save_path is None:
-                    save_path = f"screenshot_{int(time.time())}.png"
+                    save_path = f"screenshot_{int(clock.time())}.png"
                 self.save_image(img_or_path, save_path)
             else:
                 logger.error(f"Invalid image type: {type(img_or_path)}")
@@ -0,0 +1,127 @@
+from utils import clock
+from typing import List, Optional, Tuple
+import numpy as np
+import cv2
+from PIL import Image
+from core.coord_transform import CoordTransform, IDENTITY
+
+
+class Frame(np.ndarray):
+    """
+    屏幕帧
+    - 本身就是BGR格式的np.ndarray(HxWx3)，可直接传给OpenCV/PaddleOCR，无需转换
+    - 携带帧ID和截图时间，切片得到的区域是视图，不复制像素
+    - 灰度/RGB/HSV/缩小图等派生数据首次访问时计算并缓存，同一帧上的多个检测共用一次转换
+    - 需要PIL.Image的少数场景通过to_pil()按需转换，结果会被缓存
+    - 区域截图得到的帧只有valid_regions内的像素有效，其余为0
+    - transform记录逻辑坐标(1280x720)到本帧像素的换算，截图分辨率不是1280x720时由调用方换算坐标
+    """
+
+    def __new__(cls, array: np.ndarray, frame_id: Optional[int] = None, timestamp: Optional[float] = None,
+                valid_regions: Optional[List[Tuple[int, int, int, int]]] = None,
+                transform: Optional[CoordTransform] = None) -> "Frame":
+        """
+        :param array: BGR格式图像数组
+        :param frame_id: 帧ID，由DeviceManager分配
+        :param timestamp: 截图时间，默认当前时间
+        :param valid_regions: 有效区域列表，None表示整帧有效
+        :param transform: 逻辑坐标到帧像素的换算，None按1280x720处理
+        """
+        obj = np.asarray(array).view(cls)
+        obj.frame_id = frame_id
+        obj.timestamp = clock.time() if timestamp is None else timestamp
+        obj.valid_regions = valid_regions
+        obj.transform = transform or IDENTITY
+        return obj
+
+    def __array_finalize__(self, obj) -> None:
+        # 切片/运算得到的新数组不再代表完整帧，不继承帧ID和缓存
+        self.frame_id = None
+        self.timestamp = getattr(obj, 'timestamp', None)
+        self.valid_regions = None
+        # 换算比例与所属帧一致
+        self.transform = getattr(obj, 'transform', IDENTITY)
+        self._derived = {}
+
+    @property
+    def width(self) -> int:
+        return self.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.shape[0]
+
+    def covers(self, region: Optional[Tuple[int, int, int, int]] = None) -> bool:
+        """
+        判断区域内像素是否有效
+        :param region: 逻辑坐标(x1, y1, x2, y2)，None表示整帧
+        :return: 整帧有效，或区域完全落在某个有效区域内时返回True
+        """
+        if self.valid_regions is None:
+            return True
+        if region is None:
+            return False
+        x1, y1, x2, y2 = self.transform.to_region(region)
+        h, w = self.shape[:2]
+        x1, y1, x2, y2 = max(0, x1), max(0, y1), min(w, x2), min(h, y2)
+        return any(vx1 <= x1 and vy1 <= y1 and x2 <= vx2 and y2 <= vy2
+                   for vx1, vy1, vx2, vy2 in self.valid_regions)
+
+    def crop(self, region: Tuple[int, int, int, int]) -> "Frame":
+        """
+        按区域裁剪，返回视图(不复制)，区域超出边界时截断到图像范围内
+        :param region: (x1, y1, x2, y2)
+        :return: Frame视图
+        """
+        x1, y1, x2, y2 = region
+        return self[max(0, y1):max(0, y2), max(0, x1):max(0, x2)]
+
+    def _memo(self, key, compute):
+        """按key缓存派生数据，compute只在首次访问时调用"""
+        value = self._derived.get(key)
+        if value is None:
+            value = compute()
+            self._derived[key] = value
+        return value
+
+    @property
+    def bgr(self) -> np.ndarray:
+        """BGR数组(即帧本身，普通ndarray视图)"""
+        return self._memo('bgr', lambda: np.asarray(self))
+
+    @property
+    def gray(self) -> np.ndarray:
+        """灰度图"""
+        return self._memo('gray', lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def rgb(self) -> np.ndarray:
+        """RGB数组"""
+        return self._memo('rgb', lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB))
+
+    @property
+    def hsv(self) -> np.ndarray:
+        """HSV数组(OpenCV取值范围，H为0~179)"""
+        return self._memo('hsv', lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2HSV))
+
+    @property
+    def half_res(self) -> np.ndarray:
+        """宽高各缩小一半的BGR图，用于粗略检测"""
+        return self._memo('half_res', lambda: cv2.resize(
+            self.bgr, (self.width // 2, self.height // 2), interpolation=cv2.INTER_AREA))
+
+    def roi(self, x1: int, y1: int, x2: int, y2: int, kind: str = 'bgr') -> np.ndarray:
+        """
+        获取派生数据的区域视图，区域超出边界时截断到图像范围内
+        :param x1, y1, x2, y2: 区域坐标
+        :param kind: 'bgr' / 'gray' / 'rgb' / 'hsv'
+        :return: np.ndarray视图
+        """
+        return self._memo(('roi', kind, x1, y1, x2, y2), lambda: getattr(self, kind)[
+            max(0, y1):max(0, y2), max(0, x1):max(0, x2)])
+
+    def to_pil(self) -> Image.Image:
+        """
+        转换为RGB格式的PIL.Image，首次调用时转换并缓存
+        """
+        return self._memo('pil', lambda: Image.fromarray(self.rgb))
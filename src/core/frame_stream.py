@@ -0,0 +1,126 @@
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+from utils import logger
+
+
+@dataclass
+class StreamFrame:
+    """
+    截图流中的一帧
+    seq: 帧序号，单调递增，从1开始
+    timestamp: 截图完成时间(time.time())
+    image: 已解码的图像对象
+    """
+    seq: int
+    timestamp: float
+    image: Any
+
+
+class FrameStream:
+    """
+    后台截图流
+    - 由后台线程持续调用截图函数，将最新解码帧保存到环形缓冲区
+    - 调用方直接取最新帧，无需再走一次截图RPC
+    - 每帧带有序号和截图时间戳，便于判断帧的新旧
+    """
+
+    def __init__(self, capture_func: Callable[[], Any], buffer_size: int = 3, interval: float = 0.0) -> None:
+        """
+        :param capture_func: 截图函数，返回已解码图像，失败返回None
+        :param buffer_size: 环形缓冲区大小
+        :param interval: 两次截图之间的最小间隔(秒)，0表示尽可能快
+        """
+        self._capture_func = capture_func
+        self._interval = max(0.0, interval)
+        self._buffer: deque = deque(maxlen=max(1, buffer_size))
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._seq = 0
+        self._error_count = 0
+
+    def start(self) -> None:
+        """启动截图线程，重复调用无副作用"""
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="FrameStream", daemon=True)
+        self._thread.start()
+        logger.info("截图流已启动")
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """停止截图线程并清空缓冲区"""
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            if self._thread.is_alive():
+                logger.warning(f"截图流线程未能在{timeout}秒内退出")
+            self._thread = None
+        with self._cond:
+            self._buffer.clear()
+        logger.info("截图流已停止")
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def latest(self) -> Optional[StreamFrame]:
+        """
+        获取最新一帧
+        :return: StreamFrame 或 None(尚无帧)
+        """
+        with self._cond:
+            return self._buffer[-1] if self._buffer else None
+
+    def frames(self) -> List[StreamFrame]:
+        """获取缓冲区内所有帧的快照，按时间从旧到新排列"""
+        with self._cond:
+            return list(self._buffer)
+
+    def wait_for_frame(self, after_seq: int = 0, timeout: float = 1.0) -> Optional[StreamFrame]:
+        """
+        等待一帧序号大于after_seq的新帧
+        :param after_seq: 已持有的帧序号
+        :param timeout: 最长等待时间(秒)
+        :return: 新帧，超时或流已停止返回None
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while not self._stop_event.is_set():
+                if self._buffer and self._buffer[-1].seq > after_seq:
+                    return self._buffer[-1]
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+        return None
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            start = time.time()
+            try:
+                image = self._capture_func()
+            except Exception as e:
+                image = None
+                logger.warning(f"截图流截图异常: {e}\n{traceback.format_exc()}")
+            if image is not None:
+                self._error_count = 0
+                with self._cond:
+                    self._seq += 1
+                    self._buffer.append(StreamFrame(self._seq, time.time(), image))
+                    self._cond.notify_all()
+            else:
+                # 连续失败时退避，避免设备断开时空转
+                self._error_count += 1
+                if self._error_count % 50 == 1:
+                    logger.warning(f"截图流获取截图失败，连续失败次数: {self._error_count}")
+                self._stop_event.wait(min(0.05 * self._error_count, 1.0))
+                continue
+            elapsed = time.time() - start
+            if self._interval > elapsed:
+                self._stop_event.wait(self._interval - elapsed)
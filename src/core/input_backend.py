@@ -0,0 +1,227 @@
+import itertools
+import threading
+from typing import Any, List, Optional
+from utils import logger
+
+
+class InputNotSentError(ConnectionError):
+    """输入命令未发送到设备，重试不会重复执行"""
+
+
+class InputBackend:
+    """
+    输入后端基类
+    负责点击、双击、长按、滑动；按下/移动/抬起仍由uiautomator2的touch完成
+    """
+    name = "base"
+
+    def click(self, x: int, y: int) -> None:
+        raise NotImplementedError
+
+    def double_click(self, x: int, y: int) -> None:
+        raise NotImplementedError
+
+    def long_click(self, x: int, y: int, duration: float = 0.5) -> None:
+        raise NotImplementedError
+
+    def swipe(self, fx: int, fy: int, tx: int, ty: int, duration: float = 0.1) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """释放后端持有的连接等资源"""
+        pass
+
+
+class U2InputBackend(InputBackend):
+    """
+    uiautomator2输入后端，每次操作一次HTTP JSON-RPC
+    """
+    name = "u2"
+
+    def __init__(self, device: Any) -> None:
+        """
+        :param device: uiautomator2设备对象
+        """
+        self.device = device
+
+    def click(self, x: int, y: int) -> None:
+        self.device.click(x, y)
+
+    def double_click(self, x: int, y: int) -> None:
+        self.device.double_click(x, y)
+
+    def long_click(self, x: int, y: int, duration: float = 0.5) -> None:
+        self.device.long_click(x, y, duration)
+
+    def swipe(self, fx: int, fy: int, tx: int, ty: int, duration: float = 0.1) -> None:
+        self.device.swipe(fx, fy, tx, ty, duration)
+
+
+class AdbShellInputBackend(InputBackend):
+    """
+    常驻adb shell输入后端
+    - 保持一个sh会话，输入操作以input命令写入，省去每次建立连接和JSON-RPC的开销
+    - 一批命令一次写入，末尾追加回显标记，读到标记即表示该批执行完毕
+    - 建立会话或写入失败时重新建立一次，仍失败则本次操作回退为uiautomator2；
+      命令写入后等待回显超时不重发也不回退，避免重复点击
+    - 双击由uiautomator2执行
+    """
+    name = "adb_shell"
+    ACK_PREFIX = "__input_ack_"
+
+    def __init__(self, serial: str, fallback: Any = None, timeout: float = 5.0) -> None:
+        """
+        :param serial: adb设备序列号或地址
+        :param fallback: 回退使用的uiautomator2设备对象
+        :param timeout: 等待一批命令执行完毕的最长时间(秒)
+        """
+        import adbutils
+        self.serial = serial
+        self.timeout = timeout
+        self._adb_device = adbutils.adb.device(serial=serial)
+        self._fallback = U2InputBackend(fallback) if fallback is not None else None
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self._acks = {}
+        self._acks_lock = threading.Lock()
+        self._conn = None
+        self._alive = False
+        self._open()
+
+    def _open(self) -> None:
+        conn = self._adb_device.open_transport()
+        conn.send_command("shell:sh")
+        conn.check_okay()
+        self._conn = conn
+        self._alive = True
+        threading.Thread(target=self._read_loop, args=(conn,), name="adb-shell-input", daemon=True).start()
+
+    def _read_loop(self, conn) -> None:
+        """读取shell输出，遇到回显标记时唤醒等待的调用方"""
+        buffer = b""
+        while True:
+            try:
+                chunk = conn.read(4096)
+            except Exception:
+                break
+            if not chunk:
+                break
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                text = line.decode("utf-8", errors="ignore").strip()
+                if text.startswith(self.ACK_PREFIX):
+                    with self._acks_lock:
+                        event = self._acks.pop(text, None)
+                    if event is not None:
+                        event.set()
+                elif text:
+                    logger.debug(f"[adb_shell]{text}")
+        if self._conn is not conn:
+            return
+        # 会话已断开，唤醒所有等待者
+        self._alive = False
+        with self._acks_lock:
+            for event in self._acks.values():
+                event.set()
+            self._acks.clear()
+
+    def _close_conn(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def run_batch(self, commands: List[str]) -> bool:
+        """
+        在常驻shell中执行一批命令并等待执行完毕
+        命令写入后即不再重发：等待回显超时时命令可能已经执行，重发会重复点击
+        :param commands: shell命令列表
+        :return: 命令是否已写入shell，建立会话或写入失败时返回False
+        """
+        with self._lock:
+            for attempt in range(2):
+                if self._conn is None:
+                    try:
+                        self._open()
+                    except Exception as e:
+                        logger.warning(f"[adb_shell]建立shell会话失败: {e}")
+                        return False
+                marker = f"{self.ACK_PREFIX}{next(self._seq)}"
+                event = threading.Event()
+                with self._acks_lock:
+                    self._acks[marker] = event
+                line = "; ".join(commands + [f"echo {marker}"]) + "\n"
+                try:
+                    self._conn.send(line.encode("utf-8"))
+                except Exception as e:
+                    # 命令未写入，重新建立会话后再写一次
+                    logger.warning(f"[adb_shell]写入命令失败: {e}")
+                    with self._acks_lock:
+                        self._acks.pop(marker, None)
+                    self._close_conn()
+                    continue
+                if not (event.wait(self.timeout) and self._alive):
+                    logger.warning(f"[adb_shell]等待命令执行超时，不再重发: {commands}")
+                    with self._acks_lock:
+                        self._acks.pop(marker, None)
+                    # 会话可能已失效，下次操作重新建立
+                    self._close_conn()
+                return True
+            return False
+
+    def _run(self, commands: List[str], fallback: str, *args) -> None:
+        if self.run_batch(commands):
+            return
+        if self._fallback is None:
+            raise InputNotSentError(f"adb shell输入失败: {commands}")
+        logger.warning(f"[adb_shell]回退为u2执行{fallback}")
+        getattr(self._fallback, fallback)(*args)
+
+    def click(self, x: int, y: int) -> None:
+        self._run([f"input tap {int(x)} {int(y)}"], "click", x, y)
+
+    def double_click(self, x: int, y: int) -> None:
+        # 两条input tap各自启动进程，间隔过长不会被识别为双击，双击由uiautomator2执行
+        if self._fallback is None:
+            raise InputNotSentError("adb shell输入后端不支持双击")
+        self._fallback.double_click(x, y)
+
+    def long_click(self, x: int, y: int, duration: float = 0.5) -> None:
+        # 起止点相同的swipe即长按
+        ms = int(duration * 1000)
+        self._run([f"input swipe {int(x)} {int(y)} {int(x)} {int(y)} {ms}"], "long_click", x, y, duration)
+
+    def swipe(self, fx: int, fy: int, tx: int, ty: int, duration: float = 0.1) -> None:
+        ms = max(1, int(duration * 1000))
+        self._run([f"input swipe {int(fx)} {int(fy)} {int(tx)} {int(ty)} {ms}"], "swipe", fx, fy, tx, ty, duration)
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_conn()
+
+
+INPUT_BACKENDS = {
+    U2InputBackend.name: U2InputBackend,
+    AdbShellInputBackend.name: AdbShellInputBackend,
+}
+
+
+def create_input_backend(name: str, device: Any, serial: Optional[str] = None) -> InputBackend:
+    """
+    按名称创建输入后端，创建失败时回退为uiautomator2后端
+    :param name: 后端名称，见INPUT_BACKENDS
+    :param device: uiautomator2设备对象
+    :param serial: adb设备序列号，None时取device.serial
+    :return: InputBackend
+    """
+    if name == AdbShellInputBackend.name:
+        try:
+            return AdbShellInputBackend(serial or getattr(device, 'serial', None), fallback=device)
+        except Exception as e:
+            logger.warning(f"创建adb_shell输入后端失败，回退为u2: {e}")
+    elif name != U2InputBackend.name:
+        logger.warning(f"未知的输入后端: {name}，使用u2")
+    return U2InputBackend(device)
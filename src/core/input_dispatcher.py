@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, Hashable, Optional
+from utils import logger
+
+
+class _InputTask:
+    __slots__ = ("func", "args", "key", "future")
+
+    def __init__(self, func: Callable, args: tuple, key: Optional[Hashable], future: Future) -> None:
+        self.func = func
+        self.args = args
+        self.key = key
+        self.future = future
+
+
+class _RepeatTask:
+    __slots__ = ("func", "args", "interval", "next_time")
+
+    def __init__(self, func: Callable, args: tuple, interval: float) -> None:
+        self.func = func
+        self.args = args
+        self.interval = interval
+        self.next_time = 0.0
+
+
+class InputDispatcher:
+    """
+    输入分发线程
+    - 每个设备一个工作线程，按提交顺序依次执行输入操作
+    - submit返回Future，需要保证顺序的调用方可等待其完成，其余调用方提交后直接返回
+    - coalesce=True时，若队列末尾已有相同key且尚未执行的操作，不再重复入队
+    - 重复操作(start_repeat)按间隔由同一线程执行，与普通操作交错且互不打乱顺序
+    - min_interval限制相邻两次操作的最小间隔
+    """
+
+    def __init__(self, name: str = "input", min_interval: float = 0.0) -> None:
+        """
+        :param name: 线程名
+        :param min_interval: 相邻两次输入操作的最小间隔(秒)，0为不限速
+        """
+        self.name = name
+        self.min_interval = min_interval
+        self._queue: Deque[_InputTask] = deque()
+        self._repeats: Dict[Hashable, _RepeatTask] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._busy = False
+        self._last_time = 0.0
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def submit(self, func: Callable, *args: Any, key: Optional[Hashable] = None, coalesce: bool = False) -> Future:
+        """
+        提交输入操作
+        :param func: 执行函数
+        :param args: 函数参数
+        :param key: 操作标识，用于合并重复操作
+        :param coalesce: 是否与队列末尾相同key的未执行操作合并
+        :return: Future，完成时结果为func的返回值
+        """
+        with self._cond:
+            if coalesce and key is not None and self._queue and self._queue[-1].key == key:
+                return self._queue[-1].future
+            task = _InputTask(func, args, key, Future())
+            self._queue.append(task)
+            self._ensure_thread()
+            self._cond.notify_all()
+            return task.future
+
+    def start_repeat(self, key: Hashable, func: Callable, *args: Any, interval: float = 0.05) -> None:
+        """
+        按间隔重复执行操作，直到stop_repeat
+        :param key: 操作标识，相同key重复调用覆盖原操作
+        :param func: 执行函数
+        :param interval: 执行间隔(秒)
+        """
+        with self._cond:
+            self._repeats[key] = _RepeatTask(func, args, interval)
+            self._ensure_thread()
+            self._cond.notify_all()
+
+    def stop_repeat(self, key: Hashable) -> None:
+        """停止重复操作，正在执行的一次不受影响"""
+        with self._cond:
+            self._repeats.pop(key, None)
+            self._cond.notify_all()
+
+    def pending(self) -> int:
+        """队列中未执行的操作数"""
+        with self._cond:
+            return len(self._queue)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待已提交的操作全部执行完毕(不含重复操作)
+        :param timeout: 最长等待时间(秒)，None为一直等待
+        :return: 是否全部执行完毕
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._queue or self._busy:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """停止工作线程，未执行的操作被取消"""
+        with self._cond:
+            self._running = False
+            self._repeats.clear()
+            while self._queue:
+                self._queue.popleft().future.cancel()
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _next_task(self):
+        """取下一个要执行的操作，没有时等待；停止时返回None"""
+        with self._cond:
+            while self._running:
+                now = time.time()
+                wait = None
+                if self._queue:
+                    wait = self._last_time + self.min_interval - now
+                    if wait <= 0:
+                        self._busy = True
+                        return self._queue.popleft()
+                elif self._repeats:
+                    repeat = min(self._repeats.values(), key=lambda r: r.next_time)
+                    wait = max(repeat.next_time, self._last_time + self.min_interval) - now
+                    if wait <= 0:
+                        repeat.next_time = now + repeat.interval
+                        self._busy = True
+                        return repeat
+                self._cond.wait(wait)
+            return None
+
+    def _run(self) -> None:
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            try:
+                if isinstance(task, _InputTask):
+                    if task.future.set_running_or_notify_cancel():
+                        try:
+                            task.future.set_result(task.func(*task.args))
+                        except Exception as e:
+                            logger.error(f"[InputDispatcher]输入操作执行失败: {e}")
+                            task.future.set_exception(e)
+                else:
+                    try:
+                        task.func(*task.args)
+                    except Exception as e:
+                        logger.error(f"[InputDispatcher]重复输入操作执行失败: {e}")
+            finally:
+                with self._cond:
+                    self._last_time = time.time()
+                    self._busy = False
+                    self._cond.notify_all()
@@ -3,16 +3,51 @@ import gc
 import cv2
 import threading
 import traceback
-from typing import List, Optional, Tuple, Union, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union, Any
 import numpy as np
 from PIL import Image, ImageDraw
 from utils.frozen_fix import fix_frozen_environment, safe_import_paddleocr
 from utils import logger
 from utils.get_asset_path import get_asset_path
-import concurrent.futures
+from core.frame import Frame
+from core.coord_transform import CoordTransform, IDENTITY, LOGICAL_HEIGHT, LOGICAL_WIDTH
+from core.screen_signatures import ScreenSignatures
+from core.template_store import Template, TemplateStore
+import functools
 import sys
 
+
+class TemplateMatch(tuple):
+    """
+    多模板匹配的单个结果，可按(x, y, score)解包
+    x/y为匹配区域左上角的逻辑坐标，center为匹配区域中心的逻辑坐标
+    """
+
+    def __new__(cls, x: int, y: int, score: float, center: Tuple[int, int]) -> "TemplateMatch":
+        obj = super().__new__(cls, (x, y, score))
+        obj.center = center
+        return obj
+
+    @property
+    def x(self) -> int:
+        return self[0]
+
+    @property
+    def y(self) -> int:
+        return self[1]
+
+    @property
+    def score(self) -> float:
+        return self[2]
+
+
 class OCRHandler:
+    # 金字塔匹配：粗匹配候选峰值的最低分数、最多候选数，搜索范围面积至少为模板的多少倍才使用
+    _PYRAMID_MIN_SCORE = 0.6
+    _PYRAMID_MAX_CANDIDATES = 20
+    _PYRAMID_MIN_AREA_RATIO = 16
+
     def __init__(self, device_manager, model_dir: Optional[str] = None, show_logger:bool = False) -> None:
         """
         初始化OCR处理器
@@ -26,6 +61,9 @@ class OCRHandler:
         from common.config import config
         self.ocr_confidence_threshold = config.ocr.ocr_confidence_threshold
         self.image_template_match_threshold = config.ocr.image_template_match_threshold
+        self.template_region_padding = config.ocr.template_region_padding
+        self.template_pyramid = config.ocr.template_pyramid
+        self.template_pyramid_min_size = config.ocr.template_pyramid_min_size
         self.debug_mode = getattr(config.ocr, 'debug_mode', False)
         
         # 修复打包环境问题
@@ -100,6 +138,20 @@ class OCRHandler:
                 raise
         
         self.ocr_lock = threading.Lock()  # 新增：OCR推理锁
+        # 模板图片内存缓存，启动时读入assets下所有模板
+        self.templates = TemplateStore()
+        logger.info(f"预加载模板{self.templates.preload_all()}个")
+        # 取色窗口像素下标缓存
+        self._probe_cache = {}
+        # FindColor各查找方向的像素顺序缓存
+        self._scan_orders = {}
+        # 按帧缓存的匹配结果：帧ID -> {匹配参数: 结果}，只保留最近两帧
+        self._match_memo = {}
+        self._match_lock = threading.Lock()
+        # match_many使用的匹配线程池，首次使用时创建
+        self._match_executor: Optional[ThreadPoolExecutor] = None
+        # 界面特征取色点，启动时编译为一张表
+        self.signatures = ScreenSignatures(config.screen_signatures)
 
     def cleanup(self):
         """清理OCR处理器资源"""
@@ -111,10 +163,212 @@ class OCRHandler:
         if hasattr(self, 'ocr_digit'):
             del self.ocr_digit
         
+        if self._match_executor is not None:
+            self._match_executor.shutdown(wait=False)
+            self._match_executor = None
+
         # 强制垃圾回收
         gc.collect()
         logger.info("OCR处理器资源清理完成")
 
+    @staticmethod
+    def _to_bgr(image: Union[Image.Image, np.ndarray, str]) -> Optional[np.ndarray]:
+        """
+        统一转换为BGR格式np.ndarray，np.ndarray(含Frame)原样返回不复制
+        :param image: PIL.Image、OpenCV numpy.ndarray、图片路径
+        :return: np.ndarray 或 None
+        """
+        if isinstance(image, np.ndarray):
+            return image
+        if isinstance(image, str):
+            return cv2.imread(get_asset_path(image))
+        if isinstance(image, Image.Image):
+            return cv2.cvtColor(np.asarray(image.convert('RGB')), cv2.COLOR_RGB2BGR)
+        return None
+
+    def _ensure_region(self, image: Any, region: Optional[Tuple[int, int, int, int]] = None) -> Any:
+        """
+        区域截图得到的帧不含所需区域时，重新截取整帧
+        :param image: 待检测图像
+        :param region: 所需区域，None表示整帧
+        :return: 覆盖所需区域的图像
+        """
+        if not isinstance(image, Frame) or image.covers(region):
+            return image
+        logger.debug(f"区域截图不含所需区域{region}，重新截取整帧")
+        full = self.device_manager.get_screenshot(full=True)
+        return full if full is not None else image
+
+    @staticmethod
+    def _transform_of(image: Any) -> CoordTransform:
+        """
+        获取逻辑坐标到图像像素的换算，Frame使用自带的transform，其它图像按1280x720处理
+        """
+        if isinstance(image, Frame):
+            return image.transform
+        return IDENTITY
+
+    def _load_template(self, template_path: str, transform: CoordTransform = IDENTITY) -> Optional[Template]:
+        """
+        从模板缓存获取模板，截图分辨率不是1280x720时按比例缩放，缩放结果按分辨率缓存
+        :param template_path: 模板图片路径
+        :param transform: 逻辑坐标到截图像素的换算
+        :return: Template(含BGR、灰度图) 或 None
+        """
+        template = self.templates.get(template_path)
+        if template is None:
+            return None
+        return template.scaled(transform)
+
+    def _template_region(self, template_path: str, region: Optional[Tuple[int, int, int, int]],
+                         padding: Optional[int] = None) -> Optional[Tuple[int, int, int, int]]:
+        """
+        确定模板匹配区域：调用方指定region时直接使用；
+        否则使用模板文件名内嵌的区域(xxx__x1_y1_x2_y2.png)，四周外扩padding，都没有时为全图
+        :param padding: 外扩像素(逻辑坐标)，None使用配置template_region_padding
+        :return: 逻辑坐标(x1, y1, x2, y2) 或 None
+        """
+        if region is not None:
+            return region
+        template = self.templates.get(template_path)
+        if template is None or template.region is None:
+            return None
+        if padding is None:
+            padding = self.template_region_padding
+        x1, y1, x2, y2 = template.region
+        return (max(0, x1 - padding), max(0, y1 - padding),
+                min(LOGICAL_WIDTH, x2 + padding), min(LOGICAL_HEIGHT, y2 + padding))
+
+    @staticmethod
+    def _crop_rgb(image: Union[Image.Image, np.ndarray], x1: int, y1: int, x2: int, y2: int) -> np.ndarray:
+        """
+        裁剪区域并转换为RGB像素数组，超出图像边界的部分以0填充(与PIL.Image.crop一致)
+        :param image: PIL.Image 或 BGR格式np.ndarray
+        :return: (y2-y1, x2-x1, 3) RGB数组
+        """
+        if not isinstance(image, np.ndarray):
+            return np.asarray(image.crop((x1, y1, x2, y2)).convert('RGB'))
+        h, w = image.shape[:2]
+        sx1, sy1, sx2, sy2 = max(0, x1), max(0, y1), min(w, x2), min(h, y2)
+        # Frame复用缓存的RGB图，普通ndarray按通道倒序取BGR -> RGB
+        src = image.rgb if isinstance(image, Frame) else image[:, :, 2::-1]
+        if sx1 == x1 and sy1 == y1 and sx2 == x2 and sy2 == y2:
+            return src[y1:y2, x1:x2]
+        out = np.zeros((max(0, y2 - y1), max(0, x2 - x1), 3), dtype=np.uint8)
+        if sx2 > sx1 and sy2 > sy1:
+            out[sy1 - y1:sy2 - y1, sx1 - x1:sx2 - x1] = src[sy1:sy2, sx1:sx2]
+        return out
+
+    @staticmethod
+    def _to_gray(image: np.ndarray) -> np.ndarray:
+        """
+        BGR图转灰度，Frame直接复用缓存的灰度图
+        """
+        if isinstance(image, Frame):
+            return image.gray
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    def _frame_memo(self, image: Any, key: tuple, compute):
+        """
+        按帧缓存匹配结果：同一帧(帧ID相同)上参数相同的匹配只计算一次
+        只保留最近两帧的结果，没有帧ID的图像(区域视图、外部传入的图片)不缓存
+        :param image: 实际参与匹配的图像
+        :param key: 匹配参数
+        :param compute: 计算函数，缓存未命中时调用
+        """
+        frame_id = image.frame_id if isinstance(image, Frame) else None
+        if frame_id is None:
+            return compute()
+        with self._match_lock:
+            memo = self._match_memo.get(frame_id)
+            if memo is not None and key in memo:
+                return memo[key]
+        result = compute()
+        with self._match_lock:
+            memo = self._match_memo.get(frame_id)
+            if memo is None:
+                while len(self._match_memo) >= 2:
+                    self._match_memo.pop(min(self._match_memo))
+                memo = self._match_memo[frame_id] = {}
+            memo[key] = result
+        return result
+
+    def _match_template(self, image: np.ndarray, template_path: str,
+                        region: Optional[Tuple[int, int, int, int]], gray: bool,
+                        pyramid: Optional[bool] = None) -> Optional[tuple]:
+        """
+        模板匹配原始结果，按(帧ID, 模板, 区域, 灰度, 是否金字塔)缓存，阈值由调用方在结果上判断
+        :param image: BGR格式图像(已确认覆盖匹配区域)
+        :param region: 逻辑坐标匹配区域，None为全图
+        :param pyramid: 是否金字塔粗到精匹配，None使用配置template_pyramid
+        :return: (相关系数图, 最大相关系数, 最大值位置, 区域左上角像素坐标, 模板高, 模板宽)，
+                 模板读取失败返回None；坐标均为截图像素坐标
+        """
+        if pyramid is None:
+            pyramid = self.template_pyramid
+
+        def compute():
+            transform = self._transform_of(image)
+            template = self._load_template(template_path, transform)
+            if template is None:
+                return None
+            th, tw = template.height, template.width
+            # 匹配区域裁剪(逻辑坐标换算为截图坐标)
+            pixel_region = transform.to_region(region)
+            x1, y1, x2, y2 = pixel_region if pixel_region is not None else (0, 0, None, None)
+            if gray:
+                # 整帧灰度图由Frame缓存，区域取视图；模板灰度图由模板缓存提供
+                img_proc = self._to_gray(image)[y1:y2, x1:x2]
+                template_proc = template.gray
+            else:
+                img_proc = image[y1:y2, x1:x2]
+                template_proc = template.bgr
+            # 模板缩小后仍可辨认、且搜索范围远大于模板时才使用金字塔匹配
+            factor = template.pyramid_factor(self.template_pyramid_min_size) if pyramid else 1
+            if factor > 1 and img_proc.shape[0] * img_proc.shape[1] >= self._PYRAMID_MIN_AREA_RATIO * th * tw:
+                coarse_template = template.downscaled(factor)[1 if gray else 0]
+                res = self._pyramid_match(img_proc, template_proc, coarse_template, factor)
+            else:
+                res = cv2.matchTemplate(img_proc, template_proc, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, max_loc = cv2.minMaxLoc(res)
+            return res, max_val, max_loc, (x1, y1), th, tw
+        key = ("template", template_path, tuple(region) if region is not None else None, gray, bool(pyramid))
+        return self._frame_memo(image, key, compute)
+
+    def _pyramid_match(self, img_proc: np.ndarray, template_proc: np.ndarray,
+                       coarse_template: np.ndarray, factor: int) -> np.ndarray:
+        """
+        金字塔粗到精匹配：先在缩小factor倍的图上匹配，取分数较高的候选峰值，
+        再只在各候选位置附近按原分辨率精确匹配
+        :param img_proc: 原分辨率搜索图(BGR或灰度)
+        :param template_proc: 原分辨率模板
+        :param coarse_template: 缩小factor倍的模板
+        :return: 与原分辨率matchTemplate同尺寸的相关系数图，精匹配位置为真实分数，其余为-1；
+                 阈值判断、取最大值、非极大值抑制与普通匹配完全一致
+        """
+        h, w = img_proc.shape[:2]
+        th, tw = template_proc.shape[:2]
+        ch, cw = coarse_template.shape[:2]
+        small = cv2.resize(img_proc, (w // factor, h // factor), interpolation=cv2.INTER_AREA)
+        coarse = cv2.matchTemplate(small, coarse_template, cv2.TM_CCOEFF_NORMED)
+        ys, xs = self._score_peaks(coarse, self._PYRAMID_MIN_SCORE, cw, ch)
+        candidates = list(zip(ys[:self._PYRAMID_MAX_CANDIDATES].tolist(), xs[:self._PYRAMID_MAX_CANDIDATES].tolist()))
+        # 粗匹配最大值始终精匹配，保证返回的最大相关系数有意义
+        _, _, _, (best_x, best_y) = cv2.minMaxLoc(coarse)
+        if (best_y, best_x) not in candidates:
+            candidates.append((best_y, best_x))
+        res = np.full((h - th + 1, w - tw + 1), -1, dtype=np.float32)
+        # 缩小取整最多带来factor像素偏差，精匹配窗口向四周各扩2倍factor
+        margin = 2 * factor
+        for cy, cx in candidates:
+            x1, y1 = max(0, cx * factor - margin), max(0, cy * factor - margin)
+            x2, y2 = min(res.shape[1], cx * factor + margin + 1), min(res.shape[0], cy * factor + margin + 1)
+            if x2 <= x1 or y2 <= y1:
+                continue
+            res[y1:y2, x1:x2] = cv2.matchTemplate(img_proc[y1:y2 + th - 1, x1:x2 + tw - 1], template_proc,
+                                                  cv2.TM_CCOEFF_NORMED)
+        return res
+
     def match_texts(
         self,
         keywords: List[str],
@@ -147,13 +401,14 @@ class OCRHandler:
             if image is None:
                 logger.warning("无法获取截图，无法进行文本匹配")
                 return False
+            image = self._ensure_region(image, region)
 
             # 区域裁剪
             if region is not None:
                 if isinstance(image, Image.Image):
                     processed_image = image.crop(region)
                 elif isinstance(image, np.ndarray):
-                    x1, y1, x2, y2 = region
+                    x1, y1, x2, y2 = self._transform_of(image).to_region(region)
                     processed_image = image[y1:y2, x1:x2]
                 else:
                     logger.warning("region参数仅支持PIL.Image或np.ndarray类型图片裁剪")
@@ -162,7 +417,7 @@ class OCRHandler:
                 processed_image = image
                 
             if isinstance(processed_image, Image.Image):
-                processed_image = cv2.cvtColor(np.array(processed_image), cv2.COLOR_RGB2BGR)
+                processed_image = self._to_bgr(processed_image)
             with self.ocr_lock:
                 result = self.ocr.ocr(processed_image, cls=True)
             if not result:
@@ -229,6 +484,8 @@ class OCRHandler:
             if image is None:
                 logger.warning("无法获取截图，无法进行文本匹配点击")
                 return False
+            image = self._ensure_region(image, region)
+            transform = self._transform_of(image)
 
             # 区域裁剪
             offset_x, offset_y = 0, 0
@@ -237,13 +494,13 @@ class OCRHandler:
                     image = image.crop(region)
                     offset_x, offset_y = region[0], region[1]
                 elif isinstance(image, np.ndarray):
-                    x1, y1, x2, y2 = region
+                    x1, y1, x2, y2 = transform.to_region(region)
                     image = image[y1:y2, x1:x2]
                     offset_x, offset_y = x1, y1
                 else:
                     logger.warning("region参数仅支持PIL.Image或np.ndarray类型图片裁剪")
             if isinstance(image, Image.Image):
-                image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+                image = self._to_bgr(image)
             with self.ocr_lock:
                 result = self.ocr.ocr(image, cls=True)
             if not result:
@@ -274,6 +531,8 @@ class OCRHandler:
                     # box: 4点坐标，需加region偏移
                     x = int(sum([p[0] for p in box]) / 4) + offset_x
                     y = int(sum([p[1] for p in box]) / 4) + offset_y
+                    # 截图坐标换算回逻辑坐标再点击
+                    x, y = transform.from_point(x, y)
                     if hasattr(self, "device_manager"):
                         self.device_manager.click(x, y)
                         logger.debug(f"点击文本 '{text}' 的中心点 ({x},{y})，置信度{confidence:.2f} (已加region偏移)")
@@ -299,6 +558,7 @@ class OCRHandler:
         try:
             if image is None:
                 image = self.device_manager.get_screenshot()
+            image = self._ensure_region(image, region)
             # 区域裁剪前，若指定region，保存画红框的调试图片
             if region is not None:
                 # 只支持PIL.Image调试保存
@@ -319,16 +579,22 @@ class OCRHandler:
                         from PIL import Image as PILImage
                         image = image.resize((w * scale, h * scale), PILImage.Resampling.LANCZOS)
                 elif isinstance(image, np.ndarray):
+                    transform = self._transform_of(image)
                     x1, y1, x2, y2 = region
-                    image = image[y1:y2, x1:x2]
-                    # 放大
+                    fx1, fy1, fx2, fy2 = transform.to_region(region)
+                    image = image[fy1:fy2, fx1:fx2]
+                    # 放大(按逻辑尺寸放大，识别框坐标与截图分辨率无关)
                     if scale > 1:
                         image = cv2.resize(image, ((x2-x1)*scale, (y2-y1)*scale), interpolation=cv2.INTER_LANCZOS4)
+                    elif not transform.is_identity:
+                        image = cv2.resize(image, (x2-x1, y2-y1), interpolation=cv2.INTER_LINEAR)
                 else:
                     logger.warning("region参数仅支持PIL.Image或np.ndarray类型图片裁剪")
+            # 整图识别时识别框需从截图坐标换算回逻辑坐标
+            box_transform = self._transform_of(image) if region is None else IDENTITY
             # 如果是 PIL.Image，先转成 OpenCV 格式（BGR）
             if isinstance(image, Image.Image):
-                image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+                image = self._to_bgr(image)
             with self.ocr_lock:
                 if rec_char_type == 'digit':
                     result = self.ocr_digit.ocr(image, cls=True)
@@ -347,9 +613,12 @@ class OCRHandler:
                     confidence = item[1][1]
                     if confidence >= self.ocr_confidence_threshold:  # 使用配置中的OCR置信度阈值
                         # logger.debug(f"OCR识别文本: {item[1][0]}，置信度: {confidence:.2f}") 
+                        box = item[0]
+                        if not box_transform.is_identity:
+                            box = [[p[0] / box_transform.sx, p[1] / box_transform.sy] for p in box]
                         processed_results.append({
                             'text': item[1][0],
-                            'box': item[0],
+                            'box': box,
                             'confidence': confidence
                         })
             return processed_results
@@ -366,15 +635,21 @@ class OCRHandler:
         region: Optional[Tuple[int, int, int, int]] = None,
         gray: bool = False,
         debug: bool = False,
+        padding: Optional[int] = None,
+        pyramid: Optional[bool] = None,
     ) -> Optional[Tuple[int, int]]:
         """
         使用模板匹配，判断image中指定区域是否包含template_path指定的图片，返回匹配到的左上角坐标。
-        检查模板文件名是否匹配规则xxx__x1_y1_x2_y2.png，若匹配则自动提取region坐标，否则region为None。
+        检查模板文件名是否匹配规则xxx__x1_y1_x2_y2.png，若匹配且未指定region，则在该区域外扩padding后的范围内匹配，
+        否则匹配全图。带区域后缀的模板也可以用不带后缀的路径(xxx.png)引用。
         :param image: 支持 PIL.Image、OpenCV numpy.ndarray、图片路径
         :param template_path: 模板图片路径
         :param threshold: 图像模板匹配阈值，默认0.95
-        :param region: (x1, y1, x2, y2) 匹配区域，默认全图
+        :param region: (x1, y1, x2, y2) 匹配区域，指定时优先于文件名中的区域，默认全图
         :param debug: 是否保存调试图片，保存到debug目录
+        :param padding: 文件名内嵌区域的外扩像素，None使用配置template_region_padding
+        :param pyramid: 是否先缩小粗匹配再在候选位置精匹配，None使用配置template_pyramid；
+                        模板太小或搜索范围太小时自动使用普通匹配，阈值和返回坐标不变
         :return: (x, y) 匹配到的左上角坐标，未匹配返回None
         """
         try:
@@ -386,38 +661,20 @@ class OCRHandler:
             if image is None:
                 logger.error("Input image is None")
                 return None
-            if isinstance(image, str):
-                image = cv2.imread(get_asset_path(image))
-            elif isinstance(image, Image.Image):
-                image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-            orig_image = image.copy()  # 保存原始图片
-
-            # 读取模板始终用get_asset_path
-            template = cv2.imread(get_asset_path(template_path))
-            if template is None:
-                logger.error(f"模板图片读取失败: {template_path}")
+            region = self._template_region(template_path, region, padding)
+            image = self._ensure_region(image, region)
+            transform = self._transform_of(image)
+            image = self._to_bgr(image)
+            if image is None:
+                logger.error("Input image is None")
                 return None
-            th, tw = template.shape[:2]
-
-            # 3. 匹配区域裁剪
-            if region is not None:
-                x1, y1, x2, y2 = region
-                image_crop = image[y1:y2, x1:x2]
-            else:
-                x1, y1, x2, y2 = 0, 0, 0, 0
-                image_crop = image
-
-            # 4. 灰度化
-            if gray:
-                img_proc = cv2.cvtColor(image_crop, cv2.COLOR_BGR2GRAY)
-                template_proc = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
-            else:
-                img_proc = image_crop
-                template_proc = template
 
-            # 5. 模板匹配
-            res = cv2.matchTemplate(img_proc, template_proc, cv2.TM_CCOEFF_NORMED)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
+            # 模板取自内存缓存并按截图分辨率缩放；同一帧的相同匹配直接复用结果
+            matched = self._match_template(image, template_path, region, gray, pyramid)
+            if matched is None:
+                logger.error(f"模板图片读取失败: {template_path}")
+                return None
+            _, max_val, max_loc, (offset_x, offset_y), th, tw = matched
             if self.debug_mode:
                 logger.info(f"[OCR调试] match_image 模板路径: {template_path}")
                 logger.info(f"[OCR调试] 最大相关系数: {max_val:.3f}")
@@ -427,10 +684,9 @@ class OCRHandler:
             if debug:
                 logger.info(f"模板:{template_path},匹配系数: {max_val:.3f},阈值: {threshold}")
                 os.makedirs("debug", exist_ok=True)
-                debug_img = orig_image.copy()
+                debug_img = image.copy()
                 # 匹配区域左上角坐标
-                match_x = max_loc[0] + (region[0] if region else 0)
-                match_y = max_loc[1] + (region[1] if region else 0)
+                match_x, match_y = max_loc[0] + offset_x, max_loc[1] + offset_y
                 # 画矩形框
                 cv2.rectangle(debug_img, (match_x, match_y), (match_x + tw, match_y + th), (0, 0, 255), 2)
                 cv2.imwrite("debug/match_image_result.png", debug_img)
@@ -438,8 +694,7 @@ class OCRHandler:
 
             # 7. 匹配结果坐标
             if max_val >= threshold:
-                match_x = max_loc[0] + (region[0] if region else 0)
-                match_y = max_loc[1] + (region[1] if region else 0)
+                match_x, match_y = transform.from_point(max_loc[0] + offset_x, max_loc[1] + offset_y)
                 # logger.debug(f"模板匹配成功，坐标: ({match_x}, {match_y})")
                 return (match_x, match_y)
             else:
@@ -463,8 +718,7 @@ class OCRHandler:
         import cv2
         from PIL import Image
         # 转换为OpenCV格式
-        if isinstance(image, Image.Image):
-            image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+        image = OCRHandler._to_bgr(image)
         if region is not None:
             x1, y1, x2, y2 = region
             base, ext = os.path.splitext(save_path)
@@ -473,9 +727,39 @@ class OCRHandler:
         cv2.imwrite(save_path, image)
         return save_path 
 
+    def _scan_order(self, width: int, height: int, dir: int) -> np.ndarray:
+        """
+        区域内像素按查找方向排列的展平下标，按(宽, 高, 方向)缓存
+        :param dir: 0左上到右下(逐行)，1中心向四周，2右下到左上，3左下到右上，4右上到左下
+        :return: 下标数组，方向无效时为空
+        """
+        key = (width, height, dir)
+        order = self._scan_orders.get(key)
+        if order is None:
+            ys, xs = np.mgrid[0:height, 0:width]
+            if dir == 0:
+                order = np.arange(width * height)
+            elif dir == 1:
+                # 中心向四周：按与中心的切比雪夫距离由近到远，同一圈内按dx、dy升序
+                dx, dy = xs - width // 2, ys - height // 2
+                ring = np.maximum(np.abs(dx), np.abs(dy))
+                order = np.lexsort((dy.ravel(), dx.ravel(), ring.ravel()))
+            elif dir == 2:
+                order = np.arange(width * height)[::-1]
+            elif dir == 3:
+                order = (ys[::-1, :] * width + xs).ravel()
+            elif dir == 4:
+                order = (ys * width + xs[:, ::-1]).ravel()
+            else:
+                order = np.empty(0, dtype=np.intp)
+            if len(self._scan_orders) >= 64:
+                self._scan_orders.clear()
+            self._scan_orders[key] = order
+        return order
+
     def FindColor(
         self, 
-        image: Image.Image, 
+        image: Union[Image.Image, np.ndarray], 
         x1: int, y1: int, x2: int, y2: int, 
         color: str, 
         sim: float, 
@@ -483,176 +767,170 @@ class OCRHandler:
     ) -> Tuple[int, Optional[int], Optional[int]]:
         """
         在指定区域查找指定颜色，支持多色和偏色。
-        :param image: PIL.Image，原始图片
+        一次计算所有颜色的相似度掩码，再按查找方向取第一个命中点；颜色按列表顺序优先
+        :param image: Frame/BGR格式np.ndarray 或 PIL.Image，原始图片
         :param x1, y1, x2, y2: 区域左上和右下坐标
-        :param color: 颜色字符串，格式"BBGGRR"，支持多色和偏色
+        :param color: 颜色字符串，格式"RRGGBB"，多色用|分隔，偏色格式"RRGGBB-偏色"
         :param sim: 相似度，0~1
         :param dir: 查找方向，0~4
         :return: (序号, x, y)，没找到返回(-1, None, None)
         """
-        def parse_colors(color_str):
-            color_list = []
-            for part in color_str.split('|'):
-                if '-' in part:
-                    base, bias = part.split('-')
-                    color_list.append((base, bias))
-                else:
-                    color_list.append((part, None))
-            return color_list
-
-        def hex_to_bgr(hexstr):
-            hexstr = str(hexstr).lstrip('#')
-            if len(hexstr) != 6:
-                logger.error(f"Invalid color hex: {hexstr}")
-                return None
-            try:
-                return tuple(int(hexstr[i:i+2], 16) for i in (0, 2, 4))
-            except Exception as e:
-                logger.error(f"hex_to_bgr error: {hexstr}, {e}")
-                return None
-
-        def bgr_to_hex(bgr):
-            # (B, G, R) -> "BBGGRR"
-            return '{:02X}{:02X}{:02X}'.format(bgr[0], bgr[1], bgr[2])
-
-        color_defs = parse_colors(color)
-        region = image.crop((x1, y1, x2, y2)).convert('RGB')
-        width, height = region.size
-        pixels = region.load()
-        if pixels is None:
+        image = self._ensure_region(image, (x1, y1, x2, y2))
+        # 逻辑坐标换算为截图坐标，返回前再换算回来
+        transform = self._transform_of(image)
+        x1, y1, x2, y2 = transform.to_region((x1, y1, x2, y2))
+        region = self._crop_rgb(image, x1, y1, x2, y2)
+        height, width = region.shape[:2]
+        if width == 0 or height == 0:
             return -1, None, None
 
-        def gen_coords(w, h, dir):
-            if dir == 0:  # 左上到右下
-                for y in range(h):
-                    for x in range(w):
-                        yield x, y
-            elif dir == 1:  # 中心向四周
-                cx, cy = w // 2, h // 2
-                for r in range(max(w, h)):
-                    for dx in range(-r, r+1):
-                        for dy in range(-r, r+1):
-                            x, y = cx + dx, cy + dy
-                            if 0 <= x < w and 0 <= y < h:
-                                yield x, y
-            elif dir == 2:  # 右下到左上
-                for y in reversed(range(h)):
-                    for x in reversed(range(w)):
-                        yield x, y
-            elif dir == 3:  # 左下到右上
-                for y in reversed(range(h)):
-                    for x in range(w):
-                        yield x, y
-            elif dir == 4:  # 右上到左下
-                for y in range(h):
-                    for x in reversed(range(w)):
-                        yield x, y
-
-        def color_sim(c1, c2, bias=None):
-            # c1, c2: (B, G, R)
-            if bias:
-                bias_bgr = hex_to_bgr(bias)
-                if bias_bgr is not None:
-                    c2 = tuple(min(255, max(0, c2[i] + bias_bgr[i])) for i in range(3))
-            dist = sum((c1[i] - c2[i]) ** 2 for i in range(3)) ** 0.5
-            return 1 - dist / (3 * 255)
-        
-        # 4. 遍历查找
-        checked_pixels = 0
-        for idx, (col_hex, bias) in enumerate(color_defs):
-            target_bgr = hex_to_bgr(col_hex)
-            for x, y in gen_coords(width, height, dir):
-                pix = pixels[x, y][:3]
-                similarity = color_sim(pix, target_bgr, bias)
-                checked_pixels += 1
-                if similarity >= sim:
-                    # logger.debug(f"FindColor: 匹配成功 idx={idx}, 坐标=({x1 + x},{y1 + y}), 像素={bgr_to_hex(pix)}, 目标={bgr_to_hex(target_bgr)}, 相似度={similarity:.3f}")
-                    return idx, x1 + x, y1 + y
+        targets = []
+        for part in color.split('|'):
+            col_hex, _, bias = part.partition('-')
+            target = self._parse_hex(col_hex)
+            if target is not None and bias:
+                bias_rgb = self._parse_hex(bias)
+                if bias_rgb is not None:
+                    target = tuple(min(255, max(0, target[i] + bias_rgb[i])) for i in range(3))
+            targets.append(target)
+        valid = [t for t in targets if t is not None]
+        matched = []
+        if valid:
+            # (颜色数, 像素数)的命中掩码
+            pixels = region.reshape(-1, 3).astype(np.int32)
+            diff = pixels[None, :, :] - np.array(valid, dtype=np.int32)[:, None, :]
+            matched = list(1 - np.sqrt((diff * diff).sum(axis=2)) / (3 * 255) >= sim)
+        order = self._scan_order(width, height, dir)
+        for idx, target in enumerate(targets):
+            if target is None:
+                raise ValueError(f"Invalid color: {color}")
+            hits = matched.pop(0)[order]
+            if hits.any():
+                pos = int(order[int(np.argmax(hits))])
+                return (idx, *transform.from_point(x1 + pos % width, y1 + pos // width))
         return -1, None, None
 
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _parse_hex(hexstr: str) -> Optional[Tuple[int, int, int]]:
+        """
+        解析"RRGGBB"颜色字符串，结果缓存
+        :return: (R, G, B)，格式错误返回None
+        """
+        hexstr = str(hexstr).lstrip('#')
+        if len(hexstr) != 6:
+            logger.error(f"Invalid color hex: {hexstr}")
+            return None
+        try:
+            return tuple(int(hexstr[i:i+2], 16) for i in (0, 2, 4))
+        except Exception as e:
+            logger.error(f"hex_to_bgr error: {hexstr}, {e}")
+            return None
+
+    def _probe_index(self, probes: tuple, height: int, width: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        计算各取色窗口在展平图像中的像素下标，按(窗口, 图像尺寸)缓存
+        :param probes: ((x, y, range_), ...)，窗口为[x-range_, x+range_) x [y-range_, y+range_)
+        :return: (下标数组, 是否在图像内, 各窗口像素数)，图像外的像素下标为0
+        """
+        key = (probes, height, width)
+        cached = self._probe_cache.get(key)
+        if cached is None:
+            indices, valids, sizes = [], [], []
+            for x, y, r in probes:
+                ys, xs = np.mgrid[y - r:y + r, x - r:x + r]
+                valid = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+                indices.append(np.where(valid, ys * width + xs, 0).ravel())
+                valids.append(valid.ravel())
+                sizes.append(valid.size)
+            cached = (np.concatenate(indices), np.concatenate(valids), np.array(sizes))
+            if len(self._probe_cache) >= 256:
+                self._probe_cache.clear()
+            self._probe_cache[key] = cached
+        return cached
 
-    def match_point_color(self, image: Image.Image, points: list[tuple[int, int, str, int]], 
+    def match_point_color(self, image: Union[Image.Image, np.ndarray], points: list[tuple[int, int, str, int]], 
                                 ambiguity: float = 0.95, dir: int = 0, debug = False) -> bool:
         """
         高性能多点颜色匹配：所有点都需匹配成功才返回True
-        :param image: PIL.Image，原始图片
+        一次下标取出所有取色窗口的像素，用numpy广播计算与目标色的相似度
+        :param image: Frame/BGR格式np.ndarray 或 PIL.Image，原始图片
         :param points: [(x, y, color, range_), ...]，待检测的点坐标列表
         :param ambiguity: 相似度
         :param dir: 查找方向
         :return: bool，所有点都匹配才返回True
         """
         try:
-            # 5. 支持多点并行（默认多线程并行，避免多进程pickle问题）
-            # 预处理：将所有点的区域crop出来，避免重复读取
-            regions = []  # [(region_img, x, y, color, range_)]
-            for x, y, color, range_ in points:
-                x1 = x - range_
-                y1 = y - range_
-                x2 = x + range_
-                y2 = y + range_
-                region = image.crop((x1, y1, x2, y2)).convert('RGB')
-                regions.append((region, x, y, color, range_))
-
-            # 定义单点匹配函数（多线程可用闭包）
-            def check_point(region_img, color, ambiguity):
-                width, height = region_img.size
-                pixels = region_img.load()
-                if pixels is None:
-                    return False
-                if isinstance(color, (list, tuple)) and len(color) == 3:
-                    def color_sim(c1, c2):
-                        dist = sum((c1[i] - c2[i]) ** 2 for i in range(3)) ** 0.5
-                        return 1 - dist / (3 * 255)
-                    for dx in range(width):
-                        for dy in range(height):
-                            pix = pixels[dx, dy][:3]
-                            if color_sim(pix, color) >= ambiguity:
-                                return True
-                    return False
-                else:
-                    # 先确保color为str并去除#前缀
-                    if not isinstance(color, str):
-                        color = '{:02X}{:02X}{:02X}'.format(*color)
-                    color = str(color).lstrip('#')
-                    def hex_to_bgr(hexstr):
-                        hexstr = str(hexstr).lstrip('#')
-                        if len(hexstr) != 6:
-                            logger.error(f"Invalid color hex: {hexstr}")
-                            return None
-                        try:
-                            return tuple(int(hexstr[i:i+2], 16) for i in (0, 2, 4))
-                        except Exception as e:
-                            logger.error(f"hex_to_bgr error: {hexstr}, {e}")
-                            return None
-                    target_bgr = hex_to_bgr(color)
-                    if target_bgr is None:
-                        return False
-                    def color_sim(c1, c2):
-                        dist = sum((c1[i] - c2[i]) ** 2 for i in range(3)) ** 0.5
-                        return 1 - dist / (3 * 255)
-                    for dx in range(width):
-                        for dy in range(height):
-                            pix = pixels[dx, dy][:3]
-                            if color_sim(pix, target_bgr) >= ambiguity:
-                                return True
-                    return False
+            if not points:
+                return True
+            if isinstance(image, Frame) and image.valid_regions is not None:
+                if not all(image.covers((x - r, y - r, x + r, y + r)) for x, y, _, r in points):
+                    image = self._ensure_region(image)
+            # 同一帧上相同的取色点直接复用结果
+            key = ("color", tuple((x, y, c if isinstance(c, str) else tuple(c), r) for x, y, c, r in points), ambiguity)
+            return self._frame_memo(image, key, lambda: self._match_points(image, points, ambiguity))
+        except Exception as e:
+            logger.error(f"match_point_color_mult 执行异常: {e}\n{traceback.format_exc()}")
+            return False
 
-            # 多线程并行检查所有点
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future_region_pairs = [
-                    (executor.submit(check_point, region_img, color, ambiguity), (region_img, x, y, color, range_))
-                    for region_img, x, y, color, range_ in regions
-                ]
-                all_passed = True
-                for future, (region_img, x, y, color, range_) in future_region_pairs:
-                    result = future.result()
-                    if not result:
-                        all_passed = False
-                if not all_passed:
+    def _match_points(self, image: Union[Image.Image, np.ndarray], points: list, ambiguity: float) -> bool:
+        """match_point_color的计算部分，图像已确认覆盖所有取色点"""
+        transform = self._transform_of(image)
+        probes, targets = [], []
+        for x, y, color, range_ in points:
+            if isinstance(color, (list, tuple)) and len(color) == 3:
+                target = tuple(color)
+            else:
+                if not isinstance(color, str):
+                    color = '{:02X}{:02X}{:02X}'.format(*color)
+                target = self._parse_hex(color)
+                if target is None:
                     return False
-            return True
+            # 取色点和范围按截图分辨率换算
+            x, y = transform.to_point(x, y)
+            probes.append((int(x), int(y), int(transform.to_radius(range_))))
+            targets.append(target)
+
+        if isinstance(image, np.ndarray):
+            # BGR直接取像素再翻转通道，无需整帧转RGB
+            pixels_src, channel_order = image, slice(2, None, -1)
+        else:
+            pixels_src, channel_order = np.asarray(image.convert('RGB')), slice(None)
+        height, width = pixels_src.shape[:2]
+        index, valid, sizes = self._probe_index(tuple(probes), height, width)
+        if not sizes.all():
+            # 范围为0的窗口不含像素，视为未匹配
+            return False
+        pixels = pixels_src.reshape(-1, pixels_src.shape[2])[index][:, channel_order].astype(np.int32)
+        # 图像外的像素按黑色处理(与PIL.Image.crop一致)
+        pixels[~valid] = 0
+        diff = pixels - np.repeat(np.array(targets, dtype=np.int32), sizes, axis=0)
+        similarity = 1 - np.sqrt((diff * diff).sum(axis=1)) / (3 * 255)
+        hits = similarity >= ambiguity
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        return bool((np.add.reduceat(hits, starts) > 0).all())
+
+    def match_signature(self, image: Union[Image.Image, np.ndarray], name: str) -> bool:
+        """
+        判断图像是否命中界面特征(见config/screen_signatures.yaml)
+        同一帧的所有特征一次计算完成，后续查询直接读取结果
+        :param image: Frame/BGR格式np.ndarray 或 PIL.Image
+        :param name: 特征名
+        :return: bool
+        """
+        try:
+            if name not in self.signatures:
+                logger.error(f"未定义的界面特征: {name}")
+                return False
+            if isinstance(image, Frame) and image.valid_regions is not None:
+                if not all(image.covers(bound) for bound in self.signatures.bounds(name)):
+                    image = self._ensure_region(image)
+            image = self._to_bgr(image)
+            if image is None:
+                return False
+            return self.signatures.evaluate(image)[name]
         except Exception as e:
-            logger.error(f"match_point_color_mult 执行异常: {e}\n{traceback.format_exc()}")
+            logger.error(f"match_signature 执行异常: {e}\n{traceback.format_exc()}")
             return False
 
     def match_image_multi(
@@ -662,17 +940,27 @@ class OCRHandler:
         threshold: Optional[float] = None,
         region: Optional[Tuple[int, int, int, int]] = None,
         gray: bool = False,
-    ) -> list[tuple[int, int, float]]:
+        padding: Optional[int] = None,
+        nms: bool = True,
+        max_results: Optional[int] = None,
+        debug: bool = False,
+        pyramid: Optional[bool] = None,
+    ) -> list[TemplateMatch]:
         """
-        多模板匹配，返回所有相关系数大于等于阈值的点坐标及分数，并将所有匹配区域画框保存到debug目录。
+        多模板匹配，返回所有相关系数大于等于阈值的匹配位置及分数。
+        默认做非极大值抑制：同一目标附近的多个达标位置只保留分数最高的一个，结果按分数从高到低排列。
         :param image: 支持 PIL.Image、OpenCV numpy.ndarray、图片路径
         :param template_path: 模板图片路径
         :param threshold: 图像模板匹配阈值，默认0.95
-        :param region: (x1, y1, x2, y2) 匹配区域，默认全图
+        :param region: (x1, y1, x2, y2) 匹配区域，默认使用模板文件名内嵌的区域(见match_image)，都没有时为全图
         :param gray: 是否灰度匹配
-        :return: [(x, y, score), ...]，所有匹配点的左上角坐标及分数
+        :param padding: 文件名内嵌区域的外扩像素，None使用配置template_region_padding
+        :param nms: 是否合并同一目标的重复结果，False时返回所有达标位置(按行扫描顺序)
+        :param max_results: 最多返回的结果数，None不限制
+        :param debug: 是否将所有匹配区域画框保存到debug目录
+        :param pyramid: 是否先缩小粗匹配再在候选位置精匹配，None使用配置template_pyramid(见match_image)
+        :return: [TemplateMatch(x, y, score), ...]，x/y为左上角坐标，center为中心坐标
         """
-        import numpy as np
         try:
             # 使用配置中的默认阈值
             if threshold is None:
@@ -682,62 +970,144 @@ class OCRHandler:
             if image is None:
                 logger.error("Input image is None")
                 return []
-            if isinstance(image, str):
-                image = cv2.imread(get_asset_path(image))
-            elif isinstance(image, Image.Image):
-                image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-            orig_image = image.copy()
+            region = self._template_region(template_path, region, padding)
+            image = self._ensure_region(image, region)
+            transform = self._transform_of(image)
+            image = self._to_bgr(image)
+            if image is None:
+                logger.error("Input image is None")
+                return []
 
-            template = cv2.imread(get_asset_path(template_path))
-            if template is None:
+            matched = self._match_template(image, template_path, region, gray, pyramid)
+            if matched is None:
                 logger.error(f"模板图片读取失败: {template_path}")
                 return []
-            th, tw = template.shape[:2]
-
-            # 3. 匹配区域裁剪
-            offset_x, offset_y = 0, 0
-            if region is not None:
-                x1, y1, x2, y2 = region
-                image_crop = image[y1:y2, x1:x2]
-                offset_x, offset_y = x1, y1
+            res, _, _, (offset_x, offset_y), th, tw = matched
+            if nms:
+                y_idxs, x_idxs = self._score_peaks(res, threshold, tw, th)
             else:
-                image_crop = image
-
-            # 4. 灰度化
-            if gray:
-                img_proc = cv2.cvtColor(image_crop, cv2.COLOR_BGR2GRAY)
-                template_proc = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
-            else:
-                img_proc = image_crop
-                template_proc = template
-
-            # 5. 模板匹配
-            res = cv2.matchTemplate(img_proc, template_proc, cv2.TM_CCOEFF_NORMED)
-            y_idxs, x_idxs = np.where(res >= threshold)
-            matches = []
-            debug_img = orig_image.copy()
+                y_idxs, x_idxs = np.where(res >= threshold)
+            if max_results is not None:
+                y_idxs, x_idxs = y_idxs[:max_results], x_idxs[:max_results]
             if self.debug_mode:
                 logger.info(f"[OCR调试] match_image_multi 模板路径: {template_path}")
                 logger.info(f"[OCR调试] 匹配阈值: {threshold}")
                 logger.info(f"[OCR调试] 匹配点数: {len(x_idxs)}")
                 logger.info(f"[OCR调试] 匹配分数: {[float(res[y, x]) for x, y in zip(x_idxs, y_idxs)]}")
+            matches = []
             for (x, y) in zip(x_idxs, y_idxs):
-                score = float(res[y, x])
-                abs_x, abs_y = x + offset_x, y + offset_y
-                matches.append((abs_x, abs_y, score))
-                # 画矩形框
-                cv2.rectangle(debug_img, (abs_x, abs_y), (abs_x + tw, abs_y + th), (0, 0, 255), 2)
+                px, py = int(x) + offset_x, int(y) + offset_y
+                abs_x, abs_y = transform.from_point(px, py)
+                center = transform.from_point(px + tw // 2, py + th // 2)
+                matches.append(TemplateMatch(abs_x, abs_y, float(res[y, x]), center))
 
+            if debug:
+                logger.info(f"模板:{template_path},匹配数: {len(matches)},阈值: {threshold}")
+                os.makedirs("debug", exist_ok=True)
+                debug_img = image.copy()
+                for (x, y) in zip(x_idxs, y_idxs):
+                    px, py = int(x) + offset_x, int(y) + offset_y
+                    cv2.rectangle(debug_img, (px, py), (px + tw, py + th), (0, 0, 255), 2)
+                cv2.imwrite("debug/match_image_multi_result.png", debug_img)
+                logger.debug(f"匹配区域已保存到debug/match_image_multi_result.png")
             return matches
         except Exception as e:
             logger.error(f"match_image_multi 执行异常: {e}\n{traceback.format_exc()}")
             return [] 
 
+    def _match_pool(self) -> ThreadPoolExecutor:
+        """match_many使用的线程池，整个OCRHandler生命周期内复用"""
+        with self._match_lock:
+            if self._match_executor is None:
+                self._match_executor = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1),
+                                                          thread_name_prefix="ocr-match")
+            return self._match_executor
+
+    def match_many(
+        self,
+        image: Union[Image.Image, np.ndarray, None],
+        specs: Union[Dict[str, Union[str, dict]], List[str]],
+        threshold: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        一帧图像同时匹配多个模板。整帧截图、BGR/灰度转换只做一次，各模板在线程池中并行匹配(OpenCV匹配时释放GIL)；
+        结果同样按帧缓存，之后在同一帧上调用match_image/match_image_multi直接命中。
+        :param image: 截图，支持 PIL.Image、OpenCV numpy.ndarray
+        :param specs: {结果名: 模板路径 或 {"template": 模板路径, "threshold": 阈值, "region": 区域, "gray": 是否灰度,
+                      "padding": 区域外扩, "pyramid": 是否金字塔匹配, "multi": 是否多目标, "max_results": 多目标最多结果数}}；
+                      也可以直接传模板路径列表，结果名即模板路径
+        :param threshold: 未单独指定阈值的模板使用的阈值，None为配置默认值
+        :return: {结果名: 结果}，multi为True时同match_image_multi的返回值，否则同match_image
+        """
+        if isinstance(specs, (list, tuple)):
+            specs = {path: path for path in specs}
+        specs = {name: ({"template": spec} if isinstance(spec, str) else spec) for name, spec in specs.items()}
+        empty = {name: ([] if spec.get("multi") else None) for name, spec in specs.items()}
+        try:
+            if image is None or not specs:
+                return empty
+            # 区域截图不含任一匹配区域时先取整帧，避免各模板分别重新截图
+            regions = [self._template_region(spec["template"], spec.get("region"), spec.get("padding"))
+                       for spec in specs.values()]
+            if isinstance(image, Frame) and not all(image.covers(region) for region in regions):
+                image = self._ensure_region(image)
+            if not isinstance(image, Frame):
+                # 包装为Frame，灰度图等派生数据在各模板间共用
+                image = self._to_bgr(image)
+                if image is None:
+                    return empty
+                image = Frame(image)
+            if any(spec.get("gray") for spec in specs.values()):
+                image.gray
+
+            def run(spec: dict) -> Any:
+                kwargs = dict(threshold=spec.get("threshold", threshold), region=spec.get("region"),
+                              gray=spec.get("gray", False), padding=spec.get("padding"), pyramid=spec.get("pyramid"))
+                if spec.get("multi"):
+                    return self.match_image_multi(image, spec["template"], max_results=spec.get("max_results"), **kwargs)
+                return self.match_image(image, spec["template"], **kwargs)
+
+            if len(specs) == 1:
+                return {name: run(spec) for name, spec in specs.items()}
+            pool = self._match_pool()
+            futures = {name: pool.submit(run, spec) for name, spec in specs.items()}
+            return {name: future.result() for name, future in futures.items()}
+        except Exception as e:
+            logger.error(f"match_many 执行异常: {e}\n{traceback.format_exc()}")
+            return empty
+
+    @staticmethod
+    def _score_peaks(res: np.ndarray, threshold: float, tw: int, th: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        相关系数图的非极大值抑制
+        先取模板一半大小邻域内的局部极大值，再按分数从高到低贪心去掉中心距离过近的重复点
+        :param res: matchTemplate结果
+        :param tw: 模板宽(像素)
+        :param th: 模板高(像素)
+        :return: (y下标数组, x下标数组)，按分数从高到低排列
+        """
+        rx, ry = max(1, tw // 2), max(1, th // 2)
+        kernel = np.ones((2 * ry + 1, 2 * rx + 1), np.uint8)
+        peaks = (res >= threshold) & (res >= cv2.dilate(res, kernel))
+        y_idxs, x_idxs = np.nonzero(peaks)
+        if len(y_idxs) <= 1:
+            return y_idxs, x_idxs
+        order = np.argsort(-res[y_idxs, x_idxs], kind="stable")
+        y_idxs, x_idxs = y_idxs[order], x_idxs[order]
+        # 分数相同的平台区域会产生相邻的多个极大值，只保留第一个
+        keep = np.ones(len(y_idxs), dtype=bool)
+        for i in range(len(y_idxs)):
+            if not keep[i]:
+                continue
+            close = (np.abs(y_idxs[i + 1:] - y_idxs[i]) <= ry) & (np.abs(x_idxs[i + 1:] - x_idxs[i]) <= rx)
+            keep[i + 1:] &= ~close
+        return y_idxs[keep], x_idxs[keep]
+
     @staticmethod
-    def save_debug_rect(image: Image.Image, rect: tuple, save_path: str, outline: str = "red", width: int = 2) -> None:
+    def save_debug_rect(image: Union[Image.Image, np.ndarray], rect: tuple, save_path: str, outline: str = "red", width: int = 2) -> None:
         """
         在图片指定区域画框并保存到指定路径，常用于调试截图。
-        :param image: PIL.Image对象
+        :param image: PIL.Image对象或Frame
         :param rect: (x1, y1, x2, y2) 矩形区域
         :param save_path: 保存路径
         :param outline: 框线颜色，默认红色
@@ -745,7 +1115,10 @@ class OCRHandler:
         """
         import os
         os.makedirs(os.path.dirname(save_path), exist_ok=True)
-        img_copy = image.copy()
+        if isinstance(image, np.ndarray):
+            img_copy = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        else:
+            img_copy = image.copy()
         draw = ImageDraw.Draw(img_copy)
         draw.rectangle(rect, outline=outline, width=width)
         img_copy.save(save_path) 
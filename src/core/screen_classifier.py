@@ -0,0 +1,105 @@
+import threading
+from typing import Callable, Dict, Iterable, Optional, Tuple
+import numpy as np
+from core.frame import Frame
+from utils import logger
+
+
+class Screen:
+    """
+    界面类型，PRIORITY中越靠前优先级越高(classify未限定候选界面时使用)
+    弹窗盖在其它界面之上，排在最前；取色判断的界面排在模板匹配之前
+    """
+    NET_ERROR = "net_error"
+    EXIT_FENGMO = "exit_fengmo"
+    FOUND_BOSS = "found_boss"
+    WORLD = "world"
+    MINIMAP = "minimap"
+    MAP = "map"
+    BATTLE_FAIL = "battle_fail"
+    IN_ROUND = "in_round"
+    BATTLE_END = "battle_end"
+    BATTLE = "battle"
+    CONFIRM_YES = "confirm_yes"
+    CONFIRM = "confirm"
+    UNKNOWN = "unknown"
+
+    PRIORITY: Tuple[str, ...] = (
+        NET_ERROR, EXIT_FENGMO, FOUND_BOSS,
+        WORLD, MINIMAP, MAP,
+        BATTLE_FAIL, IN_ROUND, BATTLE_END, BATTLE,
+        CONFIRM_YES, CONFIRM,
+    )
+
+
+class ScreenClassifier:
+    """
+    界面分类器：一次调用判断当前帧处于哪个界面
+    - 各界面的判断函数由World/Battle在初始化时登记
+    - classify按优先级依次判断，命中即返回；限定候选界面时按调用方给定的顺序判断
+    - 判断结果按帧ID缓存，同一帧上多个循环/回调重复分类时不再重复计算；
+      取色类判断共用界面特征注册表的单次计算结果
+    """
+
+    def __init__(self) -> None:
+        self._detectors: Dict[str, Callable[[Frame], bool]] = {}
+        self._lock = threading.Lock()
+        # 最近一帧已判断过的界面：(帧ID, {界面: bool})
+        self._memo: Tuple[Optional[int], Dict[str, bool]] = (None, {})
+
+    def register(self, screen: str, detector: Callable[[Frame], bool]) -> None:
+        """
+        登记界面判断函数，重复登记覆盖
+        :param screen: 界面类型，见Screen.PRIORITY
+        :param detector: 判断函数，参数为截图，命中返回True
+        """
+        if screen not in Screen.PRIORITY:
+            raise ValueError(f"未知的界面类型: {screen}")
+        self._detectors[screen] = detector
+
+    def _detect(self, screen: str, image: np.ndarray) -> bool:
+        frame_id = image.frame_id if isinstance(image, Frame) else None
+        if frame_id is not None:
+            with self._lock:
+                memo_id, memo = self._memo
+                if memo_id != frame_id:
+                    memo = {}
+                    self._memo = (frame_id, memo)
+                if screen in memo:
+                    return memo[screen]
+        try:
+            result = bool(self._detectors[screen](image))
+        except Exception as e:
+            logger.error(f"[ScreenClassifier]判断界面{screen}异常: {e}")
+            result = False
+        if frame_id is not None:
+            with self._lock:
+                if self._memo[0] == frame_id:
+                    self._memo[1][screen] = result
+        return result
+
+    def classify(self, image: Optional[np.ndarray], candidates: Optional[Iterable[str]] = None) -> str:
+        """
+        判断截图所处界面
+        :param image: 截图
+        :param candidates: 只判断这些界面，按给定顺序判断(多个界面同时命中时靠前的优先)，
+                           None为按Screen.PRIORITY判断全部已登记界面
+        :return: 第一个命中的界面，都未命中返回Screen.UNKNOWN
+        """
+        if image is None:
+            return Screen.UNKNOWN
+        order = Screen.PRIORITY if candidates is None else tuple(candidates)
+        for screen in order:
+            if screen in self._detectors and self._detect(screen, image):
+                logger.debug(f"[ScreenClassifier]当前界面: {screen}")
+                return screen
+        return Screen.UNKNOWN
+
+    def is_screen(self, image: Optional[np.ndarray], screen: str) -> bool:
+        """单独判断截图是否处于某界面(不考虑优先级)，结果同样按帧缓存"""
+        if image is None or screen not in self._detectors:
+            return False
+        return self._detect(screen, image)
+
+
+screen_classifier = ScreenClassifier()
@@ -0,0 +1,135 @@
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from core.frame import Frame
+from core.coord_transform import CoordTransform, IDENTITY
+from utils import logger
+
+
+class ScreenSignatures:
+    """
+    界面特征取色点注册表
+    - 特征由一组或多组取色点组成，任意一组全部匹配即命中(见config/screen_signatures.yaml)
+    - 构造时所有特征的取色点去重后编译为一张坐标/颜色表，按截图分辨率换算的像素下标缓存
+    - evaluate对一帧做一次向量化计算，得到所有特征的结果，按帧ID缓存
+    """
+
+    def __init__(self, signatures: Dict[str, List[List[Tuple[int, int, str, int]]]],
+                 ambiguity: float = 0.95) -> None:
+        """
+        :param signatures: 特征名 -> [[(x, y, "RRGGBB", range_), ...], ...]，坐标为逻辑坐标
+        :param ambiguity: 相似度
+        """
+        self.ambiguity = ambiguity
+        self.names: List[str] = list(signatures)
+        probe_ids: Dict[Tuple[int, int, int], int] = {}
+        probes, targets = [], []
+        members, group_starts, signature_starts = [], [], []
+        self._bounds: Dict[str, List[Tuple[int, int, int, int]]] = {}
+        for name in self.names:
+            groups = signatures[name]
+            if not groups or not all(groups):
+                raise ValueError(f"界面特征{name}的取色点为空")
+            signature_starts.append(len(group_starts))
+            bounds = []
+            for group in groups:
+                group_starts.append(len(members))
+                for x, y, color, range_ in group:
+                    if range_ <= 0:
+                        raise ValueError(f"界面特征{name}的取色范围必须大于0: {(x, y, color, range_)}")
+                    target = self._parse_hex(color)
+                    if target is None:
+                        raise ValueError(f"界面特征{name}的颜色格式错误: {color}")
+                    key = (int(x), int(y), int(range_), target)
+                    if key not in probe_ids:
+                        probe_ids[key] = len(probes)
+                        probes.append(key[:3])
+                        targets.append(target)
+                    members.append(probe_ids[key])
+                    bounds.append((x - range_, y - range_, x + range_, y + range_))
+            self._bounds[name] = bounds
+        self._probes = probes
+        self._targets = np.array(targets, dtype=np.int32).reshape(-1, 3)
+        self._members = np.array(members, dtype=np.intp)
+        self._group_starts = np.array(group_starts, dtype=np.intp)
+        self._signature_starts = np.array(signature_starts, dtype=np.intp)
+        # (transform, 高, 宽) -> (像素下标, 是否在图像内, 各窗口起始位置, 逐像素目标色)
+        self._tables: Dict[Tuple[CoordTransform, int, int], Tuple[np.ndarray, ...]] = {}
+        # 最近一帧的结果：(帧ID, {特征名: bool})
+        self._last: Tuple[Optional[int], Dict[str, bool]] = (None, {})
+        self._lock = threading.Lock()
+        logger.debug(f"[ScreenSignatures]编译{len(self.names)}个界面特征，共{len(probes)}个取色点")
+
+    @staticmethod
+    def _parse_hex(color: Any) -> Optional[Tuple[int, int, int]]:
+        hexstr = str(color).lstrip('#')
+        if len(hexstr) != 6:
+            return None
+        try:
+            return tuple(int(hexstr[i:i + 2], 16) for i in (0, 2, 4))
+        except ValueError:
+            return None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._bounds
+
+    def bounds(self, name: str) -> List[Tuple[int, int, int, int]]:
+        """
+        特征各取色窗口的逻辑坐标区域，供判断区域截图是否覆盖
+        :return: [(x1, y1, x2, y2), ...]
+        """
+        return self._bounds[name]
+
+    def _table(self, transform: CoordTransform, height: int, width: int) -> Tuple[np.ndarray, ...]:
+        """按截图分辨率换算取色窗口并计算像素下标，结果缓存"""
+        key = (transform, height, width)
+        table = self._tables.get(key)
+        if table is None:
+            indices, valids, sizes = [], [], []
+            for x, y, r in self._probes:
+                x, y = transform.to_point(x, y)
+                x, y, r = int(x), int(y), int(transform.to_radius(r))
+                ys, xs = np.mgrid[y - r:y + r, x - r:x + r]
+                valid = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+                indices.append(np.where(valid, ys * width + xs, 0).ravel())
+                valids.append(valid.ravel())
+                sizes.append(valid.size)
+            sizes = np.array(sizes)
+            starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+            table = (np.concatenate(indices), np.concatenate(valids), starts,
+                     np.repeat(self._targets, sizes, axis=0))
+            if len(self._tables) >= 8:
+                self._tables.clear()
+            self._tables[key] = table
+        return table
+
+    def evaluate(self, image: np.ndarray) -> Dict[str, bool]:
+        """
+        一次计算得到所有特征的匹配结果，同一帧(按帧ID)只计算一次
+        区域截图得到的帧中，取色点不在有效区域内的特征结果无意义，由调用方先确认覆盖
+        :param image: BGR格式图像(Frame或np.ndarray)
+        :return: {特征名: 是否命中}
+        """
+        frame_id = image.frame_id if isinstance(image, Frame) else None
+        if frame_id is not None:
+            with self._lock:
+                last_id, last = self._last
+            if last_id == frame_id:
+                return last
+        transform = image.transform if isinstance(image, Frame) else IDENTITY
+        height, width = image.shape[:2]
+        index, valid, starts, targets = self._table(transform, height, width)
+        # BGR直接取像素再翻转通道
+        pixels = np.asarray(image).reshape(-1, image.shape[2])[index][:, 2::-1].astype(np.int32)
+        # 图像外的像素按黑色处理
+        pixels[~valid] = 0
+        diff = pixels - targets
+        hits = (1 - np.sqrt((diff * diff).sum(axis=1)) / (3 * 255)) >= self.ambiguity
+        probe_hits = np.add.reduceat(hits, starts) > 0
+        group_hits = np.logical_and.reduceat(probe_hits[self._members], self._group_starts)
+        signature_hits = np.logical_or.reduceat(group_hits, self._signature_starts)
+        results = dict(zip(self.names, signature_hits.tolist()))
+        if frame_id is not None:
+            with self._lock:
+                self._last = (frame_id, results)
+        return results
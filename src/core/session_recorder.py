@@ -0,0 +1,389 @@
+import json
+import os
+import shutil
+import threading
+import time
+import zipfile
+from typing import Any, Dict, List, Optional
+import numpy as np
+import cv2
+from utils import logger
+
+# 会话存档内的文件名
+SESSION_META = "session.json"
+SESSION_EVENTS = "events.jsonl"
+SESSION_FRAME_DIR = "frames"
+
+# 会改变画面的输入事件，回放时据此推进画面
+INPUT_EVENTS = ("click", "double_click", "long_click", "swipe", "touch_down", "touch_move", "touch_up")
+
+
+def session_dir(path: str) -> str:
+    """录制过程中存放会话内容的目录：存档路径去掉扩展名(无扩展名时加_session后缀)"""
+    base, ext = os.path.splitext(path)
+    return base if ext else path + "_session"
+
+
+class SessionRecorder:
+    """
+    会话录制
+    - 记录每一帧截图以及点击、滑动、触摸、App操作等事件及时间戳
+    - 录制过程中边录边写入目录(存档路径去掉扩展名)：session.json(元信息)、events.jsonl(事件，逐行写入)、frames/*.png(帧)，
+      进程被强制结束时目录中已写入的内容仍可直接回放
+    - close()时打包为zip存档并删除目录
+    - 与上一帧完全相同的帧不重复保存，只记录引用
+    """
+
+    def __init__(self, path: str, meta: Optional[Dict[str, Any]] = None) -> None:
+        """
+        :param path: 存档路径(.zip)
+        :param meta: 额外元信息，如设备信息
+        """
+        self.path = path
+        self.dir = session_dir(path)
+        os.makedirs(os.path.join(self.dir, SESSION_FRAME_DIR), exist_ok=True)
+        self._lock = threading.Lock()
+        self._start = time.time()
+        self._event_count = 0
+        self._frame_count = 0
+        self._last_frame: Optional[np.ndarray] = None
+        self._last_frame_file: Optional[str] = None
+        self._input_count = 0
+        self._meta = dict(meta or {})
+        self._meta["start_time"] = self._start
+        self._write_meta()
+        self._events_file = open(os.path.join(self.dir, SESSION_EVENTS), "w", encoding="utf-8")
+        self._closed = False
+
+    def _elapsed(self) -> float:
+        return round(time.time() - self._start, 4)
+
+    def _write_meta(self, **extra) -> None:
+        meta = dict(self._meta, **extra)
+        with open(os.path.join(self.dir, SESSION_META), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    def _append(self, event: Dict[str, Any]) -> None:
+        """写入一个事件并立即刷新到文件"""
+        self._events_file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._events_file.flush()
+        self._event_count += 1
+
+    def record_frame(self, image: np.ndarray) -> None:
+        """
+        记录一帧
+        :param image: BGR格式np.ndarray
+        """
+        with self._lock:
+            if self._closed:
+                return
+            if self._last_frame is not None and self._last_frame.shape == image.shape \
+                    and np.array_equal(self._last_frame, image):
+                file_name = self._last_frame_file
+            else:
+                ok, buf = cv2.imencode(".png", np.asarray(image))
+                if not ok:
+                    logger.warning("录制帧编码失败")
+                    return
+                self._frame_count += 1
+                file_name = f"{SESSION_FRAME_DIR}/{self._frame_count:06d}.png"
+                with open(os.path.join(self.dir, file_name), "wb") as f:
+                    f.write(buf.tobytes())
+                self._last_frame = np.array(image)
+                self._last_frame_file = file_name
+            self._append({
+                "t": self._elapsed(),
+                "type": "frame",
+                "file": file_name,
+                "inputs": self._input_count,
+            })
+
+    def record_event(self, event_type: str, args: Optional[list] = None, result: Any = None) -> None:
+        """
+        记录一个事件
+        :param event_type: 事件类型，如click、swipe、app_current
+        :param args: 调用参数
+        :param result: 调用返回值(需可JSON序列化)
+        """
+        with self._lock:
+            if self._closed:
+                return
+            if event_type in INPUT_EVENTS:
+                self._input_count += 1
+            event = {"t": self._elapsed(), "type": event_type, "args": list(args or [])}
+            if result is not None:
+                event["result"] = result
+            self._append(event)
+
+    def close(self) -> None:
+        """写入最终元信息，打包为zip存档并删除录制目录；打包失败时保留目录"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._events_file.close()
+            self._write_meta(duration=self._elapsed(), frames=self._frame_count, events=self._event_count)
+            try:
+                with zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_STORED) as zf:
+                    for root, _, files in os.walk(self.dir):
+                        for name in files:
+                            full = os.path.join(root, name)
+                            zf.write(full, os.path.relpath(full, self.dir).replace(os.sep, "/"))
+                shutil.rmtree(self.dir, ignore_errors=True)
+            except Exception as e:
+                logger.warning(f"会话存档打包失败，录制内容保留在目录{self.dir}: {e}")
+                return
+        logger.info(f"会话录制已保存: {self.path}，帧数: {self._frame_count}，事件数: {self._event_count}")
+
+
+class _RecordingTouch:
+    """代理uiautomator2的touch对象，记录按下/移动/抬起"""
+
+    def __init__(self, touch: Any, recorder: SessionRecorder) -> None:
+        self._touch = touch
+        self._recorder = recorder
+
+    def down(self, x, y):
+        self._recorder.record_event("touch_down", [x, y])
+        return self._touch.down(x, y)
+
+    def move(self, x, y):
+        self._recorder.record_event("touch_move", [x, y])
+        return self._touch.move(x, y)
+
+    def up(self, x, y):
+        self._recorder.record_event("touch_up", [x, y])
+        return self._touch.up(x, y)
+
+
+class RecordingDevice:
+    """
+    uiautomator2设备代理：转发所有调用，同时记录输入和App相关事件
+    """
+
+    def __init__(self, device: Any, recorder: SessionRecorder) -> None:
+        self._device = device
+        self._recorder = recorder
+        self.touch = _RecordingTouch(device.touch, recorder)
+
+    def __getattr__(self, name):
+        return getattr(self._device, name)
+
+    def click(self, x, y):
+        self._recorder.record_event("click", [x, y])
+        return self._device.click(x, y)
+
+    def double_click(self, x, y, *args):
+        self._recorder.record_event("double_click", [x, y, *args])
+        return self._device.double_click(x, y, *args)
+
+    def long_click(self, x, y, duration=None):
+        self._recorder.record_event("long_click", [x, y, duration])
+        if duration is None:
+            return self._device.long_click(x, y)
+        return self._device.long_click(x, y, duration)
+
+    def swipe(self, fx, fy, tx, ty, duration=None, *args, **kwargs):
+        self._recorder.record_event("swipe", [fx, fy, tx, ty, duration])
+        return self._device.swipe(fx, fy, tx, ty, duration, *args, **kwargs)
+
+    def app_current(self):
+        result = self._device.app_current()
+        self._recorder.record_event("app_current", result=dict(result))
+        return result
+
+    def app_start(self, package, *args, **kwargs):
+        self._recorder.record_event("app_start", [package])
+        return self._device.app_start(package, *args, **kwargs)
+
+    def app_stop(self, package):
+        self._recorder.record_event("app_stop", [package])
+        return self._device.app_stop(package)
+
+
+class ReplayClock:
+    """
+    回放时钟
+    - time()返回虚拟时间，sleep()只推进虚拟时间不真正等待
+    - 由utils.clock安装后，主流程中通过clock.time()/clock.sleep()的超时与等待逻辑在回放中可复现且不耗时；
+      标准库time模块不受影响
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        self._now = start
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        with self._lock:
+            return self._now
+
+    def sleep(self, seconds: float) -> None:
+        with self._lock:
+            self._now += max(0.0, seconds)
+
+    def advance_to(self, t: float) -> None:
+        """将虚拟时间推进到t(不会倒退)"""
+        with self._lock:
+            self._now = max(self._now, t)
+
+
+class _ReplayTouch:
+    def __init__(self, device: "ReplayDevice") -> None:
+        self._device = device
+
+    def down(self, x, y):
+        self._device._on_input("touch_down", [x, y])
+
+    def move(self, x, y):
+        self._device._on_input("touch_move", [x, y])
+
+    def up(self, x, y):
+        self._device._on_input("touch_up", [x, y])
+
+
+class ReplayDevice:
+    """
+    回放设备：按录制存档提供帧，模拟uiautomator2设备的常用接口
+    - 录制中每帧都标记了截图前已发生的输入次数，回放时只提供与当前输入次数对应的帧
+    - 同一输入阶段的帧按顺序提供，用完后重复最后一帧，直到调用方执行下一次输入
+    - 输入动作只计数并与录制比对，不一致时记录警告
+    """
+
+    def __init__(self, path: str, clock: Optional[ReplayClock] = None) -> None:
+        """
+        :param path: 录制存档路径(.zip)，也可以是录制目录；存档不存在但录制目录存在(录制被中断)时回放目录
+        :param clock: 回放时钟，提供帧时推进到帧的录制时间
+        """
+        self.path = path
+        if os.path.isdir(path):
+            self._dir, self._zip = path, None
+        elif not os.path.exists(path) and os.path.isdir(session_dir(path)):
+            self._dir, self._zip = session_dir(path), None
+            logger.info(f"[回放]存档不存在，回放未打包的录制目录: {self._dir}")
+        else:
+            self._dir, self._zip = None, zipfile.ZipFile(path, "r")
+        self.meta = json.loads(self._read(SESSION_META).decode("utf-8"))
+        self.events: List[Dict[str, Any]] = []
+        for line in self._read(SESSION_EVENTS).decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                self.events.append(json.loads(line))
+            except ValueError:
+                # 录制被中断时最后一行可能不完整
+                logger.warning("[回放]忽略不完整的事件记录")
+        self.frames = [e for e in self.events if e["type"] == "frame"]
+        self.inputs = [e for e in self.events if e["type"] in INPUT_EVENTS]
+        self.clock = clock
+        self.info = self.meta.get("device_info", {})
+        self.serial = self.meta.get("serial", "replay")
+        self.touch = _ReplayTouch(self)
+        self.input_count = 0
+        self.mismatch_count = 0
+        self._frame_index = -1
+        self._image_cache: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self._start_time = self.meta.get("start_time", 0.0)
+
+    @property
+    def finished(self) -> bool:
+        """录制的帧是否已全部提供"""
+        return self._frame_index >= len(self.frames) - 1
+
+    def _read(self, name: str) -> bytes:
+        """读取存档或录制目录中的文件"""
+        if self._zip is not None:
+            return self._zip.read(name)
+        with open(os.path.join(self._dir, name), "rb") as f:
+            return f.read()
+
+    def _load(self, file_name: str) -> np.ndarray:
+        img = self._image_cache.get(file_name)
+        if img is None:
+            buf = np.frombuffer(self._read(file_name), dtype=np.uint8)
+            img = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+            # 只缓存最近一帧，避免长会话占用过多内存
+            self._image_cache = {file_name: img}
+        return img
+
+    def _next_frame_event(self) -> Optional[Dict[str, Any]]:
+        if not self.frames:
+            return None
+        index = self._frame_index
+        nxt = index + 1
+        # 跳过输入次数少于当前的帧(录制时这些帧在下一次输入之前)
+        while nxt < len(self.frames) and self.frames[nxt]["inputs"] < self.input_count:
+            nxt += 1
+        if nxt < len(self.frames) and self.frames[nxt]["inputs"] == self.input_count:
+            index = nxt
+        elif index < 0:
+            index = min(nxt, len(self.frames) - 1)
+        else:
+            # 当前阶段没有新帧，停留在已知的最新画面
+            index = max(index, nxt - 1)
+        self._frame_index = index
+        return self.frames[index]
+
+    def screenshot(self, format: str = "pillow"):
+        with self._lock:
+            event = self._next_frame_event()
+        if event is None:
+            return None
+        if self.clock is not None:
+            self.clock.advance_to(self._start_time + event["t"])
+        img = self._load(event["file"])
+        if format == "opencv":
+            return img.copy()
+        from PIL import Image
+        return Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+
+    def _on_input(self, event_type: str, args: list) -> None:
+        with self._lock:
+            if self.input_count < len(self.inputs):
+                expected = self.inputs[self.input_count]
+                if expected["type"] != event_type or expected["args"][:2] != list(args)[:2]:
+                    self.mismatch_count += 1
+                    logger.warning(f"[回放]第{self.input_count + 1}次输入与录制不一致: "
+                                   f"{event_type}{args}，录制为{expected['type']}{expected['args']}")
+            else:
+                self.mismatch_count += 1
+                logger.warning(f"[回放]输入次数超出录制: {event_type}{args}")
+            self.input_count += 1
+
+    def click(self, x, y):
+        self._on_input("click", [x, y])
+
+    def double_click(self, x, y, *args):
+        self._on_input("double_click", [x, y])
+
+    def long_click(self, x, y, duration=None):
+        self._on_input("long_click", [x, y])
+
+    def swipe(self, fx, fy, tx, ty, duration=None, *args, **kwargs):
+        self._on_input("swipe", [fx, fy, tx, ty])
+
+    def app_current(self) -> dict:
+        """返回当前帧之前最近一次录制的app_current结果"""
+        with self._lock:
+            limit = self.frames[self._frame_index]["t"] if self._frame_index >= 0 else None
+        result = None
+        for event in self.events:
+            if event["type"] != "app_current":
+                continue
+            if result is not None and limit is not None and event["t"] > limit:
+                break
+            result = event.get("result")
+        return dict(result or {"package": self.meta.get("package", "")})
+
+    def app_start(self, package, *args, **kwargs):
+        logger.debug(f"[回放]app_start {package}")
+
+    def app_stop(self, package):
+        logger.debug(f"[回放]app_stop {package}")
+
+    def app_stop_all(self):
+        pass
+
+    def close(self) -> None:
+        if self._zip is not None:
+            self._zip.close()
@@ -0,0 +1,272 @@
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
+import cv2
+import numpy as np
+from core.coord_transform import CoordTransform
+from utils import logger
+from utils.get_asset_path import get_asset_path
+
+TEMPLATE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+# 文件名内嵌的截取区域：xxx__x1_y1_x2_y2.png
+_REGION_PATTERN = re.compile(r'^(?P<stem>.+)__(\d+)_(\d+)_(\d+)_(\d+)$')
+
+
+def parse_template_region(path: str) -> Tuple[str, Optional[Tuple[int, int, int, int]]]:
+    """
+    解析模板文件名中内嵌的截取区域(OCRHandler.save_with_region保存的命名)
+    :param path: 模板路径，如assets/confirm__560_460_720_510.png
+    :return: (去掉区域后缀的路径, (x1, y1, x2, y2))，无区域后缀时区域为None
+    """
+    base, ext = os.path.splitext(path)
+    match = _REGION_PATTERN.match(base)
+    if match is None:
+        return path, None
+    x1, y1, x2, y2 = (int(v) for v in match.groups()[1:])
+    if x2 <= x1 or y2 <= y1:
+        return path, None
+    return match.group('stem') + ext, (x1, y1, x2, y2)
+
+
+class Template:
+    """
+    内存中的模板图片
+    - bgr/gray为匹配用的彩色和灰度图，在加载时转换好
+    - region为文件名内嵌的截取区域(逻辑坐标)，没有时为None
+    - 截图分辨率不是1280x720时，scaled按分辨率返回缩放后的模板并缓存
+    """
+
+    def __init__(self, path: str, bgr: np.ndarray, mtime: float) -> None:
+        """
+        :param path: 模板路径
+        :param bgr: BGR格式图像
+        :param mtime: 文件修改时间
+        """
+        self.path = path
+        self.mtime = mtime
+        self.region = parse_template_region(path)[1]
+        self.bgr = bgr
+        self.gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+        # 灰度标准差，用于判断纯色模板和金字塔匹配缩小后的细节保留
+        self.gray_std = float(self.gray.std())
+        self._scaled: Dict[Tuple[int, int], "Template"] = {}
+        # 缩小倍数 -> (BGR, 灰度)；最短边下限 -> 金字塔缩小倍数
+        self._downscaled: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._pyramid_factors: Dict[int, int] = {}
+
+    @property
+    def height(self) -> int:
+        return self.bgr.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.bgr.shape[1]
+
+    @property
+    def is_flat(self) -> bool:
+        """模板是否为纯色(标准差为0时归一化相关系数无意义)"""
+        return self.gray_std < 1e-6
+
+    def downscaled(self, factor: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        宽高缩小factor倍的模板，用于金字塔粗匹配，结果缓存
+        :return: (BGR, 灰度)
+        """
+        images = self._downscaled.get(factor)
+        if images is None:
+            size = (max(1, self.width // factor), max(1, self.height // factor))
+            bgr = cv2.resize(self.bgr, size, interpolation=cv2.INTER_AREA)
+            images = self._downscaled[factor] = (bgr, cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY))
+        return images
+
+    def pyramid_factor(self, min_size: int) -> int:
+        """
+        金字塔粗匹配可用的最大缩小倍数(4或2)，结果缓存
+        缩小后最短边小于min_size，或灰度标准差不足原模板一半(细节丢失)的倍数不可用
+        :param min_size: 缩小后模板最短边的最小像素
+        :return: 缩小倍数，1表示模板太小或太平，不使用金字塔匹配
+        """
+        factor = self._pyramid_factors.get(min_size)
+        if factor is None:
+            factor = 1
+            if not self.is_flat:
+                for candidate in (4, 2):
+                    if min(self.width, self.height) // candidate < min_size:
+                        continue
+                    if float(self.downscaled(candidate)[1].std()) >= 0.5 * self.gray_std:
+                        factor = candidate
+                        break
+            self._pyramid_factors[min_size] = factor
+        return factor
+
+    def scaled(self, transform: CoordTransform) -> "Template":
+        """
+        按截图分辨率缩放的模板，结果缓存
+        :param transform: 逻辑坐标到截图像素的换算
+        """
+        if transform.is_identity:
+            return self
+        key = (transform.width, transform.height)
+        template = self._scaled.get(key)
+        if template is None:
+            template = self._scaled[key] = Template(self.path, transform.scale_image(self.bgr), self.mtime)
+        return template
+
+
+class TemplateStore:
+    """
+    模板图片内存缓存
+    - 每个模板只从磁盘读取、解码一次，之后匹配直接使用内存中的BGR/灰度图
+    - 文件修改时间变化时重新读取，检查间隔为check_interval秒，避免每次匹配都访问文件系统
+    - preload_all在启动时一次读入assets下所有模板
+    - 文件名带区域后缀(xxx__x1_y1_x2_y2.png)的模板也可以用不带后缀的路径(xxx.png)获取
+    - 找不到的模板同样缓存，所在目录修改时间变化(有文件增删)后才重新查找
+    """
+
+    def __init__(self, check_interval: float = 2.0) -> None:
+        """
+        :param check_interval: 检查文件修改时间的最短间隔(秒)，<=0时每次都检查
+        """
+        self.check_interval = check_interval
+        self._entries: Dict[str, Template] = {}
+        # 模板路径 -> 上次检查修改时间的时间
+        self._checked: Dict[str, float] = {}
+        # 不带区域后缀的路径 -> 实际文件路径
+        self._aliases: Dict[str, str] = {}
+        # 找不到的模板路径 -> (上次检查的时间, 当时所在目录的修改时间)
+        self._missing: Dict[str, Tuple[float, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _resolve(self, path: str) -> str:
+        """
+        文件不存在时，在同目录查找带区域后缀的同名模板
+        :return: 实际文件路径，找不到时原样返回
+        """
+        alias = self._aliases.get(path)
+        if alias is not None and os.path.exists(get_asset_path(alias)):
+            return alias
+        if os.path.exists(get_asset_path(path)):
+            return path
+        directory = os.path.dirname(path)
+        try:
+            filenames = sorted(os.listdir(get_asset_path(directory) if directory else "."))
+        except OSError:
+            return path
+        for filename in filenames:
+            candidate = os.path.join(directory, filename).replace(os.sep, "/") if directory else filename
+            base, region = parse_template_region(candidate)
+            if region is not None and base == path:
+                self._aliases[path] = candidate
+                return candidate
+        return path
+
+    @staticmethod
+    def _dir_mtime(path: str) -> Optional[float]:
+        """模板所在目录的修改时间，目录不存在返回None"""
+        directory = os.path.dirname(path)
+        try:
+            return os.path.getmtime(get_asset_path(directory) if directory else ".")
+        except OSError:
+            return None
+
+    def _read(self, path: str) -> Optional[Template]:
+        full_path = get_asset_path(path)
+        try:
+            mtime = os.path.getmtime(full_path)
+        except OSError:
+            return None
+        bgr = cv2.imread(full_path)
+        if bgr is None:
+            return None
+        return Template(path, bgr, mtime)
+
+    def get(self, path: str) -> Optional[Template]:
+        """
+        获取模板，未缓存或文件已修改时从磁盘读取
+        :param path: 模板路径
+        :return: Template，文件不存在或读取失败返回None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and now - self._checked.get(path, 0.0) < self.check_interval:
+                return entry
+            missing = self._missing.get(path) if entry is None else None
+            if missing is not None and now - missing[0] < self.check_interval:
+                return None
+        if missing is not None:
+            dir_mtime = self._dir_mtime(path)
+            if dir_mtime == missing[1]:
+                with self._lock:
+                    self._missing[path] = (now, dir_mtime)
+                return None
+        if entry is not None:
+            try:
+                changed = os.path.getmtime(get_asset_path(entry.path)) != entry.mtime
+            except OSError:
+                changed = True
+            if not changed:
+                with self._lock:
+                    self._checked[path] = now
+                return entry
+            logger.debug(f"[TemplateStore]模板已修改，重新读取: {path}")
+        # 查找前记录目录修改时间，查找期间新增的文件下次仍会被发现
+        dir_mtime = self._dir_mtime(path)
+        entry = self._read(self._resolve(path))
+        with self._lock:
+            if entry is None:
+                self._entries.pop(path, None)
+                self._checked.pop(path, None)
+                self._missing[path] = (now, dir_mtime)
+            else:
+                self._entries[path] = entry
+                self._checked[path] = now
+                self._missing.pop(path, None)
+        return entry
+
+    def preload_all(self, root: str = "assets") -> int:
+        """
+        读入root目录下所有模板图片
+        :param root: 模板根目录(相对路径，与match_image的template_path写法一致)
+        :return: 读入的模板数
+        """
+        count = 0
+        base = get_asset_path(root)
+        if not os.path.isdir(base):
+            logger.warning(f"[TemplateStore]模板目录不存在: {base}")
+            return 0
+        for dirpath, _, filenames in os.walk(base):
+            for filename in filenames:
+                if not filename.lower().endswith(TEMPLATE_EXTENSIONS):
+                    continue
+                rel = os.path.relpath(os.path.join(dirpath, filename), base)
+                path = "/".join([root.rstrip("/\\")] + rel.split(os.sep))
+                entry = self.get(path)
+                if entry is None:
+                    continue
+                count += 1
+                alias, region = parse_template_region(path)
+                if region is not None:
+                    # 不带区域后缀的路径共用同一个模板
+                    with self._lock:
+                        self._aliases[alias] = path
+                        self._entries[alias] = entry
+                        self._checked[alias] = self._checked.get(path, 0.0)
+        return count
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """
+        清除缓存，下次获取时重新读取
+        :param path: 模板路径，None清除全部
+        """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._checked.clear()
+                self._missing.clear()
+            else:
+                self._entries.pop(path, None)
+                self._checked.pop(path, None)
+                self._missing.pop(path, None)
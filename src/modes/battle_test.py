@@ -1,4 +1,4 @@
-import time
+from utils import clock
 import os
 import traceback
 from typing import Optional
@@ -71,6 +71,7 @@ class BattleTestMode:
         
         :param script_path: 战斗脚本文件路径
         """
+        self.device_manager.begin_session("battle_test", self.log_queue)
         try:
             # 检查并使用传入的脚本路径
             if script_path is None:
@@ -111,6 +112,8 @@ class BattleTestMode:
             logger.error(traceback.format_exc())
             self.fail_count += 1
         finally:
+            self.app_manager.stop_tracking()
+            self.device_manager.end_session()
             self._report_test_results()
 
     def run_multiple_tests(self, script_path: str, test_count: int = 1) -> None:
@@ -131,7 +134,7 @@ class BattleTestMode:
             if i < test_count - 1:
                 wait_time = 2  # 等待2秒
                 logger.info(f"[BattleTestMode] 等待 {wait_time} 秒后进行下一轮测试...")
-                time.sleep(wait_time)
+                clock.sleep(wait_time)
 
         self._report_test_results()
 
@@ -3,7 +3,7 @@
 实现花田与果炎的统一自动化功能
 """
 
-import time
+from utils import clock
 import os
 from datetime import datetime
 from typing import Dict, Any
@@ -134,6 +134,7 @@ class DailyMode:
             return
             
         self.is_running = True
+        self.device_manager.begin_session("daily", self.log_queue)
         
         try:
             logger.info("=" * 50)
@@ -190,7 +191,7 @@ class DailyMode:
                     continue
                 if huatian_done and guoyan_done:
                     break
-                time.sleep(1)
+                clock.sleep(1)
             
             logger.info("=" * 50)
             logger.info("日常玩法执行完成")
@@ -200,6 +201,8 @@ class DailyMode:
             logger.error(f"日常玩法执行过程中发生异常: {e}", exc_info=True)
         finally:
             self.is_running = False
+            self.app_manager.stop_tracking()
+            self.device_manager.end_session()
 
     def _execute_huatian(self):
         """
@@ -211,7 +214,7 @@ class DailyMode:
         3. 执行花田相关操作
         4. 记录统计数据
         """
-        start_time = time.time()
+        start_time = clock.time()
         
         try:
             logger.info("[花田] 开始执行花田功能")
@@ -228,9 +231,9 @@ class DailyMode:
             
             # 分别处理花田1和花田2，独立统计
             if self.huatian1_enabled:
-                huatian1_start_time = time.time()
+                huatian1_start_time = clock.time()
                 self._check_huatian_target("花田1", huatian1_pos, ocr_region, huatian1_start_time)
-                huatian1_elapsed_time = time.time() - huatian1_start_time
+                huatian1_elapsed_time = clock.time() - huatian1_start_time
                 self.huatian_stats["huatian1"]["total_time"] = huatian1_elapsed_time  # 覆盖，因为是一次完整的执行耗时
                 logger.info(f"[花田1] 执行完成，重启次数: {self.huatian_stats['huatian1']['restart_count']} 耗时: {huatian1_elapsed_time:.0f}秒")
                 # 发送最终统计更新，包含目标找到状态
@@ -238,10 +241,10 @@ class DailyMode:
                 self._send_stats_update("huatian1", huatian1_elapsed_time, target_found=target_found)
             
             if self.huatian2_enabled:
-                time.sleep(2)
-                huatian2_start_time = time.time()
+                clock.sleep(2)
+                huatian2_start_time = clock.time()
                 self._check_huatian_target("花田2", huatian2_pos, ocr_region, huatian2_start_time)
-                huatian2_elapsed_time = time.time() - huatian2_start_time
+                huatian2_elapsed_time = clock.time() - huatian2_start_time
                 self.huatian_stats["huatian2"]["total_time"] = huatian2_elapsed_time  # 覆盖，因为是一次完整的执行耗时
                 logger.info(f"[花田2] 执行完成，重启次数: {self.huatian_stats['huatian2']['restart_count']} 耗时: {huatian2_elapsed_time:.0f}秒")
                 # 发送最终统计更新，包含目标找到状态
@@ -249,11 +252,11 @@ class DailyMode:
                 self._send_stats_update("huatian2", huatian2_elapsed_time, target_found=target_found)
             
             # 计算总耗时
-            total_elapsed_time = time.time() - start_time
+            total_elapsed_time = clock.time() - start_time
             logger.info(f"[花田] 花田功能执行成功，总耗时: {total_elapsed_time:.0f}秒")
             
         except Exception as e:
-            elapsed_time = time.time() - start_time
+            elapsed_time = clock.time() - start_time
             logger.error(f"[花田] 花田功能执行异常: {e}", exc_info=True)
             
             # 即使失败也要记录统计，但只影响启用的花田
@@ -298,7 +301,7 @@ class DailyMode:
             error = True
             while count < 5 and loop and not target_found:
                 count += 1
-                time.sleep(1.5)
+                clock.sleep(1.5)
                 
                 # 获取截图
                 screenshot = self.device_manager.get_screenshot()
@@ -320,7 +323,7 @@ class DailyMode:
                         if target_count_str in line['text']:
                             logger.info(f"{huatian_name}目标数量匹配: {self.huatian_target_count}")
                             target_found = True
-                            time.sleep(1)
+                            clock.sleep(1)
                             self.device_manager.click(640, 430)
                             break
             if error:
@@ -335,7 +338,7 @@ class DailyMode:
 
                 # 立即发送重启统计更新
                 count = self.huatian_stats[huatian_type]["restart_count"]
-                restart_elapsed_time = time.time() - start_time
+                restart_elapsed_time = clock.time() - start_time
                 logger.info(f"{huatian_type}重启次数{count}, 耗时{restart_elapsed_time:.0f}秒")
                 self._send_stats_update(huatian_type, restart_elapsed_time)
         
@@ -343,7 +346,7 @@ class DailyMode:
         self.huatian_stats[huatian_type]["target_found"] = True
         
         # 发送目标找到的统计更新
-        elapsed_time = time.time() - start_time
+        elapsed_time = clock.time() - start_time
         self._send_stats_update(huatian_type, elapsed_time, target_found=True)
         
         return True
@@ -358,7 +361,7 @@ class DailyMode:
         3. 执行果炎相关操作
         4. 记录统计数据
         """
-        start_time = time.time()
+        start_time = clock.time()
         
         try:
             logger.info("[果炎] 开始执行果炎功能")
@@ -381,7 +384,7 @@ class DailyMode:
                 loop = True
                 error = True
                 while count < 5 and loop and not target_found:
-                    time.sleep(1.5)
+                    clock.sleep(1.5)
                     count += 1
                     # 获取截图
                     screenshot = self.device_manager.get_screenshot()
@@ -402,7 +405,7 @@ class DailyMode:
                             if target_count_str in line['text']:
                                 logger.info(f"果炎目标数量: {self.guoyan_target_count}")
                                 target_found = True
-                                time.sleep(1)
+                                clock.sleep(1)
                                 self.device_manager.click(640, 430)
                                 break
                 if error:
@@ -414,7 +417,7 @@ class DailyMode:
                     
                 # 立即发送重启统计更新
                 count = self.guoyan_stats["restart_count"] 
-                restart_elapsed_time = time.time() - start_time
+                restart_elapsed_time = clock.time() - start_time
                 logger.info(f"果炎重启次数{count}, 耗时:{restart_elapsed_time:.0f}秒")
                 self._send_stats_update("guoyan", restart_elapsed_time)
             
@@ -422,7 +425,7 @@ class DailyMode:
             self.guoyan_stats["target_found"] = True
             
             # 计算耗时并发送统计更新
-            elapsed_time = time.time() - start_time
+            elapsed_time = clock.time() - start_time
             self.guoyan_stats["total_time"] = elapsed_time  # 改为覆盖，与花田保持一致
             
             logger.info(f"[果炎] 果炎功能执行成功，耗时: {elapsed_time:.0f}秒")
@@ -3,9 +3,9 @@
 将按键精灵VB脚本翻译为Python实现
 """
 
-import time
+from utils import clock
 import logging
-from typing import Tuple, Optional
+from typing import Any, Dict, Tuple, Optional
 from core.device_manager import DeviceManager
 from core.ocr_handler import OCRHandler
 from common.world import World
@@ -18,6 +18,15 @@ class DreamMode:
     自动化处理游戏中的梦境玩法，包括开始游戏、招募、丢骰子、战斗等流程
     """
     
+    # check_grid_types检查的格子模板
+    GRID_TEMPLATES = [
+        "assets/dream/zhaomu.png",
+        "assets/dream/maozhua.png",
+        "assets/dream/likai.png",
+        "assets/dream/battle_skip.png",
+        "assets/dream/battle_start.png",
+    ]
+
     def __init__(self, device_manager: DeviceManager, ocr_handler: OCRHandler, log_queue=None):
         """
         初始化梦境模式
@@ -46,7 +55,7 @@ class DreamMode:
             "successful_battles": 0,
             "successful_events": 0,
             "total_awards": 0,  # 总奖励积分
-            "start_time": time.time(),
+            "start_time": clock.time(),
             "total_time": 0.0
         }
         
@@ -92,22 +101,28 @@ class DreamMode:
             except Exception as e:
                 self.logger.error(f"发送日志到队列失败: {e}")
 
-    def find_image(self, image_name: str, threshold: Optional[float] = None) -> Optional[Tuple[int, int]]:
+    def find_image(self, image_name: str, threshold: Optional[float] = None,
+                   matches: Optional[Dict[str, Any]] = None) -> Optional[Tuple[int, int]]:
         """
         查找图片位置
         
         :param image_name: 图片名称
         :param threshold: 识别阈值
+        :param matches: 可选，match_many的匹配结果，包含该图片时直接使用，不再截图匹配
         :return: 找到的坐标，未找到返回None
         """
         if threshold is None:
             threshold = self.image_threshold
             
-        image = self.device_manager.get_screenshot()
-        self.logger.info(f"查找图片: {image_name}, 阈值: {threshold}")
-        result = self.ocr_handler.match_image(image, image_name, threshold)
+        if matches is not None and image_name in matches:
+            result = matches[image_name]
+        else:
+            image = self.device_manager.get_screenshot()
+            self.logger.info(f"查找图片: {image_name}, 阈值: {threshold}")
+            result = self.ocr_handler.match_image(image, image_name, threshold)
         if result:
-            time.sleep(self.click_wait_interval)
+            # 等待界面稳定后再交给调用方点击，最长等待click_wait_interval
+            self.device_manager.wait_until_stable(max_wait=self.click_wait_interval, min_wait=0)
         return result
 
     def click_position(self, x: int, y: int):
@@ -126,7 +141,7 @@ class DreamMode:
         
         :param seconds: 等待秒数
         """
-        time.sleep(seconds)
+        clock.sleep(seconds)
         self.logger.debug(f"延迟等待: {seconds}秒")
 
     def ocr_text(self, region: Tuple[int, int, int, int]) -> str:
@@ -147,7 +162,7 @@ class DreamMode:
         if self.log_queue:
             try:
                 # 计算总用时
-                self.stats["total_time"] = time.time() - self.stats["start_time"]
+                self.stats["total_time"] = clock.time() - self.stats["start_time"]
                 total_minutes = self.stats["total_time"] / 60
                 
                 report = f"""REPORT_DATA__
@@ -168,7 +183,7 @@ class DreamMode:
         if self.log_queue:
             try:
                 # 计算总用时
-                self.stats["total_time"] = time.time() - self.stats["start_time"]
+                self.stats["total_time"] = clock.time() - self.stats["start_time"]
                 total_minutes = self.stats["total_time"] / 60
                 
                 report = f"""REPORT_DATA__
@@ -207,6 +222,7 @@ class DreamMode:
             self.update_config(config_params)
         
         self.log_message("开始运行梦境模式")
+        self.device_manager.begin_session("dream", self.log_queue)
         
         try:
             while self.loop_count < self.max_loops:
@@ -244,6 +260,8 @@ class DreamMode:
             self.log_message(f"梦境模式运行异常: {e}")
             self.logger.exception("梦境模式异常详情")
         finally:
+            self.app_manager.stop_tracking()
+            self.device_manager.end_session()
             self.send_stats_report()
             self.log_message("梦境模式结束")
 
@@ -506,24 +524,24 @@ class DreamMode:
         
         :return: 是否处理了格子
         """
+        # 各格子模板在同一帧上并行匹配，下面各项检查按原顺序直接使用匹配结果
+        image = self.device_manager.get_screenshot()
+        matches = self.ocr_handler.match_many(image, self.GRID_TEMPLATES, self.image_threshold)
+
         # 检查招募格子
-        if self.check_recruit_grid():
+        if self.check_recruit_grid(matches):
             return True
         
         # 检查事件后续格子
-        if self.check_event_follow_grid():
+        if self.check_event_follow_grid(matches):
             return True
             
         # 检查事件格子
-        if self.check_event_grid():
-            return True
-            
-        # 检查事件后续格子
-        if self.check_event_follow_grid():
+        if self.check_event_grid(matches):
             return True
             
         # 检查战斗格子
-        if self.check_battle_grid():
+        if self.check_battle_grid(matches):
             return True
         
         if self.process_battle():
@@ -554,28 +572,30 @@ class DreamMode:
             return True
         return False
 
-    def check_recruit_grid(self) -> bool:
+    def check_recruit_grid(self, matches: Optional[Dict[str, Any]] = None) -> bool:
         """
         检查招募格子
         
+        :param matches: 可选，check_grid_types的匹配结果，不传时重新截图查找
         :return: 是否处理了招募格子
         """
         # 查找招募相关图片
-        recruit_pos = self.find_image("assets/dream/zhaomu.png")
+        recruit_pos = self.find_image("assets/dream/zhaomu.png", matches=matches)
         if recruit_pos:
             self.log_message("找到招募格子")
             self.process_recruit()
             return True
         return False
 
-    def check_event_grid(self) -> bool:
+    def check_event_grid(self, matches: Optional[Dict[str, Any]] = None) -> bool:
         """
         检查事件格子
         
+        :param matches: 可选，check_grid_types的匹配结果，不传时重新截图查找
         :return: 是否处理了事件格子
         """
         # 查找事件相关图片
-        event_pos = self.find_image("assets/dream/likai.png")
+        event_pos = self.find_image("assets/dream/likai.png", matches=matches)
         if event_pos:
             self.log_message("找到事件格子")
             self.process_event()
@@ -598,14 +618,15 @@ class DreamMode:
         
         self.log_message("事件处理完成")
 
-    def check_event_follow_grid(self) -> bool:
+    def check_event_follow_grid(self, matches: Optional[Dict[str, Any]] = None) -> bool:
         """
         检查事件后续格子
         
+        :param matches: 可选，check_grid_types的匹配结果，不传时重新截图查找
         :return: 是否处理了事件后续格子
         """
         # 查找事件后续相关图片
-        event_follow_pos = self.find_image("assets/dream/maozhua.png")
+        event_follow_pos = self.find_image("assets/dream/maozhua.png", matches=matches)
         if event_follow_pos:
             self.log_message("找到事件后续格子")
             self.process_event_follow()
@@ -629,20 +650,21 @@ class DreamMode:
         self.log_message("事件后续处理完成")
         self.update_stats("successful_events")
 
-    def check_battle_grid(self) -> bool:
+    def check_battle_grid(self, matches: Optional[Dict[str, Any]] = None) -> bool:
         """
         检查战斗格子
         
+        :param matches: 可选，check_grid_types的匹配结果，不传时重新截图查找
         :return: 是否处理了战斗格子
         """
-        battle_skip = self.find_image("assets/dream/battle_skip.png")
+        battle_skip = self.find_image("assets/dream/battle_skip.png", matches=matches)
         if battle_skip:
             self.log_message("找到战斗跳过")
             self.click_position(*battle_skip)
             self.delay(self.click_wait_interval)
             return True
         # 查找战斗相关图片
-        battle_pos = self.find_image("assets/dream/battle_start.png")
+        battle_pos = self.find_image("assets/dream/battle_start.png", matches=matches)
         if battle_pos:
             self.log_message("找到战斗格子")
             # 点击自动战斗
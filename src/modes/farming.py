@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 import threading
-import time
+from utils import clock
 from typing import Any, Dict, Optional
 from common import world
 from utils import logger
@@ -90,9 +90,10 @@ class FarmingMode:
         # 重置状态数据
         self.state_data = FarmingStateData()
         
-        start_time = time.time()
+        start_time = clock.time()
         is_left = 0
         battle = self.world._get_battle()
+        self.device_manager.begin_session("farming", self.log_queue)
         try:
             while True:
                 screenshot = self.device_manager.get_screenshot()
@@ -101,27 +102,29 @@ class FarmingMode:
                 if battle_end:
                     self.world.click_tirm(6)
                     self.state_data.battle_count += 1
-                    self.state_data.last_time = round((time.time() - start_time) / 60, 2)
+                    self.state_data.last_time = round((clock.time() - start_time) / 60, 2)
                     self.report_data()
                     continue
                 if in_battle:
                     self.battle.auto_battle(timeout=1)
                     continue
                 if is_left:
-                    time.sleep(1)
+                    clock.sleep(1)
                     logger.info("[in_world]向右跑")
                     self.world.run_right()
                 else:
-                    time.sleep(1)
+                    clock.sleep(1)
                     logger.info("[in_world]向左跑")
                     self.world.run_left()
                 is_left = not is_left
-                time.sleep(0.1)
+                clock.sleep(0.1)
                 screenshot = self.device_manager.get_screenshot()
                
         except Exception as e:
             logger.error(f"[刷野模式] 主循环异常: {e}")
             logger.error(f"{e.__traceback__}\n{traceback.format_exc()}")
         finally:
+            self.app_manager.stop_tracking()
+            self.device_manager.end_session()
             # 最终报告
             logger.info("[刷野模式] 刷野任务结束")
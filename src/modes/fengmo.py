@@ -1,16 +1,18 @@
 from enum import Enum
 from dataclasses import dataclass
-import time
+from utils import clock
 from typing import Optional
-from PIL import Image
+from core.frame import Frame
 from utils import logger
 from common.app import AppManager
 from core.battle import Battle
 from common.world import World
 from core.device_manager import DeviceManager
 from core.ocr_handler import OCRHandler
+from core.screen_classifier import Screen, screen_classifier
 from common.config import Monster, config, CheckPoint
 from utils.sleep_utils import sleep_until
+from utils.latency_stats import latency_stats
 import traceback
 import gc
 
@@ -76,7 +78,7 @@ class StateData:
     avg_fail_time: float = 0
 
     def turn_start(self):
-        self.turn_start_time = time.time()
+        self.turn_start_time = clock.time()
         self.turn_end_time = 0
         self.step = Step.COLLECT_JUNK
         self.current_point = None
@@ -84,7 +86,7 @@ class StateData:
 
     def turn_end(self,type='success'):
         try:
-            self.turn_end_time = time.time()
+            self.turn_end_time = clock.time()
             self.turn_time = round((self.turn_end_time - self.turn_start_time) / 60, 2)
             self.turn_count += 1
             if type == 'success':
@@ -185,7 +187,7 @@ class FengmoMode:
             logger.debug(f"定期内存清理完成，回收对象数: {collected}")
 
     def _in_world_or_battle(self):
-        time.sleep(self.wait_ui_time)
+        clock.sleep(self.wait_ui_time)
         return self.world.in_world_or_battle(callback=lambda image: self.check_info(image))
 
     def _performance_monitor(self, operation_name: str):
@@ -200,13 +202,13 @@ class FengmoMode:
                 self.start_time = None
                 
             def __enter__(self):
-                self.start_time = time.time()
+                self.start_time = clock.time()
                 logger.debug(f"[性能监控]开始执行: {self.name}")
                 return self
                 
             def __exit__(self, exc_type, exc_val, exc_tb):
                 if self.start_time is not None:
-                    elapsed = time.time() - self.start_time
+                    elapsed = clock.time() - self.start_time
                     if elapsed > 5:  # 超过5秒的操作记录警告
                         logger.warning(f"[性能监控]{self.name} 耗时较长: {elapsed:.2f}秒")
                     else:
@@ -217,6 +219,8 @@ class FengmoMode:
     def cleanup(self):
         """清理线程资源"""
         logger.info("开始清理逢魔模式线程...")
+        # 停止前台App跟踪线程
+        self.app_manager.stop_tracking()
         
         # 清理状态数据
         if hasattr(self, 'state_data'):
@@ -260,6 +264,8 @@ class FengmoMode:
         logger.info(f"[report_data]当前失败平均用时: {fail_avg_time:.1f}分钟")
         logger.info(f"[report_data]当前成功率: {success_rate:.1f}%")
         logger.info(f"[report_data]当前综合平均用时: {total_avg_time:.1f}分钟")
+        # 设备操作耗时统计
+        latency_lines = latency_stats.flush()
         
         # 发送统计数据到主进程GUI - 使用紧凑的文字格式
         if self.log_queue is not None:
@@ -267,6 +273,8 @@ class FengmoMode:
 成功: {state_data.total_finished_count} 次 | 失败: {state_data.total_fail_count} 次 | 成功率: {success_rate:.1f}%
 总用时: {state_data.total_finished_time + state_data.total_fail_time:.1f} 分钟 | 综合平均: {total_avg_time:.1f} 分钟
 成功平均: {state_data.avg_finished_time:.1f} 分钟 | 失败平均: {fail_avg_time:.1f} 分钟"""
+            if latency_lines:
+                report_str += "\n设备操作耗时:\n" + "\n".join(latency_lines)
             
             self.log_queue.put(f"REPORT_DATA__{report_str}")
 
@@ -286,6 +294,8 @@ class FengmoMode:
         3. 进入逢魔
         4. 按阶段依次执行收集、找宝箱/怪物/治疗点、Boss战
         """
+        # 每轮的report_data已包含耗时统计并发送到GUI，定期输出只写日志，避免覆盖统计面板
+        self.device_manager.begin_session("fengmo")
         try:
             self.world.set_monsters(self.monster_pos,self.monsters,self.default_battle_config)
             self.state_data.step = Step.UN_START
@@ -328,7 +338,7 @@ class FengmoMode:
                     self.state_data.turn_end(type='fail')
                 if self.state_data.step == Step.FINISH:
                     self.state_data.turn_end(type='success')
-                time.sleep(5)
+                clock.sleep(5)
         except KeyboardInterrupt:
             logger.info("逢魔进程收到中断信号，正在清理...")
         except Exception as e:
@@ -336,6 +346,7 @@ class FengmoMode:
             import traceback
             logger.error(traceback.format_exc())
         finally:
+            self.device_manager.end_session()
             # 确保清理线程资源
             self.cleanup()
             logger.info("逢魔进程已结束")
@@ -423,7 +434,7 @@ class FengmoMode:
                                     break
                                 if in_world_or_battle["in_battle"]:
                                     logger.info(f"[collect_junk_phase]遇敌战斗过")
-                                    time.sleep(self.wait_map_time)
+                                    clock.sleep(self.wait_map_time)
                             if self.check_state(Step.COLLECT_JUNK,check_point):
                                 return
                     self.wait_map()
@@ -668,18 +679,14 @@ class FengmoMode:
             
         try:
             find_points = []
-            # 记录 treasure 返回内容和类型
-            treasure = self.world.find_map_treasure(screenshot)
-            if treasure:
-                find_points.extend(treasure)
-            # 记录 monster 返回内容和类型
-            monster = self.world.find_map_monster(screenshot)
-            if monster:
-                find_points.extend([monster])
-            # 记录 cure 返回内容和类型
-            cure = self.world.find_map_cure(screenshot)
-            if cure:
-                find_points.extend([cure])
+            # 宝箱、怪物、治疗点在同一帧上并行匹配
+            tags = self.world.find_map_tags(screenshot)
+            if tags["treasure"]:
+                find_points.extend(tags["treasure"])
+            if tags["monster"]:
+                find_points.extend([tags["monster"]])
+            if tags["cure"]:
+                find_points.extend([tags["cure"]])
             closest_find_points = []
             for find_point in find_points:
                 closest_find_points.append(self.find_closest_point((find_point[0],find_point[1]), self.check_points))
@@ -714,32 +721,36 @@ class FengmoMode:
                     return 'in_world_fight_monster'
         return 'in_world'
 
-    def check_info(self, screenshot: Image.Image|None):
+    def check_info(self, screenshot: Frame|None):
         if screenshot is None:
             screenshot = self.device_manager.get_screenshot()
         try:
             try:
-                if self.world.click_confirm(screenshot):
+                # 一次分类判断各类弹窗，按原有顺序：通用确认框优先，其次战斗结算、退出逢魔、找到boss、网络断开
+                screen = screen_classifier.classify(screenshot, (Screen.CONFIRM, Screen.BATTLE_END, Screen.EXIT_FENGMO,
+                                                                 Screen.FOUND_BOSS, Screen.NET_ERROR))
+                if screen == Screen.CONFIRM:
+                    self.world.click_confirm(screenshot)
                     logger.info(f"[check_info]click_confirm")
-                    time.sleep(self.wait_ui_time)
+                    clock.sleep(self.wait_ui_time)
                     return
-                if self.battle.battle_end(screenshot):
+                if screen == Screen.BATTLE_END:
                     logger.info(f"[check_info]战斗结算")
                     self.world.dclick_tirm(3)
-                    time.sleep(self.wait_ui_time)
+                    clock.sleep(self.wait_ui_time)
                     return
-                if self.world.check_exit_fengmo(screenshot):
+                if screen == Screen.EXIT_FENGMO:
                     logger.info(f"[check_info]退出逢魔")
                     self.state_data.map_fail = True
                     self.state_data.step = Step.State_FAIL
                     self.world.click_confirm_yes()
                     return
-                if self.world.check_found_boss(screenshot):
+                if screen == Screen.FOUND_BOSS:
                     logger.info(f"[check_info]找到boss,点击确认")
                     self.state_data.step = Step.FIGHT_BOSS
                     self.world.click_confirm_yes()
                     return
-                if self.world.check_net_state(screenshot):
+                if screen == Screen.NET_ERROR:
                     logger.info(f"[check_info]网络断开,点击重试")
                     self.device_manager.click(771, 417)
                     return
@@ -760,7 +771,7 @@ class FengmoMode:
         return False
     
     def wait_map(self):
-        time.sleep(self.wait_map_time)
+        clock.sleep(self.wait_map_time)
         
     def find_closest_point(self, target: list[int] | tuple[int, int], points: list[CheckPoint]) -> Optional[CheckPoint]:
         """
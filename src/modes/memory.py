@@ -3,7 +3,7 @@
 实现追忆之书的自动化测试功能，支持配置战斗次数
 """
 
-import time
+from utils import clock
 from core import battle
 from core.device_manager import DeviceManager
 from core.ocr_handler import OCRHandler
@@ -11,7 +11,7 @@ from utils.logger import logger
 from common.world import World
 from core.battle import Battle
 from common.app import AppManager
-from PIL import Image
+from core.frame import Frame
 
 class MemoryMode:
     """
@@ -67,6 +67,7 @@ class MemoryMode:
             return
             
         self.is_running = True
+        self.device_manager.begin_session("memory", self.log_queue)
         
         try:
             logger.info(f"开始追忆之书，配置参数：脚本={script_path}, 战斗次数={battle_count}, 点击坐标=({click_x}, {click_y}), UI等待时间={ui_wait_time}秒")
@@ -97,10 +98,10 @@ class MemoryMode:
                     self._print_current_stats(battle_count)
                     # 点击阅读
                     self.click_read()
-                    time.sleep(ui_wait_time)  # 使用配置的UI等待时间
+                    clock.sleep(ui_wait_time)  # 使用配置的UI等待时间
                     # 确认阅读
                     self.confirm_read()
-                    time.sleep(ui_wait_time)  # 使用配置的UI等待时间
+                    clock.sleep(ui_wait_time)  # 使用配置的UI等待时间
                     # 等待战斗开始
                     self.battle.press_in_round(timeout=15)
                     # 执行单次战斗
@@ -109,7 +110,7 @@ class MemoryMode:
                         logger.error("战斗执行器初始化失败")
                         return
                     battle_executor.reset_index()
-                    def callback(image:Image.Image):
+                    def callback(image:Frame):
                         if not self.battle.in_battle():
                             return 'end'
                     battle_executor.execute_all(callback=callback)
@@ -119,7 +120,7 @@ class MemoryMode:
                     # 等待战斗结果并处理（OCR检测会更新统计数据）
                     self._wait_and_handle_battle_result(ui_wait_time)
                     self.total_battles += 1
-                    time.sleep(ui_wait_time)  # 使用配置的UI等待时间
+                    clock.sleep(ui_wait_time)  # 使用配置的UI等待时间
                 except Exception as e:
                     logger.error(f"第 {self.total_battles + 1} 次追忆之异常: {e}", exc_info=True)
                     # 发送异常导致的失败统计到GUI
@@ -133,6 +134,8 @@ class MemoryMode:
             logger.error(f"追忆之书过程中发生异常: {e}", exc_info=True)
         finally:
             self.is_running = False
+            self.app_manager.stop_tracking()
+            self.device_manager.end_session()
             logger.info("追忆之书结束")
 
     def _validate_script_file(self, script_path):
@@ -243,14 +246,14 @@ class MemoryMode:
         if self.device_manager.device is None:
             logger.error("设备未连接")
             return False
-        time.sleep(0.5)
+        clock.sleep(0.5)
         logger.info(f"长按按下,等待跳过")
         self.device_manager.press_down(100,20)
         while True:
             screenshot = self.device_manager.get_screenshot()
             if screenshot is None:
                 logger.warning("无法获取截图，跳过OCR检测")
-                time.sleep(ui_wait_time)
+                clock.sleep(ui_wait_time)
                 continue
             
             # 检测是否需要退出循环
@@ -301,7 +304,7 @@ class MemoryMode:
             if battle_finished:
                 break
             
-            time.sleep(ui_wait_time)
+            clock.sleep(ui_wait_time)
         
         return battle_success
 
@@ -312,7 +315,7 @@ class MemoryMode:
         try:
             logger.info(f"点击阅读按钮坐标: ({self.click_x}, {self.click_y})")
             self.device_manager.click(self.click_x, self.click_y)
-            time.sleep(0.5)
+            clock.sleep(0.5)
         except Exception as e:
             logger.warning(f"点击阅读按钮失败: {e}")
 
@@ -323,7 +326,7 @@ class MemoryMode:
         try:
             logger.info("确认阅读")
             self.device_manager.click(800, 620)
-            time.sleep(0.5)
+            clock.sleep(0.5)
         except Exception as e:
             logger.warning(f"确认阅读失败: {e}")
 
@@ -0,0 +1,63 @@
+"""
+运行时钟：设备操作、等待轮询、模式主循环中的计时和等待统一通过本模块调用
+- 默认直接使用time.time/time.sleep
+- 回放时DeviceManager安装虚拟时钟(见ReplayClock)：time()对所有线程返回虚拟时间，保证各处时间戳可比较；
+  sleep()只在安装时钟的线程(模式主线程)中推进虚拟时间、不真正等待，其它线程仍按真实时间等待，
+  后台轮询线程不会空转也不会推进主流程的时间
+- 不修改标准库time模块，日志时间戳等仍为真实时间
+"""
+import threading
+import time as _time
+from typing import Optional
+
+_virtual = None
+_owner: Optional[int] = None
+_lock = threading.Lock()
+
+
+def install(virtual_clock) -> None:
+    """
+    安装虚拟时钟，当前线程为推进时间的线程
+    :param virtual_clock: 提供time()/sleep()的时钟对象
+    """
+    global _virtual, _owner
+    with _lock:
+        _virtual = virtual_clock
+        _owner = threading.get_ident()
+
+
+def uninstall(virtual_clock=None) -> None:
+    """
+    卸载虚拟时钟，恢复真实时间
+    :param virtual_clock: 只在当前安装的是该时钟时卸载，None为无条件卸载
+    """
+    global _virtual, _owner
+    with _lock:
+        if virtual_clock is None or _virtual is virtual_clock:
+            _virtual = None
+            _owner = None
+
+
+def is_virtual() -> bool:
+    """是否正在使用虚拟时钟"""
+    return _virtual is not None
+
+
+def time() -> float:
+    """当前时间(秒)，回放时为虚拟时间"""
+    virtual_clock = _virtual
+    if virtual_clock is not None:
+        return virtual_clock.time()
+    return _time.time()
+
+
+def sleep(seconds: float) -> None:
+    """
+    等待seconds秒，回放时在安装时钟的线程中只推进虚拟时间
+    :param seconds: 等待时长(秒)
+    """
+    virtual_clock = _virtual
+    if virtual_clock is not None and threading.get_ident() == _owner:
+        virtual_clock.sleep(seconds)
+        return
+    _time.sleep(seconds)
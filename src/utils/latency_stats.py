@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, List, Optional
+import numpy as np
+from utils import logger
+
+
+class LatencyStat:
+    """
+    单个操作的耗时统计
+    次数、失败数、总耗时、最大值为累计值；分位数按最近window个样本计算
+    """
+
+    def __init__(self, window: int = 1024) -> None:
+        self.count = 0
+        self.failures = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float, ok: bool = True) -> None:
+        self.count += 1
+        if not ok:
+            self.failures += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        """
+        :return: 次数、失败率及各耗时指标(毫秒)
+        """
+        if self.samples:
+            p50, p95, p99 = np.percentile(np.fromiter(self.samples, dtype=float), [50, 95, 99]) * 1000
+        else:
+            p50 = p95 = p99 = 0.0
+        return {
+            "count": self.count,
+            "fail_rate": self.failures / self.count if self.count else 0.0,
+            "total_ms": self.total * 1000,
+            "avg_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "max_ms": self.max * 1000,
+        }
+
+
+class LatencyRegistry:
+    """
+    设备边界操作耗时统计
+    - record/timer记录截图、点击、App查询等操作的耗时和成败
+    - frame_age等非耗时量同样以秒记录，按相同方式统计
+    - snapshot返回当前统计，report生成文本，flush写日志并可发送到GUI统计通道
+    """
+
+    def __init__(self, window: int = 1024) -> None:
+        """
+        :param window: 计算分位数使用的最近样本数
+        """
+        self.window = window
+        self.enabled = True
+        self._stats: Dict[str, LatencyStat] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.time()
+
+    def record(self, name: str, seconds: float, ok: bool = True) -> None:
+        """
+        记录一次操作
+        :param name: 操作名
+        :param seconds: 耗时(秒)
+        :param ok: 是否成功
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            stat = self._stats.get(name)
+            if stat is None:
+                stat = self._stats[name] = LatencyStat(self.window)
+            stat.add(seconds, ok)
+
+    @contextmanager
+    def timer(self, name: str):
+        """
+        计时上下文，块内抛出异常记为失败并继续抛出
+        用法: with latency_stats.timer("click"): ...
+        """
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record(name, time.perf_counter() - start, ok)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        :return: {操作名: 统计指标}
+        """
+        with self._lock:
+            return {name: stat.summary() for name, stat in self._stats.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._last_flush = time.time()
+
+    def report(self) -> List[str]:
+        """
+        生成统计文本，每个操作一行
+        """
+        lines = []
+        for name, s in sorted(self.snapshot().items()):
+            line = (f"{name}: {s['count']}次 p50={s['p50_ms']:.0f}ms p95={s['p95_ms']:.0f}ms "
+                    f"p99={s['p99_ms']:.0f}ms 总计={s['total_ms'] / 1000:.1f}s")
+            if s["fail_rate"] > 0:
+                line += f" 失败率={s['fail_rate'] * 100:.1f}%"
+            lines.append(line)
+        return lines
+
+    def flush(self, log_queue: Any = None, prefix: str = "") -> List[str]:
+        """
+        输出统计到日志，可同时发送到GUI统计通道
+        :param log_queue: 日志队列，非None时以REPORT_DATA__前缀发送
+        :param prefix: 发送到GUI时拼接在统计前的文本
+        :return: 统计文本行
+        """
+        lines = self.report()
+        for line in lines:
+            logger.info(f"[latency]{line}")
+        if log_queue is not None and lines:
+            log_queue.put("REPORT_DATA__" + prefix + "\n".join(lines))
+        with self._lock:
+            self._last_flush = time.time()
+        return lines
+
+    def flush_due(self, interval: float) -> bool:
+        """距上次输出是否已超过interval秒，interval<=0时始终为False"""
+        with self._lock:
+            return interval > 0 and time.time() - self._last_flush >= interval
+
+
+latency_stats = LatencyRegistry()
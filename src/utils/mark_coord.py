@@ -15,11 +15,12 @@ def mark_coord():
     if not device_manager.connect_device():
         logger.debug("[mark_coord] 设备未连接，无法标记坐标")
         return
-    img = device_manager.get_screenshot()
+    img = device_manager.get_screenshot(full=True)
     if img is None:
         logger.debug("[mark_coord] 无法获取设备截图，无法标记坐标")
         return
-    img_cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+    # 截图为BGR格式Frame，复制一份用于标注
+    img_cv = np.array(img)
     wnd = "ClickWnd"
     logger.debug("[mark_coord] 请在弹出窗口点击需要标记的坐标，ESC关闭窗口")
     def on_EVENT_LBUTTONDOWN(event, x, y, flags, param):
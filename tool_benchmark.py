@@ -0,0 +1,232 @@
+import sys
+import os
+import time
+import argparse
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "src")))
+
+import numpy as np
+import cv2
+from src.core.device_manager import DeviceManager
+from src.core.capture_backend import CAPTURE_BACKENDS, create_capture_backend
+from src.core.input_backend import INPUT_BACKENDS, create_input_backend
+
+
+def summarize(name: str, latencies: list, wall: float, cpu: float) -> str:
+    """
+    汇总一组耗时数据
+    :param name: 测试项名称
+    :param latencies: 每次调用耗时(秒)
+    :param wall: 总耗时(秒)
+    :param cpu: 本进程CPU耗时(秒)
+    :return: 单行结果文本
+    """
+    n = len(latencies)
+    if n == 0:
+        return f"{name:<12} 无成功样本"
+    arr = np.array(latencies) * 1000
+    return (f"{name:<12} n={n:<5} {n / wall:7.2f}/s  "
+            f"p50={np.percentile(arr, 50):7.2f}ms  p95={np.percentile(arr, 95):7.2f}ms  "
+            f"cpu={cpu / n * 1000:7.2f}ms/次")
+
+
+def bench_capture(dm: DeviceManager, args) -> None:
+    """
+    对比各截图后端的帧率、延迟和主机CPU耗时
+    """
+    backends = args.backend or list(CAPTURE_BACKENDS)
+    for name in backends:
+        backend = create_capture_backend(name, dm.device, dm.adb_address)
+        if backend.name != name:
+            print(f"[WARN] 后端{name}不可用，跳过")
+            continue
+        try:
+            for _ in range(args.warmup):
+                backend.capture()
+            latencies = []
+            failed = 0
+            cpu_start = time.process_time()
+            wall_start = time.perf_counter()
+            for _ in range(args.count):
+                t = time.perf_counter()
+                img = backend.capture()
+                if img is None:
+                    failed += 1
+                    continue
+                latencies.append(time.perf_counter() - t)
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            print(summarize(name, latencies, wall, cpu) + (f"  失败={failed}" if failed else ""))
+        finally:
+            backend.close()
+
+
+def bench_input(dm: DeviceManager, args) -> None:
+    """
+    对比各输入后端的单次操作延迟(从发出到设备执行完毕)
+    """
+    x, y = dm.to_device(args.x, args.y)
+    backends = args.backend or list(INPUT_BACKENDS)
+    for name in backends:
+        backend = create_input_backend(name, dm.device, dm.adb_address)
+        if backend.name != name:
+            print(f"[WARN] 后端{name}不可用，跳过")
+            continue
+        if args.action == "click":
+            action = lambda: backend.click(x, y)
+        else:
+            action = lambda: backend.swipe(x, y, x, y, 0.05)
+        try:
+            for _ in range(args.warmup):
+                action()
+            latencies = []
+            failed = 0
+            cpu_start = time.process_time()
+            wall_start = time.perf_counter()
+            for _ in range(args.count):
+                t = time.perf_counter()
+                try:
+                    action()
+                except Exception as e:
+                    print(f"[WARN] {name} 执行失败: {e}")
+                    failed += 1
+                    continue
+                latencies.append(time.perf_counter() - t)
+                if args.interval > 0:
+                    time.sleep(args.interval)
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            print(summarize(name, latencies, wall, cpu) + (f"  失败={failed}" if failed else ""))
+        finally:
+            backend.close()
+
+
+def load_frame(path: str):
+    """
+    读取测试图片为Frame，未指定时生成1280x720随机图
+    """
+    from src.core.frame import Frame
+    if path:
+        img = cv2.imread(path)
+        if img is None:
+            raise SystemExit(f"[ERROR] 图片读取失败: {path}")
+        return Frame(img)
+    return Frame(np.random.RandomState(0).randint(0, 256, (720, 1280, 3), dtype=np.uint8))
+
+
+def reference_match_point_color(image: np.ndarray, points: list, ambiguity: float = 0.95) -> bool:
+    """
+    逐像素实现的多点取色(原实现：每次调用新建线程池，逐点逐像素计算)，作为性能对比基准
+    """
+    import concurrent.futures
+
+    def crop(x, y, r):
+        h, w = image.shape[:2]
+        region = np.zeros((2 * r, 2 * r, 3), dtype=np.uint8)
+        sx1, sy1, sx2, sy2 = max(0, x - r), max(0, y - r), min(w, x + r), min(h, y + r)
+        if sx2 > sx1 and sy2 > sy1:
+            region[sy1 - y + r:sy2 - y + r, sx1 - x + r:sx2 - x + r] = image[sy1:sy2, sx1:sx2, ::-1]
+        return region
+
+    def check_point(region_img, color):
+        color = color.lstrip('#')
+        target = tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+        height, width = region_img.shape[:2]
+        pixels = region_img.tolist()
+        for dx in range(width):
+            for dy in range(height):
+                pix = pixels[dy][dx]
+                if 1 - sum((pix[i] - target[i]) ** 2 for i in range(3)) ** 0.5 / (3 * 255) >= ambiguity:
+                    return True
+        return False
+
+    regions = [(crop(x, y, r), color) for x, y, color, r in points]
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        futures = [executor.submit(check_point, region, color) for region, color in regions]
+        return all([f.result() for f in futures])
+
+
+def time_calls(func, count: int) -> tuple:
+    """
+    重复调用func，返回(每次耗时列表, 总耗时, CPU耗时)
+    """
+    latencies = []
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for _ in range(count):
+        t = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - t)
+    return latencies, time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+
+def bench_point_color(args) -> None:
+    """
+    多点取色：向量化实现与逐像素实现对比，并校验结果一致
+    """
+    from src.core.ocr_handler import OCRHandler
+    frame = load_frame(args.image)
+    handler = OCRHandler.__new__(OCRHandler)
+    handler._probe_cache = {}
+    rng = np.random.RandomState(1)
+    h, w = frame.shape[:2]
+    cases = []
+    for _ in range(args.cases):
+        points = []
+        for _ in range(args.points):
+            x, y = int(rng.randint(0, w)), int(rng.randint(0, h))
+            b, g, r = frame[y, x]
+            # 一半取色点用该点真实颜色，保证命中与未命中都被覆盖
+            color = '{:02X}{:02X}{:02X}'.format(r, g, b) if rng.rand() < 0.5 else 'FF00FF'
+            points.append((x, y, color, args.range))
+        cases.append(points)
+    mismatch = sum(handler.match_point_color(frame, p) != reference_match_point_color(frame, p) for p in cases)
+    results = {}
+    for name, func in (("reference", reference_match_point_color), ("vectorized", handler.match_point_color)):
+        latencies, wall, cpu = time_calls(lambda: [func(frame, p) for p in cases], args.count)
+        results[name] = np.median(latencies)
+        print(summarize(name, latencies, wall, cpu))
+    print(f"加速比: {results['reference'] / results['vectorized']:.1f}x  结果不一致: {mismatch}/{len(cases)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="设备操作性能测试")
+    parser.add_argument("--device", default=None, help="设备地址，默认使用config/device.yaml中的adb_address")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_capture = sub.add_parser("capture", help="截图后端对比")
+    p_capture.add_argument("--backend", action="append", choices=list(CAPTURE_BACKENDS), help="指定后端，可重复，默认全部")
+    p_capture.add_argument("--count", type=int, default=50, help="每个后端截图次数")
+    p_capture.add_argument("--warmup", type=int, default=3, help="预热次数，不计入统计")
+    p_capture.set_defaults(func=bench_capture)
+
+    p_input = sub.add_parser("input", help="输入后端对比")
+    p_input.add_argument("--backend", action="append", choices=list(INPUT_BACKENDS), help="指定后端，可重复，默认全部")
+    p_input.add_argument("--action", choices=["click", "swipe"], default="click", help="测试的操作")
+    p_input.add_argument("--x", type=int, default=640, help="操作点横坐标(1280x720逻辑坐标)，请选择无副作用的位置")
+    p_input.add_argument("--y", type=int, default=10, help="操作点纵坐标(1280x720逻辑坐标)")
+    p_input.add_argument("--count", type=int, default=30, help="每个后端操作次数")
+    p_input.add_argument("--warmup", type=int, default=3, help="预热次数，不计入统计")
+    p_input.add_argument("--interval", type=float, default=0.0, help="两次操作之间的间隔(秒)，不计入延迟")
+    p_input.set_defaults(func=bench_input)
+
+    p_point = sub.add_parser("point_color", help="多点取色实现对比(无需设备)")
+    p_point.add_argument("--image", default="", help="测试图片路径，默认随机图")
+    p_point.add_argument("--points", type=int, default=6, help="每次调用的取色点数")
+    p_point.add_argument("--range", type=int, default=3, help="取色范围")
+    p_point.add_argument("--cases", type=int, default=20, help="每轮调用的取色点组数")
+    p_point.add_argument("--count", type=int, default=20, help="测试轮数")
+    p_point.set_defaults(func=bench_point_color, offline=True)
+
+    args = parser.parse_args()
+    if getattr(args, "offline", False):
+        args.func(args)
+        return
+    dm = DeviceManager()
+    if not dm.connect_device(args.device):
+        print("[ERROR] 设备连接失败")
+        return
+    args.func(dm, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -66,7 +66,7 @@ def screenshot_and_show(adb_addr, save_path):
     if not dm.connect_device():
         print(f"[ERROR] Failed to connect to device: {adb_addr}")
         return
-    img = dm.get_screenshot()  # 获取全屏截图
+    img = dm.get_screenshot(full=True)  # 获取全屏截图
     if img is None:
         print("[ERROR] Failed to get screenshot.")
         return